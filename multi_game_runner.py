@@ -1,41 +1,178 @@
-from src.game import LiarsDiceGame
+from src.game import LiarsDiceGame, derive_seed
 from src.players import Player
 from src.snippets import *
+from src import client_pool, rate_limiter, circuit_breaker, log_backend
+from src.decision_cache import DecisionCache
+from src.replay import GameRecorder
+from src.metrics import metrics
+from src.events import EventLog, JsonlSink, TextLogSink
+from src.ratings import RatingStore, game_key, print_leaderboard
 import argparse
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import logging
 import os
 import time
+import asyncio
+import random
+import threading
+from collections import Counter
 
 def create_logger(id):
-    """创建日志记录器"""
+    """创建日志记录器，所有对局的日志由同一个写线程写入，对局结束时需调用 log_backend.close_game_log"""
     os.makedirs('logs', exist_ok=True)
     current_time = time.strftime("%Y%m%d-%H%M%S", time.localtime())
-    logger = logging.getLogger(f'multi_game_runner_{current_time}_{id}')
-    log_filename = f'logs/multi_game_runner_{current_time}_{id}.log'
-    logger.setLevel(logging.INFO)
-    handler = logging.FileHandler(log_filename, encoding='utf-8')
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    suffix = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}[args.log_compression]
+    log_filename = f'logs/multi_game_runner_{current_time}_{id}.log{suffix}'
+    logger = log_backend.open_game_log(log_filename)
     return logger, log_filename
 
+def add_usage(game: LiarsDiceGame):
+    """累计各玩家的token用量、非法叫点修正次数与本地短路回合数"""
+    with usage_lock:
+        for name, count in game.repairs.items():
+            repairs[name] += count
+        for name, count in game.shortcuts.items():
+            shortcuts[name] += count
+        for player in game.players:
+            if player.llm_client is None:
+                continue
+            for model, count in getattr(player.llm_client, "answered", {}).items():
+                if model != player.model:
+                    fallback_answers[f"{player.name}->{model}"] += count
+            for key, value in player.llm_client.usage_totals.items():
+                usage[key] = usage.get(key, 0) + value
+
+def update_ratings(game: LiarsDiceGame):
+    """按本局名次增量更新各模型的评分"""
+    if rating_store:
+        model_of = {config['name']: config['model'] for config in role_config}
+        order = [model_of[name] for name in game.finish_order()]
+        rating_store.update(order, key=game_key(game.seed, order, game.game_id))
+
+def save_record(recorder: GameRecorder | None, game_id: int):
+    """保存对局记录（包括异常终止的对局，便于复现）"""
+    if recorder:
+        recorder.save(os.path.join(args.record, f"game_{game_id}.json.gz"))
+
+def create_events(logger: logging.Logger, game_id: int) -> EventLog:
+    """对局事件流：总是渲染到文本日志，指定 --events 时同时写入JSONL"""
+    sinks = [TextLogSink(logger)]
+    if args.events:
+        suffix = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}[args.events_compression]
+        sinks.append(JsonlSink(os.path.join(args.events, f"game_{game_id}.jsonl{suffix}")))
+    return EventLog(sinks, game=game_id)
+
 def run_game(thread_id: int):
     logger, log_path = create_logger(thread_id)
-    players = [Player(name=config['name'], is_human=False, model=config['model'], logger=logger) for config in role_config]
-    game = LiarsDiceGame(players, logger=logger)
+    players = [Player(name=config['name'], is_human=False, model=config['model'], logger=logger, prompt_layout=args.prompt_layout, decision_cache=decision_cache, stream=args.stream) for config in role_config]
+    recorder = GameRecorder() if args.record else None
+    events = create_events(logger, thread_id)
+    game = LiarsDiceGame(players, logger=logger, seed=derive_seed(run_seed, thread_id), recorder=recorder, probability_hint=args.probability_hint,
+                         repair_policy=args.repair, shortcut_policy=args.shortcut, reflection_mode=args.reflection, reflection_staleness=args.reflection_staleness,
+                         events=events)
     try:
         winner = game.start_game()
         print(f"({thread_id})winner: {winner}\tlogfile: {log_path}\n", end='', flush=True)
         wins[player_id[winner]] += 1
+        add_usage(game)
+        update_ratings(game)
     except Exception as e:
         print(f"({thread_id}){str(e)}\nlogfile: {log_path}\n", end='', flush=True)
         raise e
+    finally:
+        save_record(recorder, thread_id)
+        events.close()
+        log_backend.close_game_log(logger)
+
+async def run_game_async(game_id: int, semaphore: asyncio.Semaphore):
+    async with semaphore:
+        logger, log_path = create_logger(game_id)
+        players = [Player(name=config['name'], is_human=False, model=config['model'], logger=logger, prompt_layout=args.prompt_layout, decision_cache=decision_cache, stream=args.stream) for config in role_config]
+        recorder = GameRecorder() if args.record else None
+        events = create_events(logger, game_id)
+        game = LiarsDiceGame(players, logger=logger, seed=derive_seed(run_seed, game_id), recorder=recorder, probability_hint=args.probability_hint,
+                             repair_policy=args.repair, shortcut_policy=args.shortcut, reflection_mode=args.reflection, reflection_staleness=args.reflection_staleness,
+                             events=events)
+        try:
+            winner = await game.start_game_async()
+            print(f"({game_id})winner: {winner}\tlogfile: {log_path}\n", end='', flush=True)
+            wins[player_id[winner]] += 1
+            add_usage(game)
+            update_ratings(game)
+        except Exception as e:
+            print(f"({game_id}){str(e)}\nlogfile: {log_path}\n", end='', flush=True)
+            raise e
+        finally:
+            save_record(recorder, game_id)
+            events.close()
+            log_backend.close_game_log(logger)
+
+def llm_failed(id: int, e: LLMError) -> bool:
+    """记录一局因LLM故障失败的游戏，返回是否需要终止整个批次"""
+    global llm_failures
+    llm_failures += 1
+    if isinstance(e, circuit_breaker.CircuitOpenError):
+        # 玩家已按 Retry-After 等到半开并多次探测，主模型与备用模型的熔断器仍全部打开
+        print(f"第{id}局游戏中检测到异常：{str(e)}。所有备用模型的熔断器均已打开，正在终止任务……")
+        return True
+    if args.max_failures and llm_failures >= args.max_failures:
+        print(f"第{id}局游戏中检测到异常：{str(e)}。LLM故障已达{llm_failures}局，正在终止任务……")
+        return True
+    print(f"第{id}局游戏中检测到异常：{str(e)}。跳过该局，继续运行")
+    return False
+
+async def run_all_async():
+    """在同一个事件循环中调度所有对局，最多同时进行 threads 局"""
+    semaphore = asyncio.Semaphore(threads)
+    tasks = [asyncio.create_task(run_game_async(i, semaphore)) for i in game_ids]
+    id = 0
+    try:
+        for task in asyncio.as_completed(tasks):
+            id += 1
+            try:
+                await task
+            except LLMError as e:
+                if llm_failed(id, e):
+                    break
+            except Exception as e:
+                print(f"第{id}局游戏中检测到异常：{str(e)}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
 # 设置参数
 parser = argparse.ArgumentParser()
 parser.add_argument('total_runs', type=int, help='游戏运行次数')
-parser.add_argument('-t', '--threads', type=int, help='同时运行的线程数', default=1)
+parser.add_argument('-t', '--threads', type=int, help='同时运行的线程数（--async 模式下为同时进行的对局数）', default=1)
+parser.add_argument('--async', dest='use_async', action='store_true', help='使用协程在单个事件循环中运行所有对局')
+parser.add_argument('--prewarm', action='store_true', help='开局前预先建立到各供应商的连接')
+parser.add_argument('--decision-cache', type=str, default=None, metavar='PATH', help='启用局面决策缓存并保存到指定的SQLite文件')
+parser.add_argument('--cache-samples', type=int, default=3, help='决策缓存中每个局面保存的采样数')
+parser.add_argument('--cache-size', type=int, default=100000, help='决策缓存最多保存的局面数')
+parser.add_argument('--record', type=str, default=None, metavar='DIR', help='保存每局的种子与LLM原始请求/响应，可用 python -m src.replay 回放')
+parser.add_argument('--events', type=str, default=None, metavar='DIR', help='把每局的结构化事件（叫点、质疑、开盅、反思、LLM调用等）写成JSONL')
+parser.add_argument('--events-compression', choices=['none', 'gzip', 'zstd'], default='gzip', help='JSONL事件日志的压缩方式，zstd 需要安装 zstandard')
+parser.add_argument('--log-compression', choices=['none', 'gzip', 'zstd'], default='none', help='每局文本日志的压缩方式，zstd 需要安装 zstandard')
+parser.add_argument('--ratings', type=str, default=None, metavar='PATH', help='按每局名次更新模型评分并保存到SQLite文件，可跨批次累积')
+parser.add_argument('--seed', type=int, default=None, help='运行种子，每局的种子由它和对局编号派生，相同种子可完全重现')
+parser.add_argument('--start-index', type=int, default=0, help='第一局的编号，用于把同一种子的锦标赛拆分到多个进程/机器上运行')
+parser.add_argument('--probability-hint', action='store_true', help='在AI玩家的提示词中附上精确的叫点成立概率')
+parser.add_argument('--repair', choices=repair_policies, default='off', help='AI玩家非法叫点的本地修正策略，nearest/challenge 不再重新询问LLM')
+parser.add_argument('--shortcut', choices=shortcut_policies, default='off', help='只有一个合理行动时在本地决策，不询问LLM')
+parser.add_argument('--stream', action='store_true', help='决策请求使用流式响应，收到完整决策后立即结束，并记录首token时间')
+parser.add_argument('--reflection', choices=reflection_modes, default='sync', help='每轮结束后的反思方式，pipelined 在后台反思的同时开始下一轮')
+parser.add_argument('--reflection-staleness', type=int, default=0, help='pipelined 模式下玩家反思未完成时最多还能用旧看法行动的次数')
+parser.add_argument('--rpm', type=float, default=None, help='未在 snippets.provider_rate_limits 中配置的供应商每分钟最多请求数（所有对局共享）')
+parser.add_argument('--tpm', type=float, default=None, help='未在 snippets.provider_rate_limits 中配置的供应商每分钟最多token数（所有对局共享）')
+parser.add_argument('--circuit-breaker', action='store_true', help='启用按模型的熔断器，熔断时切换到备用模型')
+parser.add_argument('--breaker-error-rate', type=float, default=0.5, help='熔断器打开的错误率阈值')
+parser.add_argument('--breaker-slow-seconds', type=float, default=None, help='超过该耗时的调用视为慢调用，慢调用过多时同样熔断')
+parser.add_argument('--breaker-open-seconds', type=float, default=30.0, help='熔断器打开后多久进入半开状态进行探测')
+parser.add_argument('--fallback', type=str, action='append', default=[], metavar='MODEL=FALLBACK', help='指定备用模型，覆盖 snippets.model_fallbacks，可重复')
+parser.add_argument('--max-failures', type=int, default=10, help='因LLM故障失败的对局数达到该值时终止整个批次，0表示不终止')
+parser.add_argument('--metrics', type=str, default=None, metavar='PREFIX', help='LLM调用指标的导出路径前缀（生成 PREFIX.prom 和 PREFIX.json），默认 logs/metrics_<时间>')
+parser.add_argument('--prompt-layout', choices=prompt_layouts, default='default', help='提示词布局，prefix_cache 可命中供应商的提示词缓存')
 group = parser.add_argument_group("玩家设定")
 group.add_argument('--name1', type=str, help='第1个玩家的名字', default='Alice')
 group.add_argument('--model1', type=str, help='第1个玩家的模型', default='doubao-1-5-lite-32k-250115')
@@ -57,6 +194,8 @@ role_config = [
 threads = args.threads
 player_id = {args.name1: 0, args.name2: 1, args.name3: 2, args.name4: 3}
 total_runs = args.total_runs
+run_seed = args.seed if args.seed is not None else random.SystemRandom().randrange(2 ** 32)
+game_ids = range(args.start_index, args.start_index + total_runs)
 
 # 检查名字合法性
 names = [p['name'] for p in role_config if p['name']]
@@ -72,29 +211,86 @@ for p in role_config:
 # 打印玩家信息
 for p in role_config:
     print(p['name'], ':', p['model'])
+print(f"运行种子：{run_seed}，对局编号：{game_ids.start}~{game_ids.stop - 1}")
+
+# 所有对局共享同一组连接池，按并发量调整池大小
+client_pool.configure(max_connections=max(100, threads * 4), max_keepalive_connections=max(20, threads * 4))
+rate_limiter.configure(rpm=args.rpm, tpm=args.tpm)
+if args.circuit_breaker:
+    circuit_breaker.configure(enabled=True, error_rate=args.breaker_error_rate, slow_call_seconds=args.breaker_slow_seconds,
+                              open_seconds=args.breaker_open_seconds)
+    for spec in args.fallback:
+        model, fallback = spec.split('=', 1)
+        if fallback not in model_list:
+            raise ValueError(f"不支持的模型：{fallback}")
+        model_fallbacks[model] = fallback
+if args.prewarm:
+    client_pool.prewarm(p['model'] for p in role_config)
+
+if args.record:
+    os.makedirs(args.record, exist_ok=True)
+if args.events:
+    os.makedirs(args.events, exist_ok=True)
+rating_store = RatingStore(args.ratings) if args.ratings else None
+decision_cache = DecisionCache(args.decision_cache, max_entries=args.cache_size, samples_per_key=args.cache_samples) if args.decision_cache else None
 
 # 执行线程任务
 wins = [0,0,0,0]
+usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "reasoning_tokens": 0, "cached_tokens": 0}
+repairs = {p['name']: 0 for p in role_config}
+shortcuts = {p['name']: 0 for p in role_config}
+fallback_answers = Counter()
+llm_failures = 0
+usage_lock = threading.Lock()
 start_time = time.time()
 try:
-    with ThreadPoolExecutor(max_workers=threads) as executor:
-        futures = [executor.submit(run_game, i) for i in range(total_runs)]
-        id = 0
-        for future in as_completed(futures):
-            id += 1
-            try:
-                future.result()
-            except LLMError as e:
-                print(f"第{id}局游戏中检测到异常：{str(e)}。正在终止任务……")
-                executor.shutdown(cancel_futures=True)
-                break
-            except Exception as e:
-                print(f"第{id}局游戏中检测到异常：{str(e)}")
+    if args.use_async:
+        asyncio.run(run_all_async())
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            futures = [executor.submit(run_game, i) for i in game_ids]
+            id = 0
+            for future in as_completed(futures):
+                id += 1
+                try:
+                    future.result()
+                except LLMError as e:
+                    if llm_failed(id, e):
+                        executor.shutdown(cancel_futures=True)
+                        break
+                except Exception as e:
+                    print(f"第{id}局游戏中检测到异常：{str(e)}")
 
 finally:
+    log_backend.shutdown()      # 写完队列中剩余的日志
     end_time = time.time()
     elapsed_time = end_time - start_time
     success = wins[0] + wins[1] + wins[2] + wins[3]
     print(f"成功运行{success}次游戏，耗时{elapsed_time}s，胜利次数统计：")
+    if decision_cache:
+        print(f"决策缓存命中{decision_cache.hits}次，未命中{decision_cache.misses}次，共缓存{len(decision_cache)}个局面")
+    if args.repair != 'off':
+        print("非法叫点本地修正次数：" + "，".join(f"{name} {count}次" for name, count in repairs.items()))
+    if args.shortcut != 'off':
+        print("本地短路回合数：" + "，".join(f"{name} {count}次" for name, count in shortcuts.items()))
+    if llm_failures:
+        print(f"因LLM故障失败{llm_failures}局")
+    if breakers := circuit_breaker.summary():
+        print("熔断器状态切换：" + "，".join(f"{model} {transitions}" for model, transitions in breakers.items()))
+    if fallback_answers:
+        print("备用模型应答次数：" + "，".join(f"{key} {count}次" for key, count in fallback_answers.items()))
+    if waited := rate_limiter.total_waited():
+        print(f"限流累计等待{waited:.1f}s")
+    print(f"LLM调用{usage['calls']}次，输入{usage['prompt_tokens']}token（缓存命中{usage['cached_tokens']}），输出{usage['completion_tokens']}token（推理{usage['reasoning_tokens']}）")
+    os.makedirs('logs', exist_ok=True)
+    metrics_prefix = args.metrics or f"logs/metrics_{time.strftime('%Y%m%d-%H%M%S', time.localtime())}"
+    prom_path, json_path = metrics.export(metrics_prefix)
+    print(f"LLM调用指标：{prom_path}，{json_path}")
     for i in range(4):
-        print(f'{role_config[i]['name']}({role_config[i]['model']}): {wins[i]}')
\ No newline at end of file
+        print(f'{role_config[i]['name']}({role_config[i]['model']}): {wins[i]}')
+    if rating_store:
+        print("模型评分（保守评分 = μ - 3σ）：")
+        print_leaderboard(rating_store.leaderboard(list(dict.fromkeys(p['model'] for p in role_config))))
+        if rating_store.duplicates or rating_store.self_play:
+            print(f"评分跳过{rating_store.duplicates}局已计入过的对局、{rating_store.self_play}局自我对弈")
+        rating_store.close()
\ No newline at end of file
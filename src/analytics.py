@@ -0,0 +1,514 @@
+"""
+锦标赛结果的列式分析
+
+把对局导入为 NumPy 列式存储（.npz），再用向量化的分组聚合计算各模型、各座位的统计：
+    turns  每个回合一行：对局、轮次、座位、模型、行动（叫点/质疑/非法）、叫点、自己手中该点数的骰子数、
+           未知骰子数、场上该点数的实际个数、是否本地决策（短路/修正）
+    games  每局一行：随机种子、玩家数、轮数、胜者座位
+    seats  每局每个座位一行：模型、名次、存活轮数
+支持的输入：
+    JSONL 事件日志（--events 输出，.jsonl/.jsonl.gz/.jsonl.zst）
+    对局记录（--record 输出，.json/.json.gz），离线回放得到事件
+    文本日志（logs/*.log），按日志文本尽力解析，旧版本的日志同样适用
+
+统计口径：
+    虚张声势  叫点时从自己的骰子看，该叫点成立的概率低于 BLUFF_THRESHOLD
+    激进程度  1 - 叫点成立的概率（从叫点者的视角）
+    质疑准确率 质疑时上家的叫点确实不成立的比例
+    对阵胜率  两个模型同场时，前者名次高于后者的比例
+默认不把本地短路/修正的回合计入模型的行为统计（--include-local 可计入）。
+
+用法：
+    python -m src.analytics ingest logs/events logs/records -o results.npz
+    python -m src.analytics report results.npz
+    python -m src.analytics bench --turns 1000000
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from typing import Any, Dict, Iterable, Iterator, List
+
+import numpy as np
+
+from src.events import EventLog, MemorySink, load_events, open_text
+from src.probability import BidProbability
+from src.ratings import game_key
+from src.snippets import DICE_PER_PLAYER
+
+BLUFF_THRESHOLD = 0.5
+BID, CHALLENGE, INVALID = 0, 1, 2
+LOCAL_NONE, LOCAL_SHORTCUT, LOCAL_REPAIR = 0, 1, 2
+
+# 叫点的数量与点数来自LLM，可能远超合理范围（如300个7点），超出 int16 时截断到边界并计入 stats["clamped"]
+TURN_COLUMNS = {
+    "game": np.int32, "round": np.int16, "seat": np.int16, "model": np.int16, "action": np.int8,
+    "number": np.int16, "value": np.int16, "own": np.int16, "unknown": np.int16, "actual": np.int16, "local": np.int8,
+}
+GAME_COLUMNS = {"seed": np.int64, "id": np.str_, "players": np.int16, "rounds": np.int16, "winner": np.int16}
+SEAT_COLUMNS = {"game": np.int32, "seat": np.int16, "model": np.int16, "place": np.int16, "survived": np.int16}
+TABLES = {"turns": TURN_COLUMNS, "games": GAME_COLUMNS, "seats": SEAT_COLUMNS}
+INT16_MIN, INT16_MAX = np.iinfo(np.int16).min, np.iinfo(np.int16).max
+
+class ResultStore:
+    """列式存储：每张表是 列名 -> 一维数组，模型名保存在 models 中，各表用下标引用"""
+
+    def __init__(self, turns: Dict[str, np.ndarray], games: Dict[str, np.ndarray], seats: Dict[str, np.ndarray], models: List[str]):
+        self.turns = turns
+        self.games = games
+        self.seats = seats
+        self.models = models
+
+    def __len__(self) -> int:
+        return len(self.games["seed"])
+
+    def save(self, path: str):
+        arrays = {"models": np.array(self.models, dtype=str)}
+        for table in ("turns", "games", "seats"):
+            for name, column in getattr(self, table).items():
+                arrays[f"{table}.{name}"] = column
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "ResultStore":
+        with np.load(path) as data:
+            tables = {table: {} for table in ("turns", "games", "seats")}
+            for key in data.files:
+                if "." in key:
+                    table, name = key.split(".", 1)
+                    # 旧版本文件中的窄整数列按当前的类型读入
+                    tables[table][name] = data[key].astype(TABLES[table].get(name, data[key].dtype))
+            if "id" not in tables["games"]:
+                tables["games"]["id"] = np.full(len(tables["games"]["seed"]), "")     # 旧版本没有对局ID
+            return cls(tables["turns"], tables["games"], tables["seats"], [str(m) for m in data["models"]])
+
+    def concat(self, other: "ResultStore") -> "ResultStore":
+        """合并另一个存储（重新编号对局与模型）"""
+        models = list(self.models)
+        index = {model: i for i, model in enumerate(models)}
+        for model in other.models:
+            if model not in index:
+                index[model] = len(models)
+                models.append(model)
+        remap = np.array([index[model] for model in other.models] or [0], dtype=np.int16)
+        offset = len(self)
+
+        def merge(mine: Dict[str, np.ndarray], theirs: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+            theirs = dict(theirs)
+            if "game" in theirs:
+                theirs["game"] = theirs["game"] + offset
+            if "model" in theirs:
+                theirs["model"] = remap[theirs["model"]]
+            # 字符串列不转换类型，否则会被截断到已有列的长度
+            return {name: np.concatenate([column, theirs[name] if column.dtype.kind == "U" else theirs[name].astype(column.dtype)])
+                    for name, column in mine.items()}
+
+        return ResultStore(merge(self.turns, other.turns), merge(self.games, other.games), merge(self.seats, other.seats), models)
+
+    def game_keys(self) -> List[str | None]:
+        """各局的去重键（同 ratings.game_key），没有对局ID和随机种子的旧日志为None"""
+        lineups = [[] for _ in range(len(self))]
+        for game, model in zip(self.seats["game"].tolist(), self.seats["model"].tolist()):
+            lineups[game].append(self.models[model])
+        return [game_key(seed, lineup, game_id) if game_id or seed >= 0 else None
+                for seed, game_id, lineup in zip(self.games["seed"].tolist(), self.games["id"].tolist(), lineups)]
+
+class StoreBuilder:
+    """逐局接收事件，累积成列式存储"""
+
+    def __init__(self, known_keys: Iterable[str | None] = ()):
+        self.turns = {name: [] for name in TURN_COLUMNS}
+        self.games = {name: [] for name in GAME_COLUMNS}
+        self.seats = {name: [] for name in SEAT_COLUMNS}
+        self.models: List[str] = []
+        self._model_index: Dict[str, int] = {}
+        self._keys = {key for key in known_keys if key is not None}
+        self.skipped = 0        # 未完成或重复的对局
+        self.clamped = 0        # 叫点超出 int16 范围而被截断的回合
+
+    def _model(self, model: str) -> int:
+        if model not in self._model_index:
+            self._model_index[model] = len(self.models)
+            self.models.append(model)
+        return self._model_index[model]
+
+    def add_game(self, events: List[Dict[str, Any]]) -> bool:
+        """
+        加入一局游戏的事件（从 game_start 到 game_end）
+        Returns:
+            是否加入成功；没有结束或已导入过（对局ID相同，旧日志为随机种子与阵容都相同）的对局会被跳过
+        """
+        start = next((e for e in events if e["type"] == "game_start"), None)
+        end = next((e for e in events if e["type"] == "game_end"), None)
+        if start is None or end is None:
+            self.skipped += 1
+            return False
+        seed = start.get("seed")
+        seed = -1 if seed is None else seed
+        game_id = start.get("game_id") or ""
+        lineup = [p["model"] if not p.get("human") else "human" for p in start["players"]]
+        key = game_key(seed, lineup, game_id) if game_id or seed >= 0 else None
+        if key in self._keys:
+            self.skipped += 1
+            return False
+        if key is not None:
+            self._keys.add(key)
+
+        game = len(self.games["seed"])
+        seat = {p["name"]: i for i, p in enumerate(start["players"])}
+        models = [self._model(model) for model in lineup]
+        place = {}
+        died = {}
+        dice: Dict[str, List[int]] = {}
+        local: Dict[str, int] = {}
+        round = 0
+        for e in events:
+            kind = e["type"]
+            if kind == "roll":
+                dice = e["dice"]
+                round = e["round"]
+                local = {}
+            elif kind == "shortcut":
+                local[e["player"]] = LOCAL_SHORTCUT
+            elif kind == "repair":
+                local[e["player"]] = LOCAL_REPAIR
+            elif kind in ("bid", "invalid_bid", "challenge"):
+                player = e["player"]
+                number, value = e.get("number") or 0, e.get("value") or 0
+                if not (INT16_MIN <= number <= INT16_MAX and INT16_MIN <= value <= INT16_MAX):
+                    self.clamped += 1
+                    number, value = (min(max(x, INT16_MIN), INT16_MAX) for x in (number, value))
+                hand = dice.get(player, [])
+                action = {"bid": BID, "invalid_bid": INVALID, "challenge": CHALLENGE}[kind]
+                row = {
+                    "game": game, "round": round, "seat": seat[player], "model": models[seat[player]], "action": action,
+                    "number": number, "value": value, "own": hand.count(value),
+                    "unknown": sum(len(d) for name, d in dice.items() if name != player),
+                    "actual": sum(d.count(value) for d in dice.values()), "local": local.pop(player, LOCAL_NONE),
+                }
+                for name, column in self.turns.items():
+                    column.append(row[name])
+            elif kind == "death":
+                place[e["player"]] = e.get("place") or len(dice)     # 每轮至多一人死亡，名次即本轮开始时的存活人数
+                died[e["player"]] = round
+        place[end["winner"]] = 1
+        rounds = end.get("rounds") or round
+
+        for column, value in (("seed", seed), ("id", game_id), ("players", len(seat)), ("rounds", rounds), ("winner", seat[end["winner"]])):
+            self.games[column].append(value)
+        for name, i in seat.items():
+            for column, value in (("game", game), ("seat", i), ("model", models[i]),
+                                  ("place", place.get(name, len(seat))), ("survived", died.get(name, rounds))):
+                self.seats[column].append(value)
+        return True
+
+    def build(self) -> ResultStore:
+        def columns(table: Dict[str, list], dtypes: Dict[str, Any]) -> Dict[str, np.ndarray]:
+            return {name: np.array(values, dtype=dtypes[name]) for name, values in table.items()}
+
+        return ResultStore(columns(self.turns, TURN_COLUMNS), columns(self.games, GAME_COLUMNS),
+                           columns(self.seats, SEAT_COLUMNS), list(self.models))
+
+def split_games(events: Iterable[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+    """把事件流按 game_start 切分成一局一局"""
+    game: List[Dict[str, Any]] = []
+    for event in events:
+        if event["type"] == "game_start" and game:
+            yield game
+            game = []
+        game.append(event)
+    if game:
+        yield game
+
+def record_events(path: str) -> List[Dict[str, Any]]:
+    """离线回放对局记录，得到它的事件"""
+    from src.replay import load_record, replay_game
+
+    sink = MemorySink()
+    replay_game(load_record(path), events=EventLog([sink]))
+    return sink.events
+
+# 文本日志的解析规则（与 events.TextLogSink 及旧版本引擎的日志文本对应）
+_LINE = re.compile(r"^\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d+ - [A-Z]+ - ")
+_PATTERNS = [
+    ("game_start", re.compile(r"^游戏开始(?:，随机种子：(?P<seed>\d+))?(?:，对局ID：(?P<game_id>\w+))?$")),
+    ("player", re.compile(r"^玩家：(?P<player>.+?)，模型：(?P<model>.+)$")),
+    ("roll", re.compile(r"^第(?P<round>\d+)轮开始")),
+    ("first", re.compile(r"^本轮从(?P<player>.+?)开始$")),
+    ("shortcut", re.compile(r"^(?P<player>.+?) 本回合无需LLM决策")),
+    ("repair", re.compile(r"^(?P<player>.+?) 行动不合法（.*），已按 (?P<policy>\w+) 策略修正为")),
+    ("bid", re.compile(r"^(?P<player>.+?) 叫点：(?P<number>\d+)个(?P<value>-?\d+)点。")),
+    ("invalid", re.compile(r"^(?P<player>.+?) 叫点不合法。$")),
+    ("challenge", re.compile(r"^(?P<player>.+?) 质疑上家。")),
+    ("death", re.compile(r"^💀 (?P<player>.+?) 已经死亡。$")),
+    ("game_end", re.compile(r"^游戏结束，(?P<player>.+?) 获胜！$")),
+]
+_DICE = re.compile(r"玩家：(?P<player>.+?) 骰子：\[(?P<dice>[\d, ]*)\] 毒药: (?P<poison>\d+)瓶")
+
+def _log_messages(path: str) -> Iterator[str]:
+    """按时间戳前缀把文本日志拼成一条条（可能多行的）消息"""
+    message = None
+    with open_text(path, "r") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if match := _LINE.match(line):
+                if message is not None:
+                    yield message
+                message = line[match.end():]
+            elif message is not None:
+                message += "\n" + line
+    if message is not None:
+        yield message
+
+def log_events(path: str) -> List[Dict[str, Any]]:
+    """从文本日志尽力重建事件（只包含统计需要的字段）"""
+    events: List[Dict[str, Any]] = []
+    start = None
+    round = 0
+    for message in _log_messages(path):
+        for kind, pattern in _PATTERNS:
+            if match := pattern.match(message):
+                break
+        else:
+            continue
+        g = match.groupdict()
+        if kind == "game_start":
+            start = {"type": "game_start", "seed": int(g["seed"]) if g["seed"] else None, "game_id": g["game_id"], "players": []}
+            events.append(start)
+        elif start is None:
+            continue
+        elif kind == "player":
+            start["players"].append({"name": g["player"], "model": g["model"], "human": g["model"] == "人类"})
+        elif kind == "roll":
+            round = int(g["round"])
+            dice = {m["player"]: [int(d) for d in m["dice"].split(",") if d.strip()] for m in _DICE.finditer(message)}
+            events.append({"type": "roll", "round": round, "dice": dice})
+        elif kind in ("shortcut", "repair", "death"):
+            events.append({"type": kind, "round": round, "player": g["player"]})
+        elif kind == "bid":
+            events.append({"type": "bid", "round": round, "player": g["player"], "number": int(g["number"]), "value": int(g["value"])})
+        elif kind == "invalid" and events and events[-1]["type"] == "bid" and events[-1]["player"] == g["player"]:
+            events[-1]["type"] = "invalid_bid"
+        elif kind == "challenge":
+            last = next((e for e in reversed(events) if e["type"] == "bid" and e["round"] == round), None)
+            events.append({"type": "challenge", "round": round, "player": g["player"],
+                           "number": last["number"] if last else 0, "value": last["value"] if last else 0})
+        elif kind == "game_end":
+            events.append({"type": "game_end", "winner": g["player"], "rounds": round})
+    return events
+
+def _files(paths: Iterable[str]) -> Iterator[str]:
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                yield from (os.path.join(root, name) for name in sorted(names))
+        else:
+            yield path
+
+def ingest(paths: Iterable[str], store: ResultStore | None = None) -> tuple[ResultStore, Dict[str, int]]:
+    """
+    导入事件日志、对局记录和文本日志
+    Returns:
+        (合并后的存储, {"files", "games", "skipped", "failed", "clamped"})
+    """
+    builder = StoreBuilder(store.game_keys() if store is not None else ())
+    stats = {"files": 0, "games": 0, "skipped": 0, "failed": 0, "clamped": 0}
+    for path in _files(paths):
+        name = os.path.basename(path)
+        try:
+            if re.search(r"\.jsonl(\.gz|\.zst)?$", name):
+                games = split_games(load_events(path))
+            elif re.search(r"\.json(\.gz)?$", name):
+                games = [record_events(path)]
+            elif re.search(r"\.log(\.gz|\.zst)?$", name):
+                games = split_games(log_events(path))
+            else:
+                continue
+            stats["files"] += 1
+            for events in games:
+                stats["games"] += builder.add_game(events)
+        except Exception as e:
+            stats["failed"] += 1
+            print(f"{path}: 导入失败：{str(e)}")
+    stats["skipped"] = builder.skipped
+    stats["clamped"] = builder.clamped
+    result = builder.build()
+    return (store.concat(result) if store is not None else result), stats
+
+def bid_probability(own: np.ndarray, number: np.ndarray, unknown: np.ndarray) -> np.ndarray:
+    """向量化计算：从叫点者的视角，“至少 number 个”成立的概率"""
+    max_unknown = int(unknown.max()) if len(unknown) else 0
+    tail = np.array(BidProbability(max_unknown).tail)
+    needed = number.astype(np.int64) - own
+    prob = tail[unknown, np.clip(needed, 0, max_unknown + 1)]
+    return np.where(needed <= 0, 1.0, np.where(needed > unknown, 0.0, prob))
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, numerator / np.maximum(denominator, 1), np.nan)
+
+def _float(x) -> float | None:
+    """NaN（分母为0）转换为None"""
+    return None if np.isnan(x) else float(x)
+
+def summarize(store: ResultStore, include_local: bool = False) -> Dict[str, Any]:
+    """计算各模型、各座位与各模型对阵的统计"""
+    t, s = store.turns, store.seats
+    n_models = max(len(store.models), 1)
+    behaviour = np.ones(len(t["model"]), dtype=bool) if include_local else t["local"] == LOCAL_NONE
+    bids = behaviour & (t["action"] == BID)
+    challenges = behaviour & (t["action"] == CHALLENGE)
+    prob = bid_probability(t["own"][bids], t["number"][bids], t["unknown"][bids])
+
+    def per_model(mask: np.ndarray, weights: np.ndarray | None = None) -> np.ndarray:
+        return np.bincount(t["model"][mask], weights=weights, minlength=n_models)
+
+    bid_count = per_model(bids)
+    challenge_count = per_model(challenges)
+    games = np.bincount(s["model"], minlength=n_models)
+    wins = np.bincount(s["model"], weights=s["place"] == 1, minlength=n_models)
+    models = {
+        model: {
+            "games": int(games[i]),
+            "win_rate": _float(_ratio(wins, games)[i]),
+            "mean_place": _float(_ratio(np.bincount(s["model"], weights=s["place"], minlength=n_models), games)[i]),
+            "turns": int(per_model(behaviour)[i]),
+            "bids": int(bid_count[i]),
+            "bluff_rate": _float(_ratio(per_model(bids, prob < BLUFF_THRESHOLD), bid_count)[i]),
+            "false_bid_rate": _float(_ratio(per_model(bids, t["actual"][bids] < t["number"][bids]), bid_count)[i]),
+            "aggressiveness": _float(_ratio(per_model(bids, 1.0 - prob), bid_count)[i]),
+            "challenges": int(challenge_count[i]),
+            "challenge_accuracy": _float(_ratio(per_model(challenges, t["actual"][challenges] < t["number"][challenges]), challenge_count)[i]),
+            "invalid_rate": _float(_ratio(per_model(behaviour & (t["action"] == INVALID)), per_model(behaviour))[i]),
+        }
+        for i, model in enumerate(store.models)
+    }
+
+    n_seats = int(s["seat"].max()) + 1 if len(s["seat"]) else 0
+    seat_games = np.bincount(s["seat"], minlength=n_seats)
+    seats = [
+        {
+            "seat": i + 1,
+            "win_rate": _float(_ratio(np.bincount(s["seat"], weights=s["place"] == 1, minlength=n_seats), seat_games)[i]),
+            "mean_place": _float(_ratio(np.bincount(s["seat"], weights=s["place"], minlength=n_seats), seat_games)[i]),
+            "mean_survived": _float(_ratio(np.bincount(s["seat"], weights=s["survived"], minlength=n_seats), seat_games)[i]),
+        }
+        for i in range(n_seats)
+    ]
+
+    # 对阵：同一局中任意两个座位，座位表按对局排序后用错位比较代替自连接
+    order = np.argsort(s["game"], kind="stable")
+    game, model, place = s["game"][order], s["model"][order], s["place"][order]
+    ahead = np.zeros((n_models, n_models))
+    met = np.zeros((n_models, n_models))
+    for offset in range(1, int(store.games["players"].max()) if len(store) else 1):
+        same = game[offset:] == game[:-offset]
+        a, b = model[:-offset][same], model[offset:][same]
+        a_ahead = place[:-offset][same] < place[offset:][same]
+        np.add.at(met, (a, b), 1)
+        np.add.at(met, (b, a), 1)
+        np.add.at(ahead, (a, b), a_ahead)
+        np.add.at(ahead, (b, a), ~a_ahead)
+    pairing = _ratio(ahead, met)
+    pairings = [
+        {"model": store.models[i], "opponent": store.models[j], "games": int(met[i, j]), "ahead_rate": _float(pairing[i, j])}
+        for i in range(len(store.models)) for j in range(len(store.models)) if i != j and met[i, j]
+    ]
+
+    return {
+        "games": len(store),
+        "turns": len(t["model"]),
+        "mean_rounds": float(store.games["rounds"].mean()) if len(store) else None,
+        "models": models,
+        "seats": seats,
+        "pairings": pairings,
+    }
+
+def print_summary(summary: Dict[str, Any]):
+    def pct(x: float | None) -> str:
+        return "-" if x is None else f"{x:.1%}"
+
+    def num(x: float | None, spec: str) -> str:
+        return "-" if x is None else format(x, spec)
+
+    print(f"对局{summary['games']}局，回合{summary['turns']}个，平均{summary['mean_rounds'] or 0:.2f}轮")
+    print(f"\n{'模型':<28}{'局数':>6}{'胜率':>8}{'平均名次':>8}{'叫点':>7}{'虚张':>8}{'叫点不成立':>10}{'激进':>7}{'质疑':>6}{'质疑准确':>9}{'非法':>7}")
+    for model, m in summary["models"].items():
+        print(f"{model:<30}{m['games']:>6}{pct(m['win_rate']):>9}{num(m['mean_place'], '>9.2f'):>9}{m['bids']:>9}{pct(m['bluff_rate']):>9}"
+              f"{pct(m['false_bid_rate']):>12}{num(m['aggressiveness'], '>9.3f'):>9}{m['challenges']:>8}{pct(m['challenge_accuracy']):>11}{pct(m['invalid_rate']):>9}")
+    print("\n座位  胜率     平均名次  平均存活轮数")
+    for seat in summary["seats"]:
+        print(f"{seat['seat']:>3}号 {pct(seat['win_rate']):>7} {num(seat['mean_place'], '>9.2f')} {num(seat['mean_survived'], '>12.2f')}")
+    if summary["pairings"]:
+        print("\n对阵（前者名次高于后者的比例）")
+        for p in summary["pairings"]:
+            print(f"  {p['model']} vs {p['opponent']}: {pct(p['ahead_rate'])}（{p['games']}次同场）")
+
+def synthetic_store(turns: int, players: int = 4, models: int = 4, seed: int = 0) -> ResultStore:
+    """生成指定回合数的随机存储，用于测试聚合的速度"""
+    rng = np.random.default_rng(seed)
+    games = max(turns // 40, 1)
+    seats = games * players
+    place = np.argsort(rng.random((games, players)), axis=1).astype(np.int16) + 1
+    unknown = rng.integers(1, players, turns) * DICE_PER_PLAYER
+    return ResultStore(
+        {
+            "game": rng.integers(0, games, turns, dtype=np.int32), "round": rng.integers(1, 8, turns, dtype=np.int16),
+            "seat": rng.integers(0, players, turns, dtype=np.int16), "model": rng.integers(0, models, turns, dtype=np.int16),
+            "action": rng.choice(np.array([BID, CHALLENGE, INVALID], dtype=np.int8), turns, p=[0.8, 0.18, 0.02]),
+            "number": rng.integers(1, 12, turns, dtype=np.int16), "value": rng.integers(1, 7, turns, dtype=np.int16),
+            "own": rng.integers(0, 4, turns, dtype=np.int16), "unknown": unknown.astype(np.int16),
+            "actual": rng.integers(0, 10, turns, dtype=np.int16), "local": np.zeros(turns, dtype=np.int8),
+        },
+        {
+            "seed": np.arange(games, dtype=np.int64), "id": np.full(games, ""), "players": np.full(games, players, dtype=np.int16),
+            "rounds": rng.integers(4, 10, games, dtype=np.int16), "winner": np.argmin(place, axis=1).astype(np.int16),
+        },
+        {
+            "game": np.repeat(np.arange(games, dtype=np.int32), players), "seat": np.tile(np.arange(players, dtype=np.int16), games),
+            "model": rng.integers(0, models, seats, dtype=np.int16), "place": place.ravel(),
+            "survived": rng.integers(1, 10, seats, dtype=np.int16),
+        },
+        [f"model-{i}" for i in range(models)],
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="锦标赛结果分析")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("ingest", help="导入事件日志、对局记录或文本日志")
+    p.add_argument("paths", nargs="+", help="文件或目录（.jsonl[.gz|.zst]、.json[.gz]、.log[.gz]）")
+    p.add_argument("-o", "--output", required=True, help="列式存储文件（.npz），已存在时追加")
+    p = sub.add_parser("report", help="计算并打印统计")
+    p.add_argument("store", help="ingest 生成的 .npz 文件")
+    p.add_argument("--include-local", action="store_true", help="把本地短路/修正的回合计入模型的行为统计")
+    p.add_argument("--json", type=str, default=None, metavar="PATH", help="同时把统计写成JSON")
+    p = sub.add_parser("bench", help="在随机生成的数据上测试聚合速度")
+    p.add_argument("--turns", type=int, default=1000000, help="回合数")
+    args = parser.parse_args()
+
+    if args.command == "ingest":
+        start_time = time.perf_counter()
+        store = ResultStore.load(args.output) if os.path.exists(args.output) else None
+        store, stats = ingest(args.paths, store)
+        store.save(args.output)
+        print(f"读取{stats['files']}个文件，导入{stats['games']}局（跳过未完成或重复的{stats['skipped']}局，"
+              f"截断超范围叫点{stats['clamped']}个，失败{stats['failed']}个文件），"
+              f"共{len(store)}局、{len(store.turns['model'])}个回合，耗时{time.perf_counter() - start_time:.2f}s")
+    elif args.command == "report":
+        store = ResultStore.load(args.store)
+        summary = summarize(store, include_local=args.include_local)
+        print_summary(summary)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(summary, f, ensure_ascii=False, indent=2)
+    else:
+        store = synthetic_store(args.turns)
+        start_time = time.perf_counter()
+        summary = summarize(store)
+        elapsed = time.perf_counter() - start_time
+        print(f"{len(store)}局、{summary['turns']}个回合，聚合耗时{elapsed:.3f}s")
+
+if __name__ == "__main__":
+    main()
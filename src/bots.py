@@ -0,0 +1,70 @@
+"""
+基于规则的机器人玩家
+
+不调用任何LLM，按精确的叫点成立概率决策，单次决策只需几微秒，可作为廉价的陪练对手。
+策略参数与 src/simulator.py 中的参数化策略相同：
+    challenge_threshold: 上家叫点成立的概率低于该值时质疑
+    bid_confidence: 只在叫点成立概率不低于该值时加注（否则质疑）
+    bluff_rate: 随机选择点数加注（虚张声势）的概率
+"""
+
+import random
+from typing import Any, Dict, Sequence
+
+from src.probability import get_bid_probability
+from src.snippets import *
+
+class RuleBasedBot:
+    def __init__(self, challenge_threshold: float = 0.4, bid_confidence: float = 0.5, bluff_rate: float = 0.1):
+        self.challenge_threshold = challenge_threshold
+        self.bid_confidence = bid_confidence
+        self.bluff_rate = bluff_rate
+        self._quantiles: Dict[int, int] = {}     # 未知骰子数 -> 以 bid_confidence 能确信“至少有”的数量
+
+    def _quantile(self, unknown: int) -> int:
+        if (q := self._quantiles.get(unknown)) is None:
+            table = get_bid_probability(unknown)
+            q = max(k for k in range(unknown + 1) if table.at_least(k, unknown) >= self.bid_confidence)
+            self._quantiles[unknown] = q
+        return q
+
+    def decide(self, dice: Sequence[int], number: int, value: int, unknown: int, is_first: bool, rng: random.Random) -> Dict[str, Any]:
+        """
+        根据自己的骰子、当前叫点和未知骰子数做出决策
+        Returns:
+            与 Player.get_ai_action 相同格式的决策字典
+        """
+        table = get_bid_probability(unknown)
+        q = self._quantile(unknown)
+        candidates = [
+            (dice.count(v) + q - n, dice.count(v), v, n)
+            for n, v in table.min_raises(number, value)
+        ]
+        bluff = rng.random() < self.bluff_rate
+        slack, _, bid_value, bid_number = rng.choice(candidates) if bluff else max(candidates)
+
+        if not is_first and number > 0:
+            p_true = table.bid_true(dice, number, value, unknown)
+            if p_true < self.challenge_threshold or (slack < 0 and not bluff):
+                return {
+                    "challenge": True,
+                    "value": 0,
+                    "number": 0,
+                    "reason": f"上家叫点成立的概率只有{p_true:.0%}。",
+                    "behaviour": "敲了敲桌子：“我不信。”",
+                }
+
+        return {
+            "challenge": False,
+            "value": bid_value,
+            "number": bid_number,
+            "reason": f"叫点成立的概率约为{table.bid_true(dice, bid_number, bid_value, unknown):.0%}。",
+            "behaviour": "语气平稳地报出叫点。" if not bluff else "故作镇定地报出叫点。",
+        }
+
+def create_bot(model: str) -> RuleBasedBot:
+    """按 snippets.bot_models 中的配置创建机器人"""
+    try:
+        return RuleBasedBot(**bot_models[model])
+    except KeyError:
+        raise ValueError(f"不支持的机器人: {model}")
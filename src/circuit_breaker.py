@@ -0,0 +1,236 @@
+"""
+按模型的熔断器与自动切换备用模型
+
+供应商故障时，每局游戏都会各自重试4次再失败。熔断器在最近若干次调用的错误率或慢调用比例
+超过阈值时打开，打开期间直接拒绝请求（或切换到 snippets.model_fallbacks 中配置的备用模型），
+冷却时间过后进入半开状态，放行少量探测请求，探测成功则关闭、失败则重新打开。
+所有对局共享同一组熔断器。只有供应商侧的故障（5xx、429、超时、连接错误）计为失败；
+耗时只计网络请求本身，不含在本地限流器中等待的时间。
+"""
+
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict
+
+from openai import APIConnectionError
+
+from src.snippets import *
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# 熔断器参数，可在创建熔断器前通过 configure 调整
+_config = {
+    "enabled": False,
+    "window": 20,               # 统计最近多少次调用
+    "min_calls": 5,             # 窗口内至少有多少次调用才判断是否熔断
+    "error_rate": 0.5,          # 错误率达到该值时打开
+    "slow_call_seconds": None,  # 超过该耗时的调用视为慢调用，None 表示不按延迟熔断
+    "slow_rate": 0.5,           # 慢调用比例达到该值时打开
+    "open_seconds": 30.0,       # 打开后多久进入半开状态
+    "half_open_probes": 2,      # 半开状态下连续成功多少次探测后关闭
+}
+
+_lock = threading.Lock()
+_breakers: Dict[str, "CircuitBreaker"] = {}
+
+class CircuitOpenError(LLMRateLimitError):
+    """熔断器打开且没有可用的备用模型，retry_after 为距离半开的剩余秒数"""
+
+class CircuitBreaker:
+    def __init__(self, name: str, window: int = 20, min_calls: int = 5, error_rate: float = 0.5,
+                 slow_call_seconds: float | None = None, slow_rate: float = 0.5, open_seconds: float = 30.0,
+                 half_open_probes: int = 2):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.transitions = Counter()    # 状态切换次数，如 {"open": 2, "closed": 1}
+        self._calls = deque(maxlen=window)  # (是否失败, 是否慢调用)
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+
+    def _transition(self, state: str):
+        self.state = state
+        self.transitions[state] += 1
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        self._calls.clear()
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+
+    def allow(self) -> bool:
+        """是否放行一次调用；半开状态下同时只放行 half_open_probes 个探测请求"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return True
+            return False
+
+    def retry_after(self) -> float:
+        """距离进入半开状态的剩余秒数"""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.open_seconds - (time.monotonic() - self.opened_at))
+
+    def record(self, success: bool, latency: float):
+        """记录一次调用的结果与耗时"""
+        slow = self.slow_call_seconds is not None and latency >= self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if not success or slow:
+                    self._transition(OPEN)
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self._transition(CLOSED)
+                return
+            if self.state == OPEN:
+                return
+            self._calls.append((not success, slow))
+            if len(self._calls) < self.min_calls:
+                return
+            failures = sum(failed for failed, _ in self._calls) / len(self._calls)
+            slows = sum(slow for _, slow in self._calls) / len(self._calls)
+            if failures >= self.error_rate or (self.slow_call_seconds is not None and slows >= self.slow_rate):
+                self._transition(OPEN)
+
+def configure(enabled: bool | None = None, **kwargs):
+    """启用熔断器并设置参数（只影响之后创建的熔断器），参数名见 _config"""
+    with _lock:
+        if enabled is not None:
+            _config["enabled"] = enabled
+        for key, value in kwargs.items():
+            if key not in _config:
+                raise ValueError(f"未知的熔断器参数: {key}")
+            _config[key] = value
+
+def is_enabled() -> bool:
+    return _config["enabled"]
+
+def get_breaker(model: str) -> CircuitBreaker:
+    """获取模型共享的熔断器"""
+    with _lock:
+        if model not in _breakers:
+            params = {key: value for key, value in _config.items() if key != "enabled"}
+            _breakers[model] = CircuitBreaker(model, **params)
+        return _breakers[model]
+
+def summary() -> Dict[str, Dict[str, int]]:
+    """各模型熔断器的状态切换次数"""
+    with _lock:
+        return {model: dict(breaker.transitions) for model, breaker in _breakers.items() if breaker.transitions}
+
+def is_provider_failure(e: Exception) -> bool:
+    """
+    是否为供应商侧的故障；400 等调用方错误说明供应商在正常应答，不应让熔断器打开
+    """
+    if isinstance(e, (LLMRateLimitError, APIConnectionError, TimeoutError, ConnectionError)):
+        return True     # APIConnectionError 包括 APITimeoutError
+    status = getattr(e, "status_code", None) or getattr(e, "code", None)     # openai 与 google 的错误分别用 status_code 和 code
+    return isinstance(status, int) and (status >= 500 or status == 429)
+
+def _latency(result, start: float) -> float:
+    """客户端给出的网络耗时（不含限流等待），没有时用包括等待在内的总耗时"""
+    latency = getattr(result, "latency", None)
+    return latency if latency is not None else time.perf_counter() - start
+
+class FailoverLLMClient:
+    """
+    在主模型与备用模型的客户端外加熔断器：主模型熔断或调用失败时改用备用模型，
+    接口与 OpenAILLMClient/GoogleLLMClient 相同；返回的 LLMResponse.model 为实际应答的模型
+    """
+
+    def __init__(self, primary, fallback=None):
+        self.clients = [primary] + ([fallback] if fallback is not None else [])
+        self.model = primary.model
+        self.answered = Counter()       # 各模型实际应答的次数
+        self._lock = threading.Lock()
+
+    def _candidates(self):
+        for client in self.clients:
+            breaker = get_breaker(client.model)
+            if breaker.allow():
+                yield client, breaker
+
+    def _unavailable(self, error: Exception | None) -> Exception:
+        if error is not None:
+            return error
+        retry_after = min(get_breaker(client.model).retry_after() for client in self.clients)
+        return CircuitOpenError(f"模型 {self.model} 的熔断器已打开", retry_after=retry_after or None)
+
+    def _answered(self, client):
+        with self._lock:
+            self.answered[client.model] += 1
+
+    def _call(self, method: str, *args):
+        error = None
+        for client, breaker in self._candidates():
+            start = time.perf_counter()
+            try:
+                result = getattr(client, method)(*args)
+            except Exception as e:
+                # 调用方错误按成功记录（供应商正常应答，半开状态的探测名额也随之释放）；
+                # 失败时的耗时可能含限流等待，不参与慢调用判断
+                breaker.record(not is_provider_failure(e), 0.0)
+                error = e
+                continue
+            breaker.record(True, _latency(result, start))
+            self._answered(client)
+            return result
+        raise self._unavailable(error)
+
+    async def _acall(self, method: str, *args):
+        error = None
+        for client, breaker in self._candidates():
+            start = time.perf_counter()
+            try:
+                result = await getattr(client, method)(*args)
+            except Exception as e:
+                # 调用方错误按成功记录（供应商正常应答，半开状态的探测名额也随之释放）；
+                # 失败时的耗时可能含限流等待，不参与慢调用判断
+                breaker.record(not is_provider_failure(e), 0.0)
+                error = e
+                continue
+            breaker.record(True, _latency(result, start))
+            self._answered(client)
+            return result
+        raise self._unavailable(error)
+
+    def chat(self, messages):
+        return self._call("chat", messages)
+
+    async def achat(self, messages):
+        return await self._acall("achat", messages)
+
+    def reflect(self, messages, other_players):
+        return self._call("reflect", messages, other_players)
+
+    async def areflect(self, messages, other_players):
+        return await self._acall("areflect", messages, other_players)
+
+    @property
+    def usage_totals(self) -> Dict[str, int]:
+        totals = Counter()
+        for client in self.clients:
+            totals.update(client.usage_totals)
+        return dict(totals)
+
+    @property
+    def timing_totals(self) -> Dict[str, float]:
+        totals = Counter()
+        for client in self.clients:
+            totals.update(getattr(client, "timing_totals", {}))
+        return {"streams": 0, "ttft": 0.0, "ttva": 0.0, "early_stops": 0, **totals}
@@ -0,0 +1,140 @@
+"""
+进程级的LLM客户端注册表
+
+同一个 (供应商, base_url, api_key) 在进程内只创建一个底层客户端，所有玩家共享其
+keep-alive 连接池，避免每局重复解析 config/keys.json 和重新进行 TLS 握手。
+"""
+
+import asyncio
+import json
+import os
+import threading
+import weakref
+from typing import Dict, Iterable, Tuple
+
+import httpx
+from google import genai
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+
+from src.snippets import *
+
+KEYS_PATH = "config/keys.json"
+
+_lock = threading.Lock()
+_keys_cache: Tuple[float | None, Dict[str, str]] | None = None    # (文件修改时间, 配置内容)，文件不存在时修改时间为None
+_clients: Dict[tuple, object] = {}
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[tuple, AsyncOpenAI]]" = weakref.WeakKeyDictionary()
+
+# 连接池参数，可在创建客户端前通过 configure 调整
+_pool_limits = {
+    "max_connections": 100,
+    "max_keepalive_connections": 20,
+    "keepalive_expiry": 60.0,
+}
+
+def configure(max_connections: int | None = None, max_keepalive_connections: int | None = None, keepalive_expiry: float | None = None):
+    """设置之后新建客户端的连接池大小"""
+    with _lock:
+        if max_connections is not None:
+            _pool_limits["max_connections"] = max_connections
+        if max_keepalive_connections is not None:
+            _pool_limits["max_keepalive_connections"] = max_keepalive_connections
+        if keepalive_expiry is not None:
+            _pool_limits["keepalive_expiry"] = keepalive_expiry
+
+def load_keys() -> Dict[str, str]:
+    """读取 config/keys.json，文件未修改时直接返回缓存；文件不存在时返回空字典（如只使用桩服务器和规则机器人）"""
+    global _keys_cache
+    try:
+        mtime = os.path.getmtime(KEYS_PATH)
+    except FileNotFoundError:
+        mtime = None
+    with _lock:
+        if _keys_cache is None or _keys_cache[0] != mtime:
+            if mtime is None:
+                _keys_cache = (None, {})
+            else:
+                with open(KEYS_PATH, 'r', encoding='utf-8') as f:
+                    _keys_cache = (mtime, json.load(f))
+        return _keys_cache[1]
+
+def get_api_key(model: str) -> str | None:
+    """获取模型对应的API密钥"""
+    try:
+        key_name = model_to_key_name[model]
+    except KeyError:
+        raise ValueError("不支持的LLM供应商！")
+    return load_keys().get(key_name) or default_api_keys.get(key_name)
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(**_pool_limits)
+
+def get_openai_client(base_url: str, api_key: str) -> OpenAI:
+    """获取共享的同步 OpenAI 客户端"""
+    key = ("OpenAI", base_url, api_key)
+    with _lock:
+        if (client := _clients.get(key)) is None:
+            client = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=DefaultHttpxClient(limits=_limits())
+            )
+            _clients[key] = client
+        return client
+
+def get_async_openai_client(base_url: str, api_key: str) -> AsyncOpenAI:
+    """获取共享的异步 OpenAI 客户端（异步连接池与事件循环绑定，因此按事件循环分别缓存）"""
+    loop = asyncio.get_running_loop()
+    key = ("OpenAI", base_url, api_key)
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        if (client := clients.get(key)) is None:
+            client = AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=DefaultAsyncHttpxClient(limits=_limits())
+            )
+            clients[key] = client
+        return client
+
+def get_genai_client(api_key: str) -> genai.Client:
+    """获取共享的 genai 客户端（同时提供同步与 aio 接口）"""
+    key = ("Google", None, api_key)
+    with _lock:
+        if (client := _clients.get(key)) is None:
+            client = genai.Client(api_key=api_key)
+            _clients[key] = client
+        return client
+
+def prewarm(models: Iterable[str]):
+    """在第一局开始前为每个供应商建立连接（完成DNS解析与TLS握手），失败不影响后续使用"""
+    warmed = set()
+    for model in models:
+        api = model_to_API.get(model)
+        if api == "OpenAI":
+            base_url, api_key = model_to_url[model], get_api_key(model)
+            if (base_url, api_key) in warmed:
+                continue
+            warmed.add((base_url, api_key))
+            try:
+                get_openai_client(base_url, api_key).models.list()
+            except Exception:
+                pass
+        elif api == "Google":
+            api_key = get_api_key(model)
+            if (model, api_key) in warmed:
+                continue
+            warmed.add((model, api_key))
+            try:
+                get_genai_client(api_key).models.get(model=model)
+            except Exception:
+                pass
+
+def close_all():
+    """关闭所有同步客户端的连接池"""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        if isinstance(client, OpenAI):
+            client.close()
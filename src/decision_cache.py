@@ -0,0 +1,119 @@
+"""
+局面决策缓存
+
+锦标赛中大量决策会重复出现（如第一轮首家叫点：骰子已排序，对其他玩家的看法都是初始值）。
+以规范化后的局面为键缓存LLM给出的决策，每个键最多保存 k 个不同的采样结果，
+集满后从中随机挑选，既减少调用次数又保留对局的多样性。
+局面中的玩家按相对座位表示，不同座位、不同名字的玩家可以共用缓存。
+缓存保存在本地 SQLite 文件中，按最近使用时间（LRU）淘汰。
+"""
+
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Sequence
+
+class DecisionCache:
+    def __init__(self, path: str = "logs/decision_cache.sqlite", max_entries: int = 100000, samples_per_key: int = 3):
+        """
+            path: SQLite 文件路径，":memory:" 表示仅在内存中缓存
+            max_entries: 最多缓存的局面数，超出后淘汰最久未使用的局面
+            samples_per_key: 每个局面最多保存的决策采样数
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.samples_per_key = samples_per_key
+        self.hits = 0
+        self.misses = 0
+        self._draws: Dict[str, int] = {}     # 键 -> 本进程中的命中次数，用于派生采样的随机数
+        self._lock = threading.Lock()
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS states (key TEXT PRIMARY KEY, last_used REAL NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS samples (key TEXT NOT NULL, action TEXT NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS samples_key ON samples (key)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS states_last_used ON states (last_used)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM states").fetchone()[0]
+
+    @staticmethod
+    def make_key(model: str, prompt_layout: str, is_first: bool, dice: Sequence[int], poison: Sequence[int],
+                 bid_history: Sequence[tuple[int, int, int]], opinions: Dict[int, str], extra_hint: str = "") -> str:
+        """
+        规范化局面并生成缓存键；玩家用相对座位（自己为0，下家为1，依此类推）表示，
+        不同座位、不同名字的玩家遇到相同的局面时共用同一个键
+            poison: 从自己开始按座位顺序排列的存活玩家剩余毒药数
+            bid_history: 本轮已发生的叫点 (相对座位, 数量, 点数)
+            opinions: 对其他存活玩家（相对座位）的看法，只参与哈希
+        """
+        opinions_hash = hashlib.sha256(
+            json.dumps(sorted(opinions.items()), ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+        state = [model, prompt_layout, is_first, sorted(dice), list(poison),
+                 [list(b) for b in bid_history], opinions_hash, extra_hint]
+        return hashlib.sha256(json.dumps(state, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def _samples(self, key: str) -> List[str]:
+        return [row[0] for row in self._conn.execute("SELECT action FROM samples WHERE key = ?", (key,))]
+
+    def lookup(self, key: str) -> Dict[str, Any] | None:
+        """
+        采样数已满时随机返回其中一个决策，否则返回None（需要调用LLM补充采样）
+        采样用由键和该键的命中次数派生的随机数生成器，不消耗玩家或对局的随机数，
+        启用缓存与否不会改变对局中其他随机决策的序列
+        """
+        with self._lock:
+            samples = self._samples(key)
+            if len(samples) < self.samples_per_key:
+                self.misses += 1
+                return None
+            self.hits += 1
+            draw = self._draws[key] = self._draws.get(key, 0) + 1
+            self._conn.execute("UPDATE states SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return json.loads(random.Random(f"{key}:{draw}").choice(samples))
+
+    def add(self, key: str, action: Dict[str, Any]):
+        """为局面添加一个决策采样"""
+        with self._lock:
+            if len(self._samples(key)) >= self.samples_per_key:
+                return
+            cursor = self._conn.execute(
+                "INSERT INTO states (key, last_used) VALUES (?, ?) ON CONFLICT(key) DO NOTHING",
+                (key, time.time())
+            )
+            if cursor.rowcount:
+                self._count += 1
+            else:
+                self._conn.execute("UPDATE states SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.execute("INSERT INTO samples (key, action) VALUES (?, ?)", (key, json.dumps(action, ensure_ascii=False)))
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """超出容量时按LRU淘汰，一次淘汰10%以减少淘汰频率"""
+        if self._count <= self.max_entries:
+            return
+        excess = self._count - self.max_entries + max(1, self.max_entries // 10)
+        stale = [row[0] for row in self._conn.execute(
+            "SELECT key FROM states ORDER BY last_used LIMIT ?", (excess,)
+        )]
+        self._conn.executemany("DELETE FROM samples WHERE key = ?", [(key,) for key in stale])
+        self._conn.executemany("DELETE FROM states WHERE key = ?", [(key,) for key in stale])
+        for key in stale:
+            self._draws.pop(key, None)
+        self._count -= len(stale)
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,213 @@
+"""
+结构化的对局事件流
+
+引擎把对局中发生的事（开局、摇骰、叫点、非法叫点、质疑、开盅、喝毒药、死亡、反思、LLM调用等）
+作为带类型字段的事件发出，由若干个 sink 消费：
+    JsonlSink   写成紧凑的JSONL，路径以 .gz 结尾时用gzip压缩，以 .zst 结尾时用zstd压缩（需要安装 zstandard）
+    TextLogSink 把事件渲染成原来的中文文本日志
+所有事件都有 ts（时间戳）、type（事件类型），对局内的事件还有 round（轮次）；
+构造 EventLog 时传入的上下文字段（如 game=对局编号）会附加到每个事件上。
+
+读取：
+    for event in load_events("logs/events/game_0.jsonl.gz"): ...
+"""
+
+import gzip
+import io
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List
+
+# 事件类型及其字段
+EVENT_TYPES = {
+    "game_start": "seed, game_id, players[{name, model, human}], repair_policy, shortcut_policy, reflection_mode",
+    "roll": "first_player, dice{玩家名: 骰子}, poison{玩家名: 剩余毒药}",
+    "shortcut": "player, challenge — 本回合在本地决策，未询问LLM",
+    "repair": "player, policy, original{challenge, number, value}, repaired{challenge, number, value}",
+    "bid": "player, number, value, reason, behaviour, reasoning",
+    "invalid_bid": "player, number, value, reason, behaviour, reasoning, error(value_range/not_higher/empty)",
+    "challenge": "player, target, number, value, reason, behaviour, reasoning",
+    "reveal": "dice{玩家名: 骰子}, number, value, total, success, loser",
+    "poison": "player, remaining",
+    "death": "player, place — place 为名次（最后一名为存活人数）",
+    "abort": "reason",
+    "reflection_start": "mode",
+    "reflection_stale": "player — 反思未完成，沿用上一轮的看法行动",
+    "reflection": "player, success, content, reasoning",
+    "llm_call": "player, model, kind, attempt, latency, outcome, usage",
+    "usage": "player, model, usage, answered, timing",
+    "game_end": "winner, rounds, repairs, shortcuts",
+}
+
+def open_text(path: str, mode: str):
+    """按扩展名打开（压缩的）文本文件"""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if path.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError("读写 .zst 压缩文件需要安装 zstandard：pip install zstandard") from e
+        if mode == "w":
+            stream = zstandard.ZstdCompressor().stream_writer(open(path, "wb"), closefd=True)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+class JsonlSink:
+    """把事件逐行写成紧凑的JSON"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open_text(path, "w")
+
+    def write(self, event: Dict[str, Any]):
+        self._file.write(json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def close(self):
+        self._file.close()
+
+def _describe(action: Dict[str, Any]) -> str:
+    return "质疑" if action["challenge"] else f"{action['number']}个{action['value']}点"
+
+def _action_lines(event: Dict[str, Any], verb: str) -> List[tuple[int, str]]:
+    lines = []
+    if event.get("reasoning"):
+        lines.append((logging.INFO, f"🤔 {event['player']} 思考：{event['reasoning']}"))
+    lines.append((logging.INFO, f"{event['player']} {verb}\n理由：{event['reason']}\n行为：{event['behaviour']}"))
+    return lines
+
+def _invalid_bid(event: Dict[str, Any]) -> List[tuple[int, str]]:
+    if event["error"] == "empty":
+        lines = [(logging.INFO, f"🤔 {event['player']} 思考：{event['reasoning']}")] if event.get("reasoning") else []
+        return lines + [(logging.ERROR, f"{event['player']} 行动为空。")]
+    verb = f"叫点：{event['number']}个{event['value']}点。"
+    return _action_lines(event, verb) + [(logging.ERROR, f"{event['player']} 叫点不合法。")]
+
+def _reveal(event: Dict[str, Any]) -> List[tuple[int, str]]:
+    challenger = event["player"]
+    if event["success"]:
+        result = f"✅ {challenger} 质疑成功！{event['loser']} 喝了一瓶毒药。"
+    else:
+        result = f"❌ {challenger} 质疑失败！{challenger} 喝了一瓶毒药。"
+    return [
+        (logging.INFO, f"开盅：共有{event['total']}个{event['value']}点，赌注是{event['number']}个"),
+        (logging.INFO, result),
+    ]
+
+def _reflection(event: Dict[str, Any]) -> List[tuple[int, str]]:
+    if not event["success"]:
+        return [(logging.ERROR, event["content"])]
+    lines = [(logging.INFO, f"{event['player']} 思考：{event['reasoning']}")] if event.get("reasoning") else []
+    return lines + [(logging.INFO, f"{event['player']}: {event['content']}")]
+
+def _usage(event: Dict[str, Any]) -> List[tuple[int, str]]:
+    name, model, usage = event["player"], event["model"], event["usage"]
+    lines = [(logging.INFO,
+              f"{name}({model}) 调用{usage['calls']}次，输入{usage['prompt_tokens']}token"
+              f"（缓存命中{usage['cached_tokens']}），输出{usage['completion_tokens']}token（推理{usage.get('reasoning_tokens', 0)}）")]
+    answered = event.get("answered") or {}
+    if any(m != model for m in answered):
+        lines.append((logging.INFO, f"{name} 实际应答模型：" + "，".join(f"{m} {count}次" for m, count in answered.items())))
+    timing = event.get("timing")
+    if timing and timing["streams"]:
+        lines.append((logging.INFO,
+                      f"{name}({model}) 流式调用{timing['streams']}次，平均首token {timing['ttft'] / timing['streams']:.2f}s，"
+                      f"平均完整决策 {timing['ttva'] / timing['streams']:.2f}s，提前结束{timing['early_stops']}次"))
+    return lines
+
+def _game_end(event: Dict[str, Any]) -> List[tuple[int, str]]:
+    lines = [(logging.INFO, f"游戏结束，{event['winner']} 获胜！")]
+    if event.get("repairs") is not None:
+        lines.append((logging.INFO, "非法叫点本地修正次数：" + "，".join(f"{name} {count}次" for name, count in event["repairs"].items())))
+    if event.get("shortcuts") is not None:
+        lines.append((logging.INFO, "本地短路回合数：" + "，".join(f"{name} {count}次" for name, count in event["shortcuts"].items())))
+    return lines
+
+def _roll(event: Dict[str, Any]) -> List[tuple[int, str]]:
+    msg = f"第{event['round']}轮开始"
+    for name, dice in event["dice"].items():
+        msg += f"\n玩家：{name} 骰子：{dice} 毒药: {event['poison'][name]}瓶"
+    return [(logging.INFO, msg), (logging.INFO, f"本轮从{event['first_player']}开始")]
+
+# 事件类型 -> 渲染为 [(日志级别, 文本)]；不在表中的事件（如 llm_call）不写入文本日志
+_TEXT_FORMATS: Dict[str, Callable[[Dict[str, Any]], List[tuple[int, str]]]] = {
+    "game_start": lambda e: [(logging.INFO, f"游戏开始，随机种子：{e['seed']}，对局ID：{e['game_id']}")] + [
+        (logging.INFO, f"玩家：{p['name']}，模型：{'人类' if p['human'] else p['model']}") for p in e["players"]
+    ],
+    "roll": _roll,
+    "shortcut": lambda e: [(logging.INFO, f"{e['player']} 本回合无需LLM决策，已在本地{'质疑' if e['challenge'] else '叫点'}。")],
+    "repair": lambda e: [(logging.WARNING, f"{e['player']} 行动不合法（{_describe(e['original'])}），已按 {e['policy']} 策略修正为{_describe(e['repaired'])}。")],
+    "bid": lambda e: _action_lines(e, f"叫点：{e['number']}个{e['value']}点。"),
+    "invalid_bid": _invalid_bid,
+    "challenge": lambda e: _action_lines(e, "质疑上家。"),
+    "reveal": _reveal,
+    "death": lambda e: [(logging.INFO, f"💀 {e['player']} 已经死亡。")],
+    "abort": lambda e: [(logging.ERROR, e["reason"])],
+    "reflection_start": lambda e: [(logging.INFO, "所有玩家正在进行反思……" if e["mode"] == "sync" else "玩家在后台进行反思，下一轮同时开始")],
+    "reflection_stale": lambda e: [(logging.INFO, f"{e['player']} 的反思尚未完成，使用上一轮的看法行动")],
+    "reflection": _reflection,
+    "usage": _usage,
+    "game_end": _game_end,
+}
+
+class TextLogSink:
+    """把事件渲染成中文文本写入 logging.Logger"""
+
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+
+    def write(self, event: Dict[str, Any]):
+        formatter = _TEXT_FORMATS.get(event["type"])
+        if formatter is None:
+            return
+        for level, message in formatter(event):
+            self.logger.log(level, message)
+
+    def close(self):
+        pass
+
+class MemorySink:
+    """把事件保存在内存列表中，用于离线分析（如回放对局记录）"""
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+
+    def write(self, event: Dict[str, Any]):
+        self.events.append(event)
+
+    def close(self):
+        pass
+
+class EventLog:
+    """事件分发器，线程安全（后台反思与LLM调用会并发发出事件）"""
+
+    def __init__(self, sinks: List[Any] | None = None, **context):
+        """
+            sinks: 事件的消费者，需提供 write(event) 和 close()
+            context: 附加到每个事件上的字段，如 game=对局编号
+        """
+        self.sinks = list(sinks or [])
+        self.context = context
+        self._lock = threading.Lock()
+
+    def emit(self, type: str, **fields):
+        event = {"ts": round(time.time(), 3), **self.context, "type": type, **fields}
+        with self._lock:
+            for sink in self.sinks:
+                sink.write(event)
+
+    def close(self):
+        with self._lock:
+            for sink in self.sinks:
+                sink.close()
+
+def load_events(path: str) -> Iterator[Dict[str, Any]]:
+    """逐个读取JSONL事件日志中的事件（支持 .gz/.zst）"""
+    with open_text(path, "r") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
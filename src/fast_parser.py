@@ -0,0 +1,289 @@
+"""
+决策/反思响应的快速解析
+
+LLM 的决策响应固定为五个键的 Action（challenge/value/number/reason/behaviour），反思响应为“玩家名: 看法”。
+绝大多数响应本身就是合法JSON，只是可能包在代码块或前后说明文字里，
+因此先找出所有最外层的 {...}（跳过字符串中的括号）逐个交给 json.loads，取最后一个合法的对象，
+说明文字中举例的对象不会被当成决策；都不合法时再在单个对象内用编译好的正则按键名扫描；
+都不行才回退到 try_parse_json_object（正则、多次字符串替换、json_repair、ast）。
+返回值统一转换为正确的类型。
+
+基准测试（传入 --record 保存的对局记录）：
+    python -m src.fast_parser logs/records/*.json.gz
+默认语料 benchmarks/parser_corpus_synthetic.jsonl 由本地桩服务器生成，只覆盖桩服务器的输出格式，
+只用于检查基准脚本能否运行，不能代表真实模型的响应。
+"""
+import argparse
+import json
+import re
+import time
+from typing import Any, Dict, Iterable, List
+
+from src.json_parser import try_parse_json_object
+
+ACTION_KEYS = ("challenge", "value", "number", "reason", "behaviour")
+DEFAULT_CORPUS = "benchmarks/parser_corpus_synthetic.jsonl"
+STREAM_LOOKAHEAD = 48      # 流式解析：Action 之后收到这么多个非空白字符仍没有新的对象，才提前结束
+
+# 字符串值的结束引号后面必须是下一个键、对象结束或文本结束，值内部未转义的引号（如 他说"好"）保留在值中
+_STRING_VALUE = r"""(?:"(?:[^"\\]|\\.|"(?!\s*(?:,\s*["']|\}|$)))*"|'(?:[^'\\]|\\.|'(?!\s*(?:,\s*["']|\}|$)))*')"""
+# "键": 值，值为 true/false、数字或字符串（键名和字符串允许单引号）
+_FIELD_PATTERN = re.compile(
+    r"""["']([^"'\n]+)["']\s*:\s*(true|false|True|False|-?\d+(?:\.\d+)?|""" + _STRING_VALUE + ")"
+)
+_BARE_QUOTE = re.compile(r'(?<!\\)"')
+_TRUE = {"true", "True", "1", "是"}
+_FALSE = {"false", "False", "0", "否", ""}
+
+def _objects(text: str) -> List[str]:
+    """
+    按出现顺序返回所有最外层的 {...}，跳过JSON字符串中的括号；
+    文本末尾未闭合的对象（如被截断的响应）也作为最后一个返回
+    """
+    objects = []
+    depth, start, in_string, escape = 0, -1, False, False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = depth > 0      # 对象外的引号属于说明文字
+        elif ch == "{":
+            if depth == 0:
+                start = i
+            depth += 1
+        elif ch == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                objects.append(text[start:i + 1])
+    if depth:
+        objects.append(text[start:])
+    return objects
+
+def _loads(obj: str) -> Dict[str, Any] | None:
+    try:
+        result = json.loads(obj)
+    except ValueError:
+        return None
+    return result if isinstance(result, dict) else None
+
+def _scan_fields(text: str) -> Dict[str, Any]:
+    """在单个对象内按键名扫描，适用于尾随逗号、单引号、未转义的引号、被截断等不合规JSON"""
+    result = {}
+    for key, raw in _FIELD_PATTERN.findall(text):
+        if raw[0] in "\"'":
+            inner = raw[1:-1].replace("\\'", "'") if raw[0] == "'" else raw[1:-1]
+            try:
+                value = json.loads('"' + _BARE_QUOTE.sub(r'\\"', inner) + '"')
+            except ValueError:
+                value = inner
+        elif raw in ("true", "True"):
+            value = True
+        elif raw in ("false", "False"):
+            value = False
+        else:
+            value = float(raw) if "." in raw else int(raw)
+        result.setdefault(key, value)
+    return result
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return bool(value)
+    text = str(value).strip()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise ValueError(f"无法转换为布尔值: {value!r}")
+
+def _to_int(value: Any) -> int:
+    if isinstance(value, bool):
+        raise ValueError(f"无法转换为整数: {value!r}")
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError(f"无法转换为整数: {value!r}")
+        return int(value)
+    return int(value)
+
+def _typed_action(result: Dict[str, Any]) -> Dict[str, Any] | None:
+    """校验五个键并转换类型，缺键或类型不对时返回None"""
+    if not all(key in result for key in ACTION_KEYS):
+        return None
+    try:
+        return {
+            "challenge": _to_bool(result["challenge"]),
+            "value": _to_int(result["value"]),
+            "number": _to_int(result["number"]),
+            "reason": str(result["reason"]),
+            "behaviour": str(result["behaviour"]),
+        }
+    except (TypeError, ValueError):
+        return None
+
+def parse_action(content: str) -> Dict[str, Any]:
+    """
+    解析决策响应：响应中有多个对象时取最后一个完整的 Action
+    Returns:
+        类型正确的 Action 字典
+    Raises:
+        ValueError: 响应中没有完整的五个键
+    """
+    objects = _objects(content)
+    for parse in (_loads, _scan_fields):
+        for obj in reversed(objects):
+            if (result := parse(obj)) is not None and (action := _typed_action(result)) is not None:
+                return action
+    _, result = try_parse_json_object(content)
+    if (action := _typed_action(result)) is not None:
+        return action
+    raise ValueError("json格式不符合要求")
+
+def parse_reflection(content: str, names: Iterable[str]) -> Dict[str, str]:
+    """解析反思响应，只返回 names 中玩家的看法（取最后一个包含这些玩家的对象）；全部缺失时返回空字典"""
+    names = list(names)
+    objects = _objects(content)
+    for parse in (_loads, _scan_fields):
+        for obj in reversed(objects):
+            if (result := parse(obj)) is not None and any(name in result for name in names):
+                return {name: str(result[name]) for name in names if name in result}
+    _, result = try_parse_json_object(content)
+    return {name: str(result[name]) for name in names if name in result}
+
+class ActionStreamParser:
+    """
+    流式响应的增量解析：逐块喂入文本，与 parse_action 一样以最后一个完整的 Action 为准。
+    Action 闭合后还要再收到 STREAM_LOOKAHEAD 个非空白字符、期间没有新的对象开始，才认为它是最终决策并提前返回，
+    说明文字中举例的对象后面紧跟真正的决策时不会被当成决策
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.end = -1               # 最后一个完整 Action 对象结束的位置
+        self.action: Dict[str, Any] | None = None   # 最后一个完整的 Action
+        self._pos = 0               # 已扫描到的位置
+        self._start = -1
+        self._closed = 0            # 最后一个最外层对象结束的位置
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, piece: str) -> Dict[str, Any] | None:
+        """
+        喂入一段新文本
+        Returns:
+            已能确定最终决策时返回它，否则返回None（流结束时以 action 为准）
+        """
+        self.text += piece
+        text = self.text
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = self._depth > 0     # 对象外的引号属于说明文字
+            elif ch == "{":
+                if self._depth == 0:
+                    self._start = i
+                self._depth += 1
+            elif ch == "}" and self._depth:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._closed = i + 1
+                    if (result := _loads(text[self._start:i + 1])) is not None and (action := _typed_action(result)) is not None:
+                        self.action, self.end = action, i + 1
+        self._pos = len(text)
+        if self.action is not None and self._depth == 0 and len(text[self._closed:].strip()) >= STREAM_LOOKAHEAD:
+            return self.action
+        return None
+
+def load_corpus(paths: List[str]) -> List[Dict[str, Any]]:
+    """
+    读取语料：.jsonl 每行为 {"kind", "content", "names"}；其他文件按对局记录读取其中的LLM响应
+    """
+    from src.replay import load_record
+
+    corpus = []
+    for path in paths:
+        if path.endswith(".jsonl"):
+            with open(path, encoding="utf-8") as f:
+                corpus.extend(json.loads(line) for line in f if line.strip())
+            continue
+        record = load_record(path)
+        names = [p["name"] for p in record["players"]]
+        for call in record["calls"]:
+            if call["source"] == "llm":
+                corpus.append({
+                    "kind": call["kind"],
+                    "content": call["content"],
+                    "names": [name for name in names if name != call["player"]],
+                })
+    return corpus
+
+def _legacy_action(content: str) -> Dict[str, Any]:
+    _, result = try_parse_json_object(content)
+    if all(key in result for key in ACTION_KEYS):
+        return result
+    raise ValueError("json格式不符合要求")
+
+def _legacy_reflection(content: str, names: Iterable[str]) -> Dict[str, str]:
+    _, result = try_parse_json_object(content)
+    return {name: result[name] for name in names if name in result}
+
+def _run(corpus: List[Dict[str, Any]], action_fn, reflect_fn) -> tuple[List[Any], float]:
+    outputs = []
+    start_time = time.perf_counter()
+    for item in corpus:
+        try:
+            if item["kind"] == "action":
+                outputs.append(action_fn(item["content"]))
+            else:
+                outputs.append(reflect_fn(item["content"], item["names"]))
+        except Exception:
+            outputs.append(None)
+    return outputs, time.perf_counter() - start_time
+
+def main():
+    parser = argparse.ArgumentParser(description="决策/反思响应解析基准测试")
+    parser.add_argument("corpus", nargs="*", default=[DEFAULT_CORPUS], help="语料文件（.jsonl）或对局记录（.json/.json.gz）")
+    parser.add_argument("--repeat", type=int, default=20, help="重复次数")
+    args = parser.parse_args()
+
+    import logging
+    logging.getLogger("src.json_parser").setLevel(logging.CRITICAL)
+
+    corpus = load_corpus(args.corpus)
+    print(f"语料：{len(corpus)}条（决策{sum(item['kind'] == 'action' for item in corpus)}条）")
+    if DEFAULT_CORPUS in args.corpus:
+        print("注意：默认语料由本地桩服务器生成，结果不代表真实模型的响应，请用 --record 保存的对局记录评估")
+    results = {}
+    for name, action_fn, reflect_fn in [
+        ("try_parse_json_object", _legacy_action, _legacy_reflection),
+        ("fast_parser", parse_action, parse_reflection),
+    ]:
+        outputs, elapsed = min((_run(corpus, action_fn, reflect_fn) for _ in range(args.repeat)), key=lambda r: r[1])
+        results[name] = outputs
+        parsed = sum(output is not None and output != {} for output in outputs)
+        print(f"{name:>22}: 成功{parsed}/{len(corpus)}，{elapsed / max(len(corpus), 1) * 1e6:.1f} us/条")
+
+    changed = [
+        (item["content"], old, new)
+        for item, old, new in zip(corpus, results["try_parse_json_object"], results["fast_parser"])
+        if old and new != old
+    ]
+    print(f"与原解析结果不一致（多为字符串形式的数字被转换为整数）：{len(changed)}条")
+    for content, old, new in changed[:5]:
+        print(f"  {content[:60]!r}\n    原：{old}\n    新：{new}")
+
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,51 @@ from src.players import Player
 import logging
 import time
 import random
+import hashlib
 import os
 from typing import List, Dict, Any
 import uuid
 import threading
 from tkinter import messagebox
-from src.snippets import InvalidAction
+from src.snippets import InvalidAction, DICE_PER_PLAYER, repair_policies, shortcut_policies, reflection_modes
+from src.bots import RuleBasedBot
+from src.probability import get_bid_probability
+from src.events import EventLog, TextLogSink
+from src import log_backend
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from src.replay import GameRecorder
+
+def derive_seed(run_seed: int, game_index: int) -> int:
+    """由运行种子和对局编号派生出相互独立的对局种子，与线程数和执行顺序无关"""
+    digest = hashlib.sha256(f"{run_seed}:{game_index}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") >> 1
 
 class LiarsDiceGame():
-    def __init__(self, players: List[Player], reflect_each_round = True, logger: logging.Logger | None = None):
+    def __init__(self, players: List[Player], reflect_each_round = True, logger: logging.Logger | None = None,
+                 seed: int | None = None, recorder: "GameRecorder | None" = None, probability_hint: bool = False,
+                 repair_policy: str = "off", shortcut_policy: str = "off", reflection_mode: str = "sync",
+                 reflection_staleness: int = 0, events: EventLog | None = None, game_id: str | None = None):
+        """
+            seed: 本局的随机种子，决定首家和每轮的骰子；为None时随机生成并记录在日志中
+            recorder: 可选的对局记录器，记录种子与所有LLM原始请求/响应，用于回放
+            probability_hint: 是否在AI玩家的 {extra_hint} 中附上精确的叫点成立概率
+            repair_policy: AI玩家非法叫点的本地修正策略，见 snippets.repair_policies
+            shortcut_policy: 无需LLM决策时的本地短路策略，见 snippets.shortcut_policies
+            reflection_mode: 每轮结束后的反思方式，见 snippets.reflection_modes
+            reflection_staleness: pipelined 模式下，玩家在反思未完成时最多还能用旧看法行动几次；
+                                  为0时玩家在下一轮第一次行动前等待自己的反思，结果与 sync 模式相同
+            events: 对局事件流，为None时只渲染到 logger 的文本日志
+            game_id: 对局ID，为None时随机生成；回放时沿用记录中的ID。评分和统计按它去重，相同种子重新运行的对局ID不同
+        """
+        if repair_policy not in repair_policies:
+            raise ValueError(f"不支持的修正策略: {repair_policy}")
+        if shortcut_policy not in shortcut_policies:
+            raise ValueError(f"不支持的短路策略: {shortcut_policy}")
+        if reflection_mode not in reflection_modes:
+            raise ValueError(f"不支持的反思方式: {reflection_mode}")
         self.players = players
         self.game_mode = 'ai_only'
         self.human_player = None
@@ -24,16 +59,45 @@ class LiarsDiceGame():
         self.is_running = True
         self.round = 0
         self.active_players = []
-        self.first_player = self.players[random.randint(0, len(self.players) - 1)]  # 随机选择第一个玩家
+        self.seed = seed if seed is not None else random.SystemRandom().randrange(2 ** 63)
+        self.game_id = game_id or uuid.uuid4().hex
+        self.rng = random.Random(self.seed)     # 本局独立的随机数生成器
+        self.first_player = self.players[self.rng.randint(0, len(self.players) - 1)]  # 随机选择第一个玩家
+        for player in players:
+            player.rng = random.Random(self.rng.getrandbits(64))    # 玩家自身的随机决策（如规则机器人）也可复现
         self.current_player_index = 0
         self.gui = None  # GUI引用
+        self._owns_logger = logger is None     # 自己创建的日志记录器在对局结束时关闭
         self.logger = logger or self.create_logger()
         self.reflect_each_round = reflect_each_round
+        self.probability_hint = probability_hint
+        self.probability = get_bid_probability(DICE_PER_PLAYER * len(players))     # 开局时预先计算好的概率表
+        self.repair_policy = repair_policy
+        self.repairs: Dict[str, int] = {player.name: 0 for player in players}    # 各玩家非法叫点被本地修正的次数
+        self.shortcut_policy = shortcut_policy
+        self.shortcuts: Dict[str, int] = {player.name: 0 for player in players}  # 各玩家跳过LLM的回合数
+        self.opening_bot = RuleBasedBot(bluff_rate=0.0)     # shortcut_policy 为 all 时给出开局叫点
+        self.reflection_mode = reflection_mode
+        self.reflection_staleness = reflection_staleness
+        self.pending_reflections: Dict[str, Dict[str, Any]] = {}    # 玩家名 -> {"future": 后台反思, "turns": 已用旧看法行动的次数}
+        self._reflection_executor: ThreadPoolExecutor | None = None
 
         # 轮次信息
         self.round_base_info = ""
         self.round_action_info = ""
         self.extra_hint = ""
+        self.round_bids: List[tuple[str, int, int]] = []    # 本轮合法叫点记录 (玩家名, 数量, 点数)
+        self.eliminated: List[str] = []     # 按死亡先后排列的玩家名
+
+        self.events = events or EventLog([TextLogSink(self.logger)])
+        for player in players:
+            player.events = self.events
+
+        self.recorder = recorder
+        if recorder:
+            recorder.start(self)
+            for player in players:
+                player.recorder = recorder
 
     def set_gui(self, gui):
         """设置GUI引用"""
@@ -44,31 +108,36 @@ class LiarsDiceGame():
                 player.gui = gui
 
     def create_logger(self) -> logging.Logger:
-        """创建日志记录器"""
+        """创建日志记录器，文件由日志后端的写线程写入"""
         os.makedirs('logs', exist_ok=True)
         uuid4 = str(uuid.uuid4())
-        logger = logging.getLogger(uuid4)
-        logger.setLevel(logging.INFO)
         self.log_path = f"logs/{time.strftime('%Y%m%d_%H%M%S')}_{uuid4}.log"
-        file_handler = logging.FileHandler(self.log_path, encoding="utf-8")
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        logger = log_backend.open_game_log(self.log_path, uuid4)
         console_handler = logging.StreamHandler()
-        console_handler.setFormatter(formatter)
+        console_handler.setFormatter(logging.Formatter(log_backend.LOG_FORMAT))
         logger.addHandler(console_handler)
         return logger
 
+    def close_logger(self):
+        """关闭自己创建的日志记录器（外部传入的由调用方关闭），可重复调用"""
+        if self._owns_logger:
+            log_backend.close_game_log(self.logger)
+
     def log_to_gui(self, message):
         """向GUI发送日志消息"""
         if self.gui and self.is_running:
             self.gui.root.after(0, lambda: self.gui.log_message(message))
 
-    def handle_bid(self, player: Player, action: Dict[str, Any]) -> bool:
+    def emit(self, type: str, **fields):
+        """发出一个本轮的对局事件"""
+        self.events.emit(type, **{"round": self.round, **fields})
+
+    def _emit_action(self, type: str, player: Player, action: Dict[str, Any], reasoning: str, **fields):
+        self.emit(type, player=player.name, number=action['number'], value=action['value'], reason=action['reason'],
+                  behaviour=action['behaviour'], reasoning=reasoning, **fields)
+
+    def handle_bid(self, player: Player, action: Dict[str, Any], reasoning: str = "") -> bool:
         """处理玩家的叫点行为"""
-        # 打印日志
-        log_msg = f"{player.name} 叫点：{action['number']}个{action['value']}点。\n理由：{action['reason']}\n行为：{action['behaviour']}"
-        self.logger.info(log_msg)
         self.log_to_gui(f"🎲 {player.name} 叫点：{action['number']}个{action['value']}点")
         if self.game_mode == "ai_only":
             self.log_to_gui(f"💭 理由：{action['reason']}")
@@ -77,13 +146,15 @@ class LiarsDiceGame():
 
         # 判断合法性
         if action['value'] < 1 or action['value'] > 6:
-            self.logger.error(f"{player.name} 叫点不合法。")
+            self._emit_action("invalid_bid", player, action, reasoning, error="value_range")
             self.log_to_gui(f"❌ {player.name} 叫点不合法！")
             self.extra_hint = "骰子点数只能取[1,2,3,4,5,6]中的值。"
             return False
         if action['number'] > self.dice_number or (action['number'] == self.dice_number and action['value'] > self.dice_value):
+            self._emit_action("bid", player, action, reasoning)
             self.dice_number = action['number']
             self.dice_value = action['value']
+            self.round_bids.append((player.name, action['number'], action['value']))
             if action['behaviour']:
                 self.round_action_info += f"{player.name}: {action['behaviour']}\n"
             self.round_action_info += f"{player.name} 叫点：{action['number']}个{action['value']}点。\n"
@@ -93,16 +164,43 @@ class LiarsDiceGame():
                 self.gui.update_bid_display(action['number'], action['value'])
             return True
         else:
-            self.logger.error(f"{player.name} 叫点不合法。")
+            self._emit_action("invalid_bid", player, action, reasoning, error="not_higher")
             self.log_to_gui(f"❌ {player.name} 叫点不合法！")
             self.extra_hint = f"你的赌注要么数量大于{self.dice_number}，要么数量等于{self.dice_number}但点数大于{self.dice_value}。"
             return False
 
-    def handle_challenge(self, player: Player, action: Dict[str, Any]):
+    def is_legal_bid(self, action: Dict[str, Any]) -> bool:
+        """叫点（或质疑）在当前局面下是否合法"""
+        if action['challenge']:
+            return self.dice_number > 0     # 首家不能质疑
+        if action['value'] < 1 or action['value'] > 6:
+            return False
+        return action['number'] > self.dice_number or (action['number'] == self.dice_number and action['value'] > self.dice_value)
+
+    def repair_action(self, player: Player, action: Dict[str, Any]) -> Dict[str, Any]:
+        """按 repair_policy 把非法叫点修正为合法行动，不再询问LLM"""
+        if self.repair_policy == "challenge" and self.dice_number > 0:
+            repaired = {**action, "challenge": True, "value": 0, "number": 0}
+            desc = "质疑上家"
+        else:
+            # 保留点数（越界时取最近的合法点数），数量提高到该点数的最小合法加注
+            value = min(max(action['value'], 1), 6)
+            min_number, _ = self.probability.min_raises(self.dice_number, self.dice_value)[value - 1]
+            repaired = {**action, "challenge": False, "value": value, "number": max(action['number'], min_number)}
+            desc = f"{repaired['number']}个{value}点"
+        original = "质疑" if action['challenge'] else f"{action['number']}个{action['value']}点"
+        self.repairs[player.name] += 1
+        self.emit("repair", player=player.name, policy=self.repair_policy,
+                  original={key: action[key] for key in ("challenge", "number", "value")},
+                  repaired={key: repaired[key] for key in ("challenge", "number", "value")})
+        self.log_to_gui(f"🔧 {player.name} 行动不合法（{original}），已修正为{desc}")
+        return repaired
+
+    def handle_challenge(self, player: Player, action: Dict[str, Any], reasoning: str = ""):
         """处理玩家的质疑行为"""
-        # 打印日志
-        log_msg = f"{player.name} 质疑上家。\n理由：{action['reason']}\n行为：{action['behaviour']}"
-        self.logger.info(log_msg)
+        previous_player = self.active_players[(self.current_player_index - 1)]
+        self.emit("challenge", player=player.name, target=previous_player.name, number=self.dice_number, value=self.dice_value,
+                  reason=action['reason'], behaviour=action['behaviour'], reasoning=reasoning)
         self.log_to_gui(f"⚔️ {player.name} 质疑上家！")
         if self.game_mode == "ai_only":
             self.log_to_gui(f"💭 理由：{action['reason']}")
@@ -123,17 +221,23 @@ class LiarsDiceGame():
         self.log_to_gui(dice_info)
         self.round_action_info += dice_info + '\n'
 
-        # 获取上家和下家
-        previous_player = self.active_players[(self.current_player_index - 1)]
+        # 获取下家
         next_player = self.active_players[(self.current_player_index + 1) % len(self.active_players)]
 
         # 比较赌注和实际骰子数量
-        if self.dice_number > total_dice:
+        success = self.dice_number > total_dice
+        loser = previous_player if success else player
+        self.emit("reveal", player=player.name, dice={p.name: list(p.dice) for p in self.active_players},
+                  number=self.dice_number, value=self.dice_value, total=total_dice, success=success, loser=loser.name)
+        loser.drink_poison()
+        self.emit("poison", player=loser.name, remaining=loser.poison)
+        if not loser.is_alive():
+            self.eliminated.append(loser.name)
+            self.emit("death", player=loser.name, place=len(self.active_players))
+        if success:
             # 质疑成功
-            previous_player.drink_poison()
             result_msg = f"✅ {player.name} 质疑成功！{previous_player.name} 喝了一瓶毒药。"
             self.round_action_info += f"{player.name} 质疑成功！{previous_player.name} 喝了一瓶毒药。\n"
-            self.logger.info(result_msg)
             self.log_to_gui(result_msg)
 
             # 判断上家是否死亡
@@ -143,17 +247,14 @@ class LiarsDiceGame():
                 self.round_action_info += f"{previous_player.name} 还剩 {previous_player.poison} 瓶毒药"
             else:
                 death_msg = f"💀 {previous_player.name} 已经死亡。"
-                self.logger.info(death_msg)
                 self.log_to_gui(death_msg)
                 self.round_action_info += f"{previous_player.name} 已经死亡。"
                 self.active_players.remove(previous_player)
                 self.first_player = next_player      # 质疑者下家成为下一轮的第一个玩家
         else:
             # 质疑失败
-            player.drink_poison()
             self.round_action_info += f"{player.name} 质疑失败！{player.name} 喝了一瓶毒药。\n"
             result_msg = f"❌ {player.name} 质疑失败！{player.name} 喝了一瓶毒药。"
-            self.logger.info(result_msg)
             self.log_to_gui(result_msg)
 
             # 判断质疑者是否死亡
@@ -163,7 +264,6 @@ class LiarsDiceGame():
                 self.round_action_info += f"{player.name} 还剩 {player.poison} 瓶毒药"
             else:
                 death_msg = f"💀 {player.name} 已经死亡。"
-                self.logger.info(death_msg)
                 self.log_to_gui(death_msg)
                 self.round_action_info += f"{player.name} 已经死亡。"
                 self.active_players.remove(player)
@@ -174,8 +274,8 @@ class LiarsDiceGame():
             self.gui.update_players_info(self.active_players)
             self.gui.update_bid_display(0, 0)
 
-    def start_round(self):
-        """开始一轮游戏"""
+    def _begin_round(self):
+        """开始新一轮：更新轮次信息、摇骰并确定起始玩家"""
         self.round += 1
         self.round_base_info = f"第{self.round}轮，{len(self.active_players)}名存活玩家的名字和毒药数量分别为：\n"
         for player in self.active_players:
@@ -183,6 +283,7 @@ class LiarsDiceGame():
         self.round_base_info += f"本轮从{self.first_player.name}开始\n"
         self.round_action_info = ""
         self.extra_hint = ""
+        self.round_bids = []
 
         # GUI显示轮次信息
         round_msg = f"🚀 第{self.round}轮开始！从 {self.first_player.name} 开始"
@@ -202,7 +303,7 @@ class LiarsDiceGame():
 
         # 摇盅
         for player in self.active_players:
-            player.roll_dice(5)
+            player.roll_dice(DICE_PER_PLAYER, self.rng)
 
         if self.gui and self.is_running:
             if self.human_player and self.human_player.is_alive():
@@ -211,35 +312,105 @@ class LiarsDiceGame():
                 dices = [player.dice for player in self.players if player.is_alive()]
                 self.gui.update_dice_display(dices)                     # 更新所有玩家的骰子显示
 
-        # 日志
-        log_msg = f"第{self.round}轮开始"
-        for player in self.active_players:
-            log_msg += f"\n玩家：{player.name} 骰子：{player.dice} 毒药: {player.poison}瓶"
-        self.logger.info(log_msg)
+        self.emit("roll", first_player=self.first_player.name, dice={p.name: list(p.dice) for p in self.active_players},
+                  poison={p.name: p.poison for p in self.active_players})
 
         # 玩家开始行动
         self.current_player_index = self.active_players.index(self.first_player)
+
+    def unknown_dice(self) -> int:
+        """从当前玩家的视角，场上其他存活玩家的骰子数"""
+        return DICE_PER_PLAYER * (len(self.active_players) - 1)
+
+    def _action_kwargs(self, is_first: bool, player: Player) -> Dict[str, Any]:
+        """AI玩家决策所需的参数"""
+        extra_hint = self.extra_hint
+        if self.probability_hint:
+            hint = self.probability.hint(player.dice, self.dice_number, self.dice_value, self.unknown_dice())
+            extra_hint = f"{extra_hint}\n{hint}" if extra_hint else hint
+        return dict(
+            is_first=is_first,
+            active_players=self.active_players,
+            round_base_info=self.round_base_info,
+            round_action_info=self.round_action_info,
+            extra_hint=extra_hint,
+            bid_history=list(self.round_bids)
+        )
+
+    def shortcut_action(self, is_first: bool, player: Player) -> Dict[str, Any] | None:
+        """
+        判断当前回合是否只有一个合理的行动，是则在本地给出，无需询问LLM
+        Returns:
+            本地决策的行动；需要LLM决策时返回None
+        """
+        if self.shortcut_policy == "off" or player.is_bot:
+            return None
+        unknown = self.unknown_dice()
+        if not is_first and self.probability.bid_true(player.dice, self.dice_number, self.dice_value, unknown) == 0.0:
+            total = DICE_PER_PLAYER * len(self.active_players)
+            if self.dice_number > total:
+                reason = f"场上只有{total}个骰子，上家叫了{self.dice_number}个{self.dice_value}点，不可能成立。"
+            else:
+                reason = f"我有{player.count_dice(self.dice_value)}个{self.dice_value}点，其余{unknown}个骰子全是{self.dice_value}点也凑不够{self.dice_number}个。"
+            action = {"challenge": True, "value": 0, "number": 0, "reason": reason, "behaviour": "不假思索地拍桌质疑。"}
+        elif is_first and self.shortcut_policy == "all":
+            action = self.opening_bot.decide(player.dice, 0, 0, unknown, True, player.rng)
+            action["behaviour"] = "随手报出开局叫点。"
+        else:
+            return None
+        self.shortcuts[player.name] += 1
+        self.emit("shortcut", player=player.name, challenge=action['challenge'])
+        return action
+
+    def _process_action(self, player: Player, action: Dict[str, Any] | None, reasoning: str) -> str:
+        """
+        分析处理玩家行动
+        Returns:
+            "challenge": 玩家质疑，本轮结束
+            "bid": 叫点合法
+            "invalid": 叫点不合法
+        """
+        if not action:
+            self.emit("invalid_bid", player=player.name, number=None, value=None, reason="", behaviour="", reasoning=reasoning, error="empty")
+            raise ValueError(f"{player.name} 行动为空。")
+        if not player.is_human:
+            legal = self.is_legal_bid(action)
+            player.confirm_action(legal)
+            if self.repair_policy != "off" and not legal:
+                action = self.repair_action(player, action)
+        if action['challenge']:
+            self.handle_challenge(player, action, reasoning)
+            return "challenge"
+        if self.handle_bid(player, action, reasoning):
+            # 如果还有下一个玩家，显示提示
+            next_player = self.active_players[self.current_player_index]
+            if not next_player.is_human:
+                self.log_to_gui(f"⏳ 等待 {next_player.name} 行动...")
+            return "bid"
+        if player.is_human:
+            messagebox.showerror("叫点不合法", self.extra_hint)
+        return "invalid"
+
+    def start_round(self):
+        """开始一轮游戏"""
+        self._begin_round()
         is_first = True
         invalid_actions = 0
-        self.logger.info(f"本轮从{self.first_player.name}开始")
 
         while(1):
             if invalid_actions >= 2:
-                self.logger.error("连续两次叫点不合法，游戏被迫终止")
+                self.emit("abort", reason="连续两次叫点不合法，游戏被迫终止")
                 raise InvalidAction("连续两次叫点不合法，游戏被迫终止")
 
             invalid_actions = 0
             # 获取玩家行动
             player = self.active_players[self.current_player_index]
 
-            if not player.is_human:
-                action, reasoning = player.get_ai_action(
-                    is_first=is_first,
-                    active_players=self.active_players,
-                    round_base_info=self.round_base_info,
-                    round_action_info=self.round_action_info,
-                    extra_hint=self.extra_hint
-                )
+            if not player.is_human and (action := self.shortcut_action(is_first, player)):
+                reasoning = ""
+            elif not player.is_human:
+                self.wait_reflection(player)
+                action, reasoning = player.get_ai_action(**self._action_kwargs(is_first, player))
                 # 处理退出逻辑
                 if self.gui and (not self.is_running):
                     return
@@ -247,61 +418,182 @@ class LiarsDiceGame():
                 action = player.get_human_action()
                 reasoning = ""
 
-            # 分析处理玩家行动
-            if reasoning:
-                self.logger.info(f"🤔 {player.name} 思考：{reasoning}")
-            if not action:
-                self.logger.error(f"{player.name} 行动为空。")
-                raise ValueError(f"{player.name} 行动为空。")
-            if action['challenge']:
-                self.handle_challenge(player, action)
+            result = self._process_action(player, action, reasoning)
+            if result == "challenge":
                 break
-            else:
-                if self.handle_bid(player, action):
-                    is_first = False
-                    # 如果还有下一个玩家，显示提示
-                    next_player = self.active_players[self.current_player_index]
-                    if not next_player.is_human:
-                        self.log_to_gui(f"⏳ 等待 {next_player.name} 行动...")
-                else:
-                    if player.is_human:
-                        messagebox.showerror("叫点不合法", self.extra_hint)
-                    else:
-                        invalid_actions += 1
+            elif result == "bid":
+                is_first = False
+            elif not player.is_human:
+                invalid_actions += 1
             # 处理退出逻辑
             if self.gui and (not self.is_running):
                 return
 
-    async def round_reflect_async(self):
-        """协程方式处理所有AI玩家对局面的反思"""
+    async def start_round_async(self):
+        """start_round 的协程版本，AI玩家通过异步客户端决策"""
+        self._begin_round()
+        is_first = True
+        invalid_actions = 0
+
+        while(1):
+            if invalid_actions >= 2:
+                self.emit("abort", reason="连续两次叫点不合法，游戏被迫终止")
+                raise InvalidAction("连续两次叫点不合法，游戏被迫终止")
+
+            invalid_actions = 0
+            player = self.active_players[self.current_player_index]
+
+            if not player.is_human and (action := self.shortcut_action(is_first, player)):
+                reasoning = ""
+            elif not player.is_human:
+                await self.wait_reflection_async(player)
+                action, reasoning = await player.get_ai_action_async(**self._action_kwargs(is_first, player))
+                if self.gui and (not self.is_running):
+                    return
+            else:
+                # 人类玩家的操作需要阻塞等待GUI事件，放到线程中执行
+                action = await asyncio.to_thread(player.get_human_action)
+                reasoning = ""
+
+            result = self._process_action(player, action, reasoning)
+            if result == "challenge":
+                break
+            elif result == "bid":
+                is_first = False
+            elif not player.is_human:
+                invalid_actions += 1
+            if self.gui and (not self.is_running):
+                return
+
+    async def round_reflect_async(self, native_async: bool = False):
+        """
+        协程方式处理所有AI玩家对局面的反思
+            native_async: 是否使用异步LLM客户端；为False时阻塞的 reflect 放到线程池中执行
+        """
         async def reflect_coro(subject_player: Player, other_players: List[Player]):
-            loop = asyncio.get_event_loop()
-            # 反思操作仍为阻塞IO，需用run_in_executor
-            success, content, reasoning = await loop.run_in_executor(
-                None, subject_player.reflect, other_players, self.round_base_info, self.round_action_info
-            )
-            if success:
-                if reasoning:
-                    self.logger.info(f"{subject_player.name} 思考：{reasoning}")
-                self.logger.info(f"{subject_player.name}: {content}")
+            if native_async:
+                success, content, reasoning, _ = await subject_player.reflect_async(
+                    other_players, self.round_base_info, self.round_action_info
+                )
             else:
-                self.logger.error(content)
+                loop = asyncio.get_event_loop()
+                # 反思操作仍为阻塞IO，需用run_in_executor
+                success, content, reasoning, _ = await loop.run_in_executor(
+                    None, subject_player.reflect, other_players, self.round_base_info, self.round_action_info
+                )
+            self._log_reflection(subject_player, success, content, reasoning, self.round)
 
-        self.logger.info("所有玩家正在进行反思……")
+        self.emit("reflection_start", mode="sync")
         self.log_to_gui("⏳ 所有玩家正在进行反思……")
 
         tasks = []
-        for player in self.active_players:
-            if player.is_human:
-                continue
+        for player, other_players in self._reflecting_players():
             if not self.is_running:
                 return
-            other_players = [p for p in self.active_players if p is not player]
             tasks.append(reflect_coro(player, other_players))
         if tasks:
             await asyncio.gather(*tasks)
         self.log_to_gui("✅ 反思完毕！")
 
+    def _log_reflection(self, player: Player, success: bool, content: str, reasoning: str, round: int):
+        """round 为被反思的轮次（pipelined 模式下反思完成时可能已进入下一轮）"""
+        self.emit("reflection", round=round, player=player.name, success=success, content=content, reasoning=reasoning)
+
+    def _reflecting_players(self) -> List[tuple[Player, List[Player]]]:
+        """需要反思的AI玩家及其反思对象"""
+        return [
+            (player, [p for p in self.active_players if p is not player])
+            for player in self.active_players
+            if not player.is_human and not player.is_bot
+        ]
+
+    def _reflect_one(self, player: Player, other_players: List[Player], round_base_info: str, round_action_info: str,
+                     round: int) -> Dict[str, str]:
+        """后台反思：只返回新看法，由对局线程在 wait_reflection 中生效"""
+        success, content, reasoning, opinions = player.reflect(other_players, round_base_info, round_action_info, apply=False)
+        self._log_reflection(player, success, content, reasoning, round)
+        return opinions
+
+    async def _reflect_one_async(self, player: Player, other_players: List[Player], round_base_info: str, round_action_info: str,
+                                 round: int) -> Dict[str, str]:
+        success, content, reasoning, opinions = await player.reflect_async(other_players, round_base_info, round_action_info, apply=False)
+        self._log_reflection(player, success, content, reasoning, round)
+        return opinions
+
+    def submit_reflections(self):
+        """pipelined 模式：在线程池中后台反思，立即返回以开始下一轮"""
+        if self._reflection_executor is None:
+            self._reflection_executor = ThreadPoolExecutor(max_workers=len(self.players), thread_name_prefix="reflect")
+        self.emit("reflection_start", mode="pipelined")
+        for player, other_players in self._reflecting_players():
+            self.wait_reflection(player, force=True)    # 同一玩家的反思按轮次依次生效
+            future = self._reflection_executor.submit(
+                self._reflect_one, player, other_players, self.round_base_info, self.round_action_info, self.round
+            )
+            self.pending_reflections[player.name] = {"future": future, "turns": 0}
+
+    async def submit_reflections_async(self):
+        """submit_reflections 的协程版本，反思作为同一事件循环中的任务运行"""
+        self.emit("reflection_start", mode="pipelined")
+        for player, other_players in self._reflecting_players():
+            await self.wait_reflection_async(player, force=True)
+            task = asyncio.create_task(
+                self._reflect_one_async(player, other_players, self.round_base_info, self.round_action_info, self.round)
+            )
+            self.pending_reflections[player.name] = {"future": task, "turns": 0}
+
+    def _reflection_ready(self, player: Player, force: bool) -> Dict[str, Any] | None:
+        """
+        判断是否需要等待玩家的后台反思
+        Returns:
+            需要等待（或已完成、需要取结果）的反思；可以继续使用旧看法时返回None
+        """
+        pending = self.pending_reflections.get(player.name)
+        if pending is None:
+            return None
+        if force or pending["future"].done() or pending["turns"] >= self.reflection_staleness:
+            return self.pending_reflections.pop(player.name)
+        pending["turns"] += 1
+        self.emit("reflection_stale", player=player.name)
+        return None
+
+    def wait_reflection(self, player: Player, force: bool = False):
+        """玩家行动前调用：反思已完成则生效，超过 reflection_staleness 时等待其完成；新看法在对局线程中生效"""
+        if pending := self._reflection_ready(player, force):
+            player.apply_opinions(pending["future"].result())      # 反思中的异常在这里抛出
+
+    async def wait_reflection_async(self, player: Player, force: bool = False):
+        """wait_reflection 的协程版本"""
+        if pending := self._reflection_ready(player, force):
+            player.apply_opinions(await pending["future"])
+
+    def drain_reflections(self):
+        """游戏结束时等待所有后台反思"""
+        for player in self.players:
+            self.wait_reflection(player, force=True)
+        if self._reflection_executor:
+            self._reflection_executor.shutdown(wait=True)
+            self._reflection_executor = None
+
+    async def drain_reflections_async(self):
+        for player in self.players:
+            await self.wait_reflection_async(player, force=True)
+
+    def cancel_reflections(self):
+        """对局异常结束或中途退出时取消后台反思；正常结束时 drain_reflections 已处理完，这里不做任何事"""
+        for pending in self.pending_reflections.values():
+            pending["future"].cancel()
+        self.pending_reflections.clear()
+        if self._reflection_executor:
+            # 进行中的反思在本次调用返回后结束，不等待
+            self._reflection_executor.shutdown(wait=False, cancel_futures=True)
+            self._reflection_executor = None
+
+    async def cancel_reflections_async(self):
+        tasks = [pending["future"] for pending in self.pending_reflections.values()]
+        self.cancel_reflections()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
     def round_reflect(self):
         """兼容旧接口，自动调度协程"""
         try:
@@ -311,31 +603,86 @@ class LiarsDiceGame():
             loop = asyncio.get_event_loop()
             loop.run_until_complete(self.round_reflect_async())
 
-    def start_game(self) -> str:
-        """开始游戏"""
-        self.logger.info("游戏开始")
+    def _begin_game(self):
+        self.emit("game_start", seed=self.seed, game_id=self.game_id, repair_policy=self.repair_policy, shortcut_policy=self.shortcut_policy,
+                  reflection_mode=self.reflection_mode,
+                  players=[{"name": p.name, "model": p.model, "human": p.is_human} for p in self.players])
         self.log_to_gui("🎮 欢迎来到谎言骰子游戏！")
         self.log_to_gui("📋 游戏规则：每人有5个骰子和2瓶毒药，轮流叫点或质疑，败者喝毒药")
         for player in self.players:
-            self.logger.info(f"玩家：{player.name}，模型：{'人类' if player.is_human else player.model}")
             self.log_to_gui(f"玩家：{player.name}，模型：{'人类' if player.is_human else player.model}")
 
         self.active_players = self.players.copy()
 
-        while len(self.active_players) > 1:
-            self.start_round()
-            # 处理退出逻辑
-            if self.gui and (not self.is_running):
-                return ""
-            if len(self.active_players) > 1:
-                self.log_to_gui(f"📊 本轮结束，还有 {len(self.active_players)} 名玩家存活")
-                if self.reflect_each_round:
-                    self.round_reflect()
-
+    def _finish_game(self) -> str:
         winner = self.active_players[0]
-        self.logger.info(f"游戏结束，{winner.name} 获胜！")
+        self.emit("game_end", winner=winner.name, rounds=self.round,
+                  repairs=self.repairs if self.repair_policy != "off" else None,
+                  shortcuts=self.shortcuts if self.shortcut_policy != "off" else None)
+        self.log_usage()
+        if self.recorder:
+            self.recorder.finish(winner.name)
         return winner.name
 
+    def finish_order(self) -> List[str]:
+        """本局的名次（第一名在前）：胜者，之后按死亡的先后倒序"""
+        survivors = [p.name for p in self.active_players if p.name not in self.eliminated]
+        return survivors + self.eliminated[::-1]
+
+    def log_usage(self):
+        """记录每个AI玩家的token用量、提示词缓存命中情况、实际应答模型与流式调用耗时"""
+        for player in self.players:
+            if player.is_human or not hasattr(player.llm_client, "usage_totals"):
+                continue
+            self.emit("usage", player=player.name, model=player.model, usage=dict(player.llm_client.usage_totals),
+                      answered=dict(getattr(player.llm_client, "answered", {})),
+                      timing=getattr(player.llm_client, "timing_totals", None))
+
+    def start_game(self) -> str:
+        """开始游戏"""
+        try:
+            self._begin_game()
+
+            while len(self.active_players) > 1:
+                self.start_round()
+                # 处理退出逻辑
+                if self.gui and (not self.is_running):
+                    return ""
+                if len(self.active_players) > 1:
+                    self.log_to_gui(f"📊 本轮结束，还有 {len(self.active_players)} 名玩家存活")
+                    if self.reflect_each_round and self.reflection_mode == "pipelined":
+                        self.submit_reflections()
+                    elif self.reflect_each_round:
+                        self.round_reflect()
+
+            self.drain_reflections()
+            return self._finish_game()
+        finally:
+            self.cancel_reflections()
+            self.close_logger()
+
+    async def start_game_async(self) -> str:
+        """start_game 的协程版本，可在同一事件循环中并发运行大量对局"""
+        try:
+            self._begin_game()
+
+            while len(self.active_players) > 1:
+                await self.start_round_async()
+                if self.gui and (not self.is_running):
+                    return ""
+                if len(self.active_players) > 1:
+                    self.log_to_gui(f"📊 本轮结束，还有 {len(self.active_players)} 名玩家存活")
+                    if self.reflect_each_round and self.reflection_mode == "pipelined":
+                        await self.submit_reflections_async()
+                    elif self.reflect_each_round:
+                        await self.round_reflect_async(native_async=True)
+
+            await self.drain_reflections_async()
+            return self._finish_game()
+        finally:
+            await self.cancel_reflections_async()
+            self.close_logger()
+
 if __name__ == "__main__":
     # 示例
     players = [
@@ -506,7 +506,10 @@ class LiarsDiceGUI:
         config = self.load_api_config()
         try:
             for role in self.role_config:
-                if not config.get(model_to_key_name[role["model"]]):
+                if model_to_API.get(role["model"]) == "Bot":
+                    continue
+                key_name = model_to_key_name[role["model"]]
+                if not (config.get(key_name) or default_api_keys.get(key_name)):
                     messagebox.showerror("错误", f"请先配置好 API Key: {role["model"]}")
                     return
         except KeyError as e:
@@ -877,7 +880,7 @@ class LiarsDiceGUI:
                 self.game.is_running = False
                 if self.human_action_event:
                     self.human_action_event.set()       # 防止游戏线程卡死
-                self.game.logger.handlers.clear()
+                self.game.close_logger()
                 # self.game_thread.join()
                 self.create_main_interface()
         else:
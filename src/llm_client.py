@@ -1,29 +1,130 @@
-from openai import OpenAI
-from openai import RateLimitError, APIError
-from google import genai
+from openai import AsyncOpenAI
+from openai import RateLimitError, APIError, BadRequestError
 import google.api_core.exceptions
-import json
 from src.snippets import *
+from src import client_pool, rate_limiter
 from pydantic import BaseModel, create_model, Field
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+import weakref
+from src.fast_parser import ActionStreamParser
+from functools import lru_cache
+from typing import NamedTuple
 
-class OpenAILLMClient:
-    def __init__(self, model="deepseek-chat"):
-        """初始化LLM客户端"""
-        # 打开并读取文件
-        with open('config/keys.json', 'r', encoding='utf-8') as f:
-            config = json.load(f)
+log = logging.getLogger(__name__)
+_STRUCTURED_PARAMS = ("response_format", "json_schema", "tools")     # 错误信息中出现这些词时才认为是拒绝了结构化输出
+_small_prompt_logged = set()    # 已提示过系统提示词过短、无法创建缓存内容的模型
+
+class LLMResponse(NamedTuple):
+    """
+    一次调用的结果；用量、耗时与应答模型随结果返回而不保存在客户端上，
+    同一个客户端被并发调用（如后台反思与决策重叠）时不会记到别的调用上
+    """
+    content: str
+    reasoning_content: str
+    model: str
+    usage: dict = {}            # 本次的token用量，没有用量信息时为空
+    timing: dict | None = None  # 流式调用的 {"ttft", "ttva", "early_stop"}
+    latency: float | None = None    # 网络请求的耗时，不含在限流器中等待的时间
+
+class UsageTracker:
+    """累计各次调用的token用量（含推理模型的 reasoning_tokens 和供应商前缀缓存命中的 cached_tokens）"""
+
+    def _init_usage(self):
+        self._usage_lock = threading.Lock()
+        self.usage_totals = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "reasoning_tokens": 0, "cached_tokens": 0}
+        # 流式调用的耗时：首token时间（ttft）、收到完整决策的时间（ttva），以及提前结束的次数
+        self.timing_totals = {"streams": 0, "ttft": 0.0, "ttva": 0.0, "early_stops": 0}
+
+    def _record_usage(self, usage: dict):
+        with self._usage_lock:
+            self.usage_totals["calls"] += 1
+            for key in ("prompt_tokens", "completion_tokens", "reasoning_tokens", "cached_tokens"):
+                self.usage_totals[key] += usage.get(key, 0)
+
+    def _record_timing(self, ttft: float | None, ttva: float | None, early_stop: bool) -> dict:
+        with self._usage_lock:
+            self.timing_totals["streams"] += 1
+            self.timing_totals["ttft"] += ttft or 0.0
+            self.timing_totals["ttva"] += ttva or 0.0
+            self.timing_totals["early_stops"] += early_stop
+        return {"ttft": ttft, "ttva": ttva, "early_stop": early_stop}
+
+class Action(BaseModel):
+    """LLM决策输出的JSON格式"""
+    challenge: bool
+    value: int
+    number: int
+    reason: str
+    behaviour: str
+
+@lru_cache(maxsize=256)
+def _reflect_model(names: tuple[str, ...]):
+    response_format = {name: (str, Field(description="填入中文字符串")) for name in names}
+    return create_model("ReflectResponse", **response_format)
+
+def reflect_schema(other_players):
+    """配置LLM反思的json输出格式（按玩家名缓存，避免每轮重复创建模型）"""
+    return _reflect_model(tuple(p.name for p in other_players))
+
+@lru_cache(maxsize=256)
+def _strict_json_schema(model: type[BaseModel]) -> dict:
+    """pydantic 模型对应的严格 JSON Schema：所有字段必填，且不允许额外字段"""
+    schema = model.model_json_schema()
+    schema["additionalProperties"] = False
+    schema["required"] = list(schema["properties"])
+    return schema
+
+class RateLimited:
+    """调用前向共享的供应商限流器申请额度，限流错误时按 Retry-After 暂停该供应商"""
+
+    def _acquire(self, messages) -> int:
+        estimated = rate_limiter.estimate_tokens(messages)
+        self.limiter.acquire(estimated)
+        return estimated
+
+    async def _aacquire(self, messages) -> int:
+        estimated = rate_limiter.estimate_tokens(messages)
+        await self.limiter.aacquire(estimated)
+        return estimated
+
+    def _settle(self, estimated: int, result: LLMResponse, start: float) -> LLMResponse:
+        """按实际用量结算限流器额度，并记下从发出请求（取得额度之后）到收到结果的耗时"""
+        self.limiter.settle(estimated, result.usage.get("prompt_tokens", 0) + result.usage.get("completion_tokens", 0))
+        return result._replace(latency=time.perf_counter() - start)
+
+    def _fail(self, e: Exception) -> Exception:
+        e = self._translate_error(e)
+        if isinstance(e, LLMRateLimitError) and e.retry_after:
+            self.limiter.block(e.retry_after)
+        return e
+
+class OpenAILLMClient(UsageTracker, RateLimited):
+    def __init__(self, model="deepseek-chat", stream: bool = False):
+        """
+        初始化LLM客户端
+            stream: 决策请求是否使用流式响应，收到完整的 Action 后立即结束，不等待之后的说明文字
+        """
+        # 密钥配置与底层HTTP客户端均由进程级注册表共享
+        api_key = client_pool.get_api_key(model)
         try:
-            api_key = config.get(model_to_key_name[model])
             base_url = model_to_url[model]
         except:
             raise ValueError("不支持的LLM供应商！")
 
         self.model = model
+        self._api_key = api_key
+        self._base_url = base_url
 
-        self.client = OpenAI(
-            api_key=api_key,
-            base_url=base_url
-        )
+        self.output_mode = model_output_modes.get(model, "json_object")
+        self.stream = stream
+
+        self.client = client_pool.get_openai_client(base_url, api_key)
+        self.limiter = rate_limiter.get_limiter(model, api_key)
+        self._init_usage()
 
     def chat(self, messages):
         """与LLM交互
@@ -32,74 +133,273 @@ class OpenAILLMClient:
             messages: 消息列表
 
         Returns:
-            tuple: (content, reasoning_content)
+            LLMResponse: content, reasoning_content 以及本次的用量、耗时
         """
+        estimated = self._acquire(messages)
+        start = time.perf_counter()
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                response_format={'type': 'json_object'}
-            )
-            if response.choices:
-                message = response.choices[0].message
-                content = message.content if message.content else ""
-                reasoning_content = getattr(message, "reasoning_content", "")
-                return content, reasoning_content
+            result = self._stream(messages, Action) if self.stream else self._create(messages, Action)
+        except Exception as e:
+            raise self._fail(e)
+        return self._settle(estimated, result, start)
 
-            return "", ""
+    async def achat(self, messages):
+        """chat 的协程版本，基于 AsyncOpenAI"""
+        estimated = await self._aacquire(messages)
+        start = time.perf_counter()
+        try:
+            result = await (self._astream(messages, Action) if self.stream else self._acreate(messages, Action))
+        except Exception as e:
+            raise self._fail(e)
+        return self._settle(estimated, result, start)
 
-        except RateLimitError as e:
-            raise LLMRateLimitError(str(e))
-        except APIError as e:
-            # 检查503
-            if getattr(e, 'http_status', None) == 503 or 'overloaded' in str(e).lower():
-                raise LLMRateLimitError(str(e))
-            else:
-                raise
+    def reflect(self, messages, other_players):
+        estimated = self._acquire(messages)
+        start = time.perf_counter()
+        try:
+            result = self._create(messages, reflect_schema(other_players))
         except Exception as e:
-            if '503' in str(e) or 'unavailable' in str(e).lower() or 'overloaded' in str(e).lower():
-                raise LLMRateLimitError(str(e))
-            else:
+            raise self._fail(e)
+        return self._settle(estimated, result, start)
+
+    async def areflect(self, messages, other_players):
+        """reflect 的协程版本"""
+        estimated = await self._aacquire(messages)
+        start = time.perf_counter()
+        try:
+            result = await self._acreate(messages, reflect_schema(other_players))
+        except Exception as e:
+            raise self._fail(e)
+        return self._settle(estimated, result, start)
+
+    def _create(self, messages, schema: type[BaseModel]):
+        try:
+            response = self.client.chat.completions.create(model=self.model, messages=messages, **self._output_kwargs(schema))
+        except BadRequestError as e:
+            if not self._downgrade(e):
+                raise
+            response = self.client.chat.completions.create(model=self.model, messages=messages, **self._output_kwargs(schema))
+        return self._parse_response(response)
+
+    async def _acreate(self, messages, schema: type[BaseModel]):
+        client = self._get_async_client()
+        try:
+            response = await client.chat.completions.create(model=self.model, messages=messages, **self._output_kwargs(schema))
+        except BadRequestError as e:
+            if not self._downgrade(e):
+                raise
+            response = await client.chat.completions.create(model=self.model, messages=messages, **self._output_kwargs(schema))
+        return self._parse_response(response)
+
+    def _stream(self, messages, schema: type[BaseModel]):
+        """流式请求，收到完整的 Action 后关闭连接"""
+        collector = _StreamCollector()
+        try:
+            stream = self.client.chat.completions.create(model=self.model, messages=messages, **self._stream_kwargs(schema))
+        except BadRequestError as e:
+            if not self._downgrade(e):
+                raise
+            stream = self.client.chat.completions.create(model=self.model, messages=messages, **self._stream_kwargs(schema))
+        try:
+            for chunk in stream:
+                if collector.feed(chunk):
+                    break
+        finally:
+            stream.close()
+        return self._finish_stream(collector)
+
+    async def _astream(self, messages, schema: type[BaseModel]):
+        """_stream 的协程版本"""
+        client = self._get_async_client()
+        collector = _StreamCollector()
+        try:
+            stream = await client.chat.completions.create(model=self.model, messages=messages, **self._stream_kwargs(schema))
+        except BadRequestError as e:
+            if not self._downgrade(e):
                 raise
+            stream = await client.chat.completions.create(model=self.model, messages=messages, **self._stream_kwargs(schema))
+        try:
+            async for chunk in stream:
+                if collector.feed(chunk):
+                    break
+        finally:
+            await stream.close()
+        return self._finish_stream(collector)
+
+    def _stream_kwargs(self, schema: type[BaseModel]) -> dict:
+        return {"stream": True, "stream_options": {"include_usage": True}, **self._output_kwargs(schema)}
+
+    def _finish_stream(self, collector: "_StreamCollector") -> LLMResponse:
+        # 提前结束时收不到末尾的用量信息，只记录调用次数
+        usage = self._extract_usage(collector) if collector.usage else {}
+        self._record_usage(usage)
+        timing = self._record_timing(collector.ttft, collector.ttva, collector.early_stop)
+        return LLMResponse(collector.content, collector.reasoning_content, self.model, usage, timing)
+
+    def _output_kwargs(self, schema: type[BaseModel]) -> dict:
+        """按模型的结构化输出能力生成请求参数，见 snippets.model_output_modes"""
+        name = schema.__name__
+        if self.output_mode == "json_schema":
+            return {"response_format": {
+                "type": "json_schema",
+                "json_schema": {"name": name, "schema": _strict_json_schema(schema), "strict": True},
+            }}
+        if self.output_mode == "tools":
+            return {
+                "tools": [{
+                    "type": "function",
+                    "function": {"name": name, "description": schema.__doc__ or name, "parameters": _strict_json_schema(schema)},
+                }],
+                "tool_choice": {"type": "function", "function": {"name": name}},
+            }
+        return {"response_format": {"type": "json_object"}}
+
+    def _downgrade(self, e: BadRequestError) -> bool:
+        """
+        供应商拒绝结构化输出参数时退回 json_object，之后的请求不再尝试；
+        超出上下文长度、内容审核等与结构化输出无关的400原样抛出，不改变输出方式
+        """
+        if self.output_mode == "json_object":
+            return False
+        error = f"{e} {getattr(e, 'param', None) or ''}"
+        if not any(word in error for word in _STRUCTURED_PARAMS):
+            return False
+        log.info("%s 不支持 %s 输出，改用 json_object：%s", self.model, self.output_mode, str(e))
+        self.output_mode = "json_object"
+        return True
+
+    def _get_async_client(self) -> AsyncOpenAI:
+        return client_pool.get_async_openai_client(self._base_url, self._api_key)
 
-    def reflect(self, messages, *args):
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            response_format={'type': 'json_object'}
-        )
+    def _parse_response(self, response) -> LLMResponse:
+        """从响应中取出 content 与 reasoning_content，并记录用量"""
+        usage = self._extract_usage(response)
+        self._record_usage(usage)
         if response.choices:
             message = response.choices[0].message
             content = message.content if message.content else ""
+            if tool_calls := getattr(message, "tool_calls", None):
+                content = tool_calls[0].function.arguments or content      # 函数调用模式下结果在参数中
             reasoning_content = getattr(message, "reasoning_content", "")
-            return content, reasoning_content
+            return LLMResponse(content, reasoning_content, self.model, usage)
 
-        return "", ""
+        return LLMResponse("", "", self.model, usage)
 
-class Action(BaseModel):
-    """LLM决策输出的JSON格式"""
-    challenge: bool
-    value: int
-    number: int
-    reason: str
-    behaviour: str
+    @staticmethod
+    def _extract_usage(response) -> dict:
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return {}
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) if details else None
+        if cached is None:
+            cached = getattr(usage, "prompt_cache_hit_tokens", None)     # deepseek 的字段名
+        completion_details = getattr(usage, "completion_tokens_details", None)
+        reasoning = getattr(completion_details, "reasoning_tokens", None) if completion_details else None
+        return {
+            "prompt_tokens": usage.prompt_tokens or 0,
+            "completion_tokens": usage.completion_tokens or 0,
+            "reasoning_tokens": reasoning or 0,
+            "cached_tokens": cached or 0,
+        }
 
-class GoogleLLMClient:
-    def __init__(self, model="gemini-2.5-flash-preview-05-20"):
-        """初始化LLM客户端"""
-        # 打开并读取文件
-        with open('config/keys.json', 'r', encoding='utf-8') as f:
-            config = json.load(f)
+    @staticmethod
+    def _retry_after(e: Exception) -> float | None:
+        """读取响应头中的 retry-after-ms / retry-after（秒）"""
+        response = getattr(e, "response", None)
+        if response is None:
+            return None
         try:
-            api_key = config.get(model_to_key_name[model])
-        except:
-            raise ValueError("不支持的LLM供应商！")
+            if (value := response.headers.get("retry-after-ms")) is not None:
+                return float(value) / 1000
+            if (value := response.headers.get("retry-after")) is not None:
+                return float(value)
+        except ValueError:
+            pass
+        return None
+
+    @staticmethod
+    def _translate_error(e: Exception) -> Exception:
+        """将限流/过载类错误转换为 LLMRateLimitError，其余错误原样返回"""
+        if isinstance(e, RateLimitError):
+            return LLMRateLimitError(str(e), retry_after=OpenAILLMClient._retry_after(e))
+        if isinstance(e, APIError):
+            # 检查503
+            if getattr(e, 'status_code', None) == 503 or getattr(e, 'http_status', None) == 503 or 'overloaded' in str(e).lower():
+                return LLMRateLimitError(str(e), retry_after=OpenAILLMClient._retry_after(e))
+            return e
+        if '503' in str(e) or 'unavailable' in str(e).lower() or 'overloaded' in str(e).lower():
+            return LLMRateLimitError(str(e))
+        return e
+
+class _StreamCollector:
+    """汇总流式响应的分块，增量解析决策并记录首token时间与完整决策时间"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.parser = ActionStreamParser()
+        self.reasoning = []
+        self.usage = None
+        self.ttft: float | None = None
+        self.ttva: float | None = None
+        self.early_stop = False
+
+    def feed(self, chunk) -> bool:
+        """处理一个分块，已收到完整的 Action 时返回True"""
+        if getattr(chunk, "usage", None):
+            self.usage = chunk.usage
+        if not chunk.choices:
+            return False
+        delta = chunk.choices[0].delta
+        pieces = []
+        if reasoning := getattr(delta, "reasoning_content", None):
+            self.reasoning.append(reasoning)
+            pieces.append(reasoning)
+        if delta.content:
+            pieces.append(delta.content)
+        for tool_call in getattr(delta, "tool_calls", None) or []:
+            if tool_call.function and tool_call.function.arguments:
+                pieces.append(tool_call.function.arguments)
+        if pieces and self.ttft is None:
+            self.ttft = time.perf_counter() - self.start
+        answer = "".join(pieces[1:] if reasoning else pieces)
+        finished = chunk.choices[0].finish_reason is not None
+        if answer and self.parser.feed(answer) is not None:
+            self.ttva = time.perf_counter() - self.start
+            self.early_stop = not finished
+            return True
+        if finished and self.parser.action is not None:
+            self.ttva = time.perf_counter() - self.start      # 流正常结束，以最后一个完整的 Action 为准
+        return False
+
+    @property
+    def content(self) -> str:
+        """已收到的回答；收到完整 Action 时截止到最后一个 Action 对象结束"""
+        text = self.parser.text
+        return text[:self.parser.end] if self.parser.end >= 0 else text
+
+    @property
+    def reasoning_content(self) -> str:
+        return "".join(self.reasoning)
+
+class GoogleLLMClient(UsageTracker, RateLimited):
+    def __init__(self, model="gemini-2.5-flash-preview-05-20", cache_system_prompt: bool = False):
+        """
+        初始化LLM客户端
+            cache_system_prompt: 是否为系统提示词显式创建 Gemini 缓存内容（cached content），
+                                 创建失败（如长度低于最小缓存要求）时退回 system_instruction
+        """
+        api_key = client_pool.get_api_key(model)
 
         self.model = model
+        self.cache_system_prompt = cache_system_prompt
+        self._cached_contents = {}      # 系统提示词哈希 -> 缓存内容名（None表示无法缓存）
+        self._cache_lock = threading.Lock()
+        self._async_cache_locks = weakref.WeakKeyDictionary()     # 事件循环 -> asyncio.Lock
 
-        self.client = genai.Client(
-            api_key=api_key
-        )
+        self.client = client_pool.get_genai_client(api_key)
+        self.limiter = rate_limiter.get_limiter(model, api_key)
+        self._init_usage()
 
     def chat(self, messages):
         """与LLM交互
@@ -108,50 +408,134 @@ class GoogleLLMClient:
             messages: 消息列表
 
         Returns:
-            tuple: (content, reasoning_content)
+            LLMResponse: content, reasoning_content 以及本次的用量、耗时
         """
+        return self._generate(messages, Action)
+
+    async def achat(self, messages):
+        """chat 的协程版本，基于 genai 的异步客户端"""
+        return await self._agenerate(messages, Action)
+
+    def reflect(self, messages, other_players):
+        return self._generate(messages, reflect_schema(other_players))
+
+    async def areflect(self, messages, other_players):
+        """reflect 的协程版本"""
+        return await self._agenerate(messages, reflect_schema(other_players))
+
+    def _generate(self, messages, schema):
+        estimated = self._acquire(messages)
+        start = time.perf_counter()
         try:
             response = self.client.models.generate_content(
                 model=self.model,
-                contents=messages[0]['content'] + messages[1]['content'],
-                config={
-                    "response_mime_type": "application/json",
-                    "response_schema": Action,
-                }
+                contents=messages[1]['content'],
+                config=self._config(self._cached_content(messages[0]['content']), messages[0]['content'], schema)
             )
-            if content := response.text:
-                reasoning_content = ""
-                return content, reasoning_content
-
-            return "", ""
+            result = self._parse_response(response)
+        except Exception as e:
+            raise self._fail(e)
+        return self._settle(estimated, result, start)
 
-        except google.api_core.exceptions.ResourceExhausted as e:
-            raise LLMRateLimitError(str(e))
-        except google.api_core.exceptions.ServiceUnavailable as e:
-            raise LLMRateLimitError(str(e))
+    async def _agenerate(self, messages, schema):
+        estimated = await self._aacquire(messages)
+        start = time.perf_counter()
+        try:
+            response = await self.client.aio.models.generate_content(
+                model=self.model,
+                contents=messages[1]['content'],
+                config=self._config(await self._acached_content(messages[0]['content']), messages[0]['content'], schema)
+            )
+            result = self._parse_response(response)
         except Exception as e:
-            if '503' in str(e) or 'unavailable' in str(e).lower() or 'overloaded' in str(e).lower():
-                raise LLMRateLimitError(str(e))
-            else:
-                raise
+            raise self._fail(e)
+        return self._settle(estimated, result, start)
 
+    @staticmethod
+    def _config(cached_content: str | None, system: str, schema) -> dict:
+        """系统提示词通过 system_instruction 或缓存内容传入，保证请求前缀稳定"""
+        config = {
+            "response_mime_type": "application/json",
+            "response_schema": schema,
+        }
+        if cached_content:
+            config["cached_content"] = cached_content
+        else:
+            config["system_instruction"] = system
+        return config
 
-    def reflect(self, messages, other_players):
+    def _cache_key(self, system: str) -> str | None:
+        if not self.cache_system_prompt:
+            return None
+        return hashlib.sha256(system.encode("utf-8")).hexdigest()
 
-        # 配置LLM反思的json输出格式
-        response_format = {p.name: (str, Field(description="填入中文字符串")) for p in other_players}
-        response_schema = create_model("ReflectResponse", **response_format)
+    def _cached_content(self, system: str) -> str | None:
+        """获取系统提示词对应的缓存内容名，首次使用时创建"""
+        if (key := self._cache_key(system)) is None:
+            return None
+        with self._cache_lock:
+            if key not in self._cached_contents:
+                try:
+                    cache = self.client.caches.create(model=self.model, config={"system_instruction": system, "ttl": "3600s"})
+                    self._cached_contents[key] = cache.name
+                except Exception as e:
+                    self._cache_failed(key, e)
+            return self._cached_contents[key]
 
-        response = self.client.models.generate_content(
-            model=self.model,
-            contents=messages[0]['content'] + messages[1]['content'],
-            config={
-                "response_mime_type": "application/json",
-                "response_schema": response_schema,
-            }
-        )
-        if content := response.text:
-            reasoning_content = ""
-            return content, reasoning_content
+    async def _acached_content(self, system: str) -> str | None:
+        """_cached_content 的协程版本；同一事件循环中并发的首次调用只创建一次缓存内容"""
+        if (key := self._cache_key(system)) is None:
+            return None
+        async with self._async_cache_lock():
+            if key not in self._cached_contents:
+                try:
+                    cache = await self.client.aio.caches.create(model=self.model, config={"system_instruction": system, "ttl": "3600s"})
+                    self._cached_contents[key] = cache.name
+                except Exception as e:
+                    self._cache_failed(key, e)
+        return self._cached_contents[key]
+
+    def _async_cache_lock(self) -> asyncio.Lock:
+        """当前事件循环的缓存创建锁（asyncio.Lock 不能跨事件循环使用）"""
+        loop = asyncio.get_running_loop()
+        with self._cache_lock:
+            if (lock := self._async_cache_locks.get(loop)) is None:
+                lock = self._async_cache_locks[loop] = asyncio.Lock()
+            return lock
+
+    def _cache_failed(self, key: str, e: Exception):
+        """缓存内容创建失败时退回 system_instruction；提示词低于最小缓存长度时每个模型只提示一次"""
+        self._cached_contents[key] = None
+        message = str(e)
+        if "too small" in message or "min_total_token_count" in message:
+            if self.model not in _small_prompt_logged:
+                _small_prompt_logged.add(self.model)
+                log.info("%s 的系统提示词低于缓存内容的最小长度，改用 system_instruction 传入", self.model)
+        else:
+            log.warning("%s 创建缓存内容失败，改用 system_instruction 传入：%s", self.model, message)
+
+    def _parse_response(self, response) -> LLMResponse:
+        usage = self._extract_usage(response)
+        self._record_usage(usage)
+        return LLMResponse(response.text or "", "", self.model, usage)
+
+    @staticmethod
+    def _extract_usage(response) -> dict:
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return {}
+        return {
+            "prompt_tokens": usage.prompt_token_count or 0,
+            "completion_tokens": usage.candidates_token_count or 0,
+            "reasoning_tokens": getattr(usage, "thoughts_token_count", None) or 0,
+            "cached_tokens": usage.cached_content_token_count or 0,
+        }
 
-        return "", ""
\ No newline at end of file
+    @staticmethod
+    def _translate_error(e: Exception) -> Exception:
+        """将限流/过载类错误转换为 LLMRateLimitError，其余错误原样返回"""
+        if isinstance(e, (google.api_core.exceptions.ResourceExhausted, google.api_core.exceptions.ServiceUnavailable)):
+            return LLMRateLimitError(str(e))
+        if '503' in str(e) or 'unavailable' in str(e).lower() or 'overloaded' in str(e).lower():
+            return LLMRateLimitError(str(e))
+        return e
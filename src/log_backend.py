@@ -0,0 +1,133 @@
+"""
+基于队列的单写线程日志后端
+
+每局游戏的 logger 只挂一个 QueueHandler，日志记录放入进程级队列后立即返回；
+由一个 QueueListener 写线程按记录上的 game_log 路由到各局自己的文件，文件带缓冲写入，
+路径以 .gz/.zst 结尾时压缩输出。对局结束时调用 close_game_log，写线程处理完该局之前的记录后关闭文件。
+logger 不注册到 logging 的全局表中，关闭后即可被回收，长时间的锦标赛不会积累 logger 和文件描述符。
+
+用法：
+    logger = open_game_log("logs/game_0.log.gz")
+    ...
+    close_game_log(logger)
+"""
+
+import atexit
+import logging
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict
+
+from src.events import open_text
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# 后端参数，可在打开第一个日志前通过 configure 调整
+_config = {
+    "buffer_size": 1 << 16,     # 每个文件的写缓冲区大小（字节）
+}
+
+_lock = threading.Lock()
+_queue: queue.SimpleQueue = queue.SimpleQueue()
+_listener: QueueListener | None = None
+_router: "_RoutingHandler | None" = None
+
+class _GameQueueHandler(QueueHandler):
+    """把记录标上所属的日志文件后放入队列"""
+
+    def __init__(self, path: str):
+        super().__init__(_queue)
+        self.path = path
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = super().prepare(record)
+        record.game_log = self.path
+        return record
+
+class _RoutingHandler(logging.Handler):
+    """运行在写线程中，按 game_log 把记录写入各自的文件"""
+
+    def __init__(self, buffer_size: int):
+        super().__init__()
+        self.setFormatter(logging.Formatter(LOG_FORMAT))
+        self.buffer_size = buffer_size
+        self.files: Dict[str, object] = {}
+        self.written = 0
+
+    def _open(self, path: str):
+        if path.endswith((".gz", ".zst")):
+            return open_text(path, "w")
+        return open(path, "w", encoding="utf-8", buffering=self.buffer_size)
+
+    def emit(self, record: logging.LogRecord):
+        path = record.game_log
+        try:
+            if getattr(record, "close_log", False):
+                if (f := self.files.pop(path, None)) is not None:
+                    f.close()
+                return
+            if (f := self.files.get(path)) is None:
+                f = self.files[path] = self._open(path)
+            f.write(self.format(record) + "\n")
+            self.written += 1
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        for f in self.files.values():
+            f.flush()
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        self.files.clear()
+        super().close()
+
+def configure(buffer_size: int | None = None):
+    """设置写缓冲区大小（只影响之后启动的写线程）"""
+    with _lock:
+        if buffer_size is not None:
+            _config["buffer_size"] = buffer_size
+
+def _ensure_started():
+    global _listener, _router
+    with _lock:
+        if _listener is None:
+            _router = _RoutingHandler(_config["buffer_size"])
+            _listener = QueueListener(_queue, _router)
+            _listener.start()
+
+def open_game_log(path: str, name: str | None = None, level: int = logging.INFO) -> logging.Logger:
+    """创建写入 path 的 logger（文件在第一条记录写入时才打开）"""
+    _ensure_started()
+    logger = logging.Logger(name or path, level)    # 不经过 getLogger，不会留在全局表中
+    logger.addHandler(_GameQueueHandler(path))
+    return logger
+
+def close_game_log(logger: logging.Logger):
+    """对局结束时调用：移除 logger 的处理器，写线程写完之前的记录后关闭文件；可重复调用"""
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        if isinstance(handler, _GameQueueHandler):
+            record = logging.LogRecord(logger.name, logging.INFO, "", 0, "", None, None)
+            record.game_log = handler.path
+            record.close_log = True
+            _queue.put_nowait(record)
+        handler.close()
+
+def open_files() -> int:
+    """写线程当前打开的文件数"""
+    return len(_router.files) if _router else 0
+
+def shutdown():
+    """处理完队列中的所有记录并关闭全部文件；之后再打开日志会重新启动写线程"""
+    global _listener, _router
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _router.close()
+        _listener = _router = None
+
+atexit.register(shutdown)
@@ -0,0 +1,137 @@
+"""
+LLM调用指标
+
+记录每一次LLM调用的模型、类型（action/reflect）、第几次尝试、耗时、token用量
+（输入/输出/推理/缓存命中）以及结果，按 (模型, 类型) 汇总为延迟直方图与计数，
+在批量运行结束时导出为 Prometheus 文本格式和JSON摘要。
+"""
+
+import json
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List
+
+# 延迟直方图的桶上界（秒），最后一个桶为 +Inf
+LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0]
+TOKEN_KINDS = ("prompt_tokens", "completion_tokens", "reasoning_tokens", "cached_tokens")
+# 调用结果：ok 成功；parse_error 有响应但解析失败；rate_limited 限流/过载；error 其他错误
+OUTCOMES = ("ok", "parse_error", "rate_limited", "error")
+
+class _Series:
+    """一个 (模型, 类型) 的汇总数据"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.count = 0
+        self.outcomes = {outcome: 0 for outcome in OUTCOMES}
+        self.attempts: Dict[int, int] = defaultdict(int)    # 第几次尝试 -> 次数
+        self.tokens = {kind: 0 for kind in TOKEN_KINDS}
+
+    def observe(self, attempt: int, latency: float, usage: Dict[str, int], outcome: str):
+        self.count += 1
+        self.latency_sum += latency
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+        self.outcomes[outcome] += 1
+        self.attempts[attempt] += 1
+        for kind in TOKEN_KINDS:
+            self.tokens[kind] += usage.get(kind, 0)
+
+    def quantile(self, q: float) -> float | None:
+        """按直方图估算分位数（取所在桶的上界）"""
+        if not self.count:
+            return None
+        target = q * self.count
+        total = 0
+        for bound, n in zip(LATENCY_BUCKETS + [float("inf")], self.buckets):
+            total += n
+            if total >= target:
+                return bound
+        return float("inf")
+
+class CallMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series: Dict[tuple[str, str], _Series] = defaultdict(_Series)
+
+    def observe(self, model: str, kind: str, attempt: int, latency: float, usage: Dict[str, int] | None, outcome: str):
+        """
+        记录一次LLM调用
+            kind: "action" 或 "reflect"
+            attempt: 第几次尝试（从1开始）
+            outcome: 见 OUTCOMES
+        """
+        with self._lock:
+            self._series[(model, kind)].observe(attempt, latency, usage or {}, outcome)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """每个 (模型, 类型) 的汇总"""
+        with self._lock:
+            return [
+                {
+                    "model": model,
+                    "kind": kind,
+                    "calls": series.count,
+                    "latency_sum": round(series.latency_sum, 3),
+                    "latency_mean": round(series.latency_sum / series.count, 3) if series.count else None,
+                    "latency_p50": series.quantile(0.5),
+                    "latency_p95": series.quantile(0.95),
+                    "latency_buckets": dict(zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"], series.buckets)),
+                    "outcomes": dict(series.outcomes),
+                    "attempts": {str(k): v for k, v in sorted(series.attempts.items())},
+                    "tokens": dict(series.tokens),
+                }
+                for (model, kind), series in sorted(self._series.items())
+            ]
+
+    def to_prometheus(self) -> str:
+        """导出为 Prometheus 文本格式"""
+        lines = [
+            "# HELP liars_dice_llm_latency_seconds LLM call wall latency",
+            "# TYPE liars_dice_llm_latency_seconds histogram",
+        ]
+        with self._lock:
+            items = sorted(self._series.items())
+            for (model, kind), series in items:
+                labels = f'model="{model}",kind="{kind}"'
+                cumulative = 0
+                for bound, n in zip(LATENCY_BUCKETS, series.buckets):
+                    cumulative += n
+                    lines.append(f'liars_dice_llm_latency_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'liars_dice_llm_latency_seconds_bucket{{{labels},le="+Inf"}} {series.count}')
+                lines.append(f"liars_dice_llm_latency_seconds_sum{{{labels}}} {series.latency_sum:.6f}")
+                lines.append(f"liars_dice_llm_latency_seconds_count{{{labels}}} {series.count}")
+            lines += ["# HELP liars_dice_llm_calls_total LLM calls by outcome", "# TYPE liars_dice_llm_calls_total counter"]
+            for (model, kind), series in items:
+                for outcome, n in series.outcomes.items():
+                    lines.append(f'liars_dice_llm_calls_total{{model="{model}",kind="{kind}",outcome="{outcome}"}} {n}')
+            lines += ["# HELP liars_dice_llm_attempts_total LLM calls by attempt number", "# TYPE liars_dice_llm_attempts_total counter"]
+            for (model, kind), series in items:
+                for attempt, n in sorted(series.attempts.items()):
+                    lines.append(f'liars_dice_llm_attempts_total{{model="{model}",kind="{kind}",attempt="{attempt}"}} {n}')
+            lines += ["# HELP liars_dice_llm_tokens_total LLM token usage", "# TYPE liars_dice_llm_tokens_total counter"]
+            for (model, kind), series in items:
+                for token_kind, n in series.tokens.items():
+                    lines.append(f'liars_dice_llm_tokens_total{{model="{model}",kind="{kind}",type="{token_kind.removesuffix("_tokens")}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, prefix: str) -> tuple[str, str]:
+        """写出 <prefix>.prom 与 <prefix>.json，返回两个文件路径"""
+        prom_path, json_path = f"{prefix}.prom", f"{prefix}.json"
+        with open(prom_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+        return prom_path, json_path
+
+# 进程级的指标注册表
+metrics = CallMetrics()
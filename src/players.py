@@ -1,46 +1,94 @@
 import random
 import time
+import asyncio
+import json
 import threading
 import logging
-from src.llm_client import OpenAILLMClient, GoogleLLMClient
+from src.llm_client import OpenAILLMClient, GoogleLLMClient, LLMResponse
 from typing import List, Dict, Any
 from src.snippets import *
 from src.json_parser import *
+from src.fast_parser import parse_action, parse_reflection
+from src.templates import template_store, CompiledTemplate
+from src.decision_cache import DecisionCache
+from src.bots import create_bot
+from src.rate_limiter import backoff_delay
+from src import circuit_breaker
+from src.metrics import metrics
 
 RULE_PATH = "template/rule.txt"
 ACTION_PROMPT_TEMPLATE_PATH = "template/action_prompt_template.txt"
 FIRST_PLAYER_ACTION_PROMPT_TEMPLATE_PATH = "template/first_player_action_prompt_template.txt"
 REFLECT_PROMPT_TEMPLATE_PATH = "template/reflect_prompt_template.txt"
+# prefix_cache 布局：系统消息只含每局不变的内容，用户消息按变化频率从低到高排列
+ACTION_SYSTEM_PROMPT_TEMPLATE_PATH = "template/action_system_prompt_template.txt"
+ACTION_USER_PROMPT_TEMPLATE_PATH = "template/action_user_prompt_template.txt"
+FIRST_PLAYER_ACTION_USER_PROMPT_TEMPLATE_PATH = "template/first_player_action_user_prompt_template.txt"
+MAX_RETRIES = 4     # 每次决策/反思最多调用LLM的次数
 
 class Player():
-    def __init__(self, name = "", is_human = False, model: str = "", logger: logging.Logger | None = None):
+    def __init__(self, name = "", is_human = False, model: str = "", logger: logging.Logger | None = None, prompt_layout: str = "default",
+                 decision_cache: DecisionCache | None = None, llm_client = None, stream: bool = False):
         """
         初始化玩家属性
             name: 玩家名称
             is_human: 是否为人类玩家
             model: AI模型，如"deepseek-chat"
+            prompt_layout: 提示词布局，"default" 或 "prefix_cache"（保持请求前缀逐字节稳定，以命中供应商的提示词缓存）
+            decision_cache: 可选的局面决策缓存，可在多局、多个玩家之间共享
+            llm_client: 直接指定LLM客户端（如回放客户端），为None时按模型创建
+            stream: OpenAI 兼容模型的决策请求是否使用流式响应（收到完整决策即结束）
         """
+        if prompt_layout not in prompt_layouts:
+            raise ValueError(f"不支持的提示词布局: {prompt_layout}")
         self.logger = logger
         self.name = name
         self.is_human = is_human
         self.model = model
+        self.prompt_layout = prompt_layout
+        self.decision_cache = decision_cache
         self.dice = []      # 骰子列表
         self.poison = 2     # 毒药数量
+        self.bot = None     # 基于规则的机器人策略
         if is_human:
             self.llm_client = None
+        elif model_to_API.get(model) == "Bot":
+            self.llm_client = None
+            self.bot = create_bot(model)
+        elif llm_client is not None:
+            self.llm_client = llm_client
         else:
-            match model_to_API[model]:
-                case "OpenAI":
-                    self.llm_client = OpenAILLMClient(self.model)
-                case "Google":
-                    self.llm_client = GoogleLLMClient(self.model)
-                case _:
-                    raise ValueError(f"不支持的模型: {self.model}")
+            self.llm_client = self._create_llm_client(model, stream)
+            if circuit_breaker.is_enabled():
+                # 熔断器打开或调用失败时切换到备用模型
+                fallback = model_fallbacks.get(model)
+                self.llm_client = circuit_breaker.FailoverLLMClient(
+                    self.llm_client, self._create_llm_client(fallback, stream) if fallback else None
+                )
         self.gui = None     # GUI引用，用于人类玩家交互
         self.opinions = {}  # 对其他玩家的看法
-
-    def roll_dice(self, count):
-        self.dice = [random.randint(1, 6) for _ in range(count)]
+        self.recorder = None    # 对局记录器，由 LiarsDiceGame 设置
+        self.events = None      # 对局事件流，由 LiarsDiceGame 设置
+        self.rng = random.Random()      # 玩家的随机数生成器，由 LiarsDiceGame 按对局种子重新设置
+        self._templates = {}    # 模板路径 -> (编译模板, 静态字段, 填入静态字段后的模板)
+        self._uncached: tuple[str, Dict[str, Any]] | None = None    # 等待引擎确认合法后再加入决策缓存的 (键, 决策)
+
+    def _create_llm_client(self, model: str, stream: bool):
+        match model_to_API.get(model):
+            case "OpenAI":
+                return OpenAILLMClient(model, stream=stream)
+            case "Google":
+                return GoogleLLMClient(model, cache_system_prompt=self.prompt_layout == "prefix_cache")
+            case _:
+                raise ValueError(f"不支持的模型: {model}")
+
+    @property
+    def is_bot(self) -> bool:
+        return self.bot is not None
+
+    def roll_dice(self, count, rng: random.Random | None = None):
+        """摇骰子，rng 为对局的随机数生成器（为None时使用全局random）"""
+        self.dice = [(rng or random).randint(1, 6) for _ in range(count)]
         return self.dice.sort()
 
     def count_dice(self, value):
@@ -56,39 +104,39 @@ class Player():
             return True
         return False
 
-    def _read_file(self, filepath: str):
-        """读取文件内容"""
+    def _template(self, path: str, **static_fields) -> CompiledTemplate:
+        """获取编译后的模板，并缓存预先填入本玩家静态字段的版本（模板文件更新后自动重建）"""
+        try:
+            compiled = template_store.get(path)
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"读取文件 {path} 失败: {str(e)}")
+            return CompiledTemplate("")
+        cached = self._templates.get(path)
+        if cached is None or cached[0] is not compiled or cached[1] != static_fields:
+            cached = (compiled, static_fields, compiled.partial(**static_fields))
+            self._templates[path] = cached
+        return cached[2]
+
+    def _rules(self) -> str:
+        """读取规则文本"""
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return f.read().strip()
+            return template_store.text(RULE_PATH)
         except Exception as e:
             if self.logger:
-                self.logger.error(f"读取文件 {filepath} 失败: {str(e)}")
+                self.logger.error(f"读取文件 {RULE_PATH} 失败: {str(e)}")
             return ""
 
-    def get_ai_action(self, is_first: bool, active_players: List["Player"], round_base_info: str, round_action_info: str, extra_hint: str = "") -> tuple[Dict[str, Any], str]:
-        """
-        获取AI玩家的动作
-        Args:
-            is_first: bool, 是否为本轮的第一个玩家（第一个玩家不能质疑）。
-            round_base_info: 本轮的基本信息，包含玩家数量、玩家名称、玩家顺序和毒药数量等。
-            round_action_info: 本轮游戏中已经发生的动作记录。
-            extra_hint: 额外提示信息。
-
-        Returns:
-            返回一个二元组，包含以下两部分：
-            1. 一个字典，包含以下键值对：
-                - challenge: bool, 是否质疑上家
-                - value: int, 所叫的骰子点数(1~6，若选择质疑，填入0)
-                - number: int, 所叫的骰子数量(>=1，若选择质疑，填入0)
-                - reason: str, 选择这么决策(质疑/叫点)的理由
-                - behaviour: str, 一段没有主语的行为/表情/发言等描写，能被其他玩家观察。
-            2. 大模型推理文本
-        """
-        # 读取规则和模板
-        rules = self._read_file(RULE_PATH)
-        template = self._read_file(ACTION_PROMPT_TEMPLATE_PATH)
-        first_template = self._read_file(FIRST_PLAYER_ACTION_PROMPT_TEMPLATE_PATH)
+    def _build_action_messages(self, is_first: bool, active_players: List["Player"], round_base_info: str, round_action_info: str, extra_hint: str = "") -> List[Dict[str, str]]:
+        """构造决策请求的消息列表"""
+        # 读取规则和模板（已缓存，玩家名字已预先填入）
+        rules = self._rules()
+        if self.prompt_layout == "prefix_cache":
+            system = self._template(ACTION_SYSTEM_PROMPT_TEMPLATE_PATH, rules=rules, player_name=self.name).render()
+            template = self._template(FIRST_PLAYER_ACTION_USER_PROMPT_TEMPLATE_PATH if is_first else ACTION_USER_PROMPT_TEMPLATE_PATH)
+        else:
+            system = rules
+            template = self._template(FIRST_PLAYER_ACTION_PROMPT_TEMPLATE_PATH if is_first else ACTION_PROMPT_TEMPLATE_PATH, player_name=self.name)
 
         # 准备当前手牌信息
         current_dice = ", ".join([str(dice) for dice in self.dice])
@@ -106,55 +154,184 @@ class Player():
             round_base_info += f"你的上家是{previous.name}，你的下家是{next.name}"
 
         # 填充模板
-        if is_first:
-            prompt = first_template.format(
-                player_name = self.name,
-                round_base_info = round_base_info,
-                round_action_info = round_action_info,
-                opinions=opinions,
-                dices = current_dice,
-                extra_hint = extra_hint,
-            )
-        else:
-            prompt = template.format(
-                player_name = self.name,
-                round_base_info = round_base_info,
-                round_action_info = round_action_info,
-                opinions=opinions,
-                dices = current_dice,
-                extra_hint = extra_hint,
-            )
+        prompt = template.render(
+            round_base_info = round_base_info,
+            round_action_info = round_action_info,
+            opinions=opinions,
+            dices = current_dice,
+            extra_hint = extra_hint,
+        )
 
-        # 尝试获取有效的JSON响应
-        max_retries = 4
-        for attempt in range(max_retries):
-            # 每次都发送相同的原始prompt
-            messages = [{"role": "system", "content": rules},
-            {"role": "user", "content": prompt}]
+        return [{"role": "system", "content": system},
+        {"role": "user", "content": prompt}]
 
-            try:
-                content, reasoning_content = self.llm_client.chat(messages)
+    def _parse_action(self, content: str) -> Dict[str, Any]:
+        """从LLM响应中解析并校验决策JSON，只有快速路径失败时才会用到 json_repair"""
+        return parse_action(content)
+
+    def _record(self, kind: str, messages: List[Dict[str, str]] | None, content: str, reasoning_content: str, source: str = "llm",
+                model: str | None = None):
+        """向对局记录器写入一次原始响应，model 为实际应答的模型"""
+        if self.recorder:
+            self.recorder.log_call(self.name, kind, messages, content, reasoning_content, source, model or self.model)
+
+    def _log_timing(self, response: LLMResponse):
+        """记录流式调用的首token时间与收到完整决策的时间"""
+        timing = response.timing
+        if self.logger and timing and timing["ttft"] is not None:
+            ttva = f"{timing['ttva']:.2f}s" if timing["ttva"] is not None else "未收到"
+            self.logger.info(f"玩家 {self.name} 首token {timing['ttft']:.2f}s，完整决策 {ttva}{'（提前结束）' if timing['early_stop'] else ''}")
+
+    def _observe(self, kind: str, attempt: int, latency: float, outcome: str, response: LLMResponse | None = None):
+        """记录一次LLM调用的指标与事件；有响应时附带本次的token用量与实际应答的模型"""
+        model = (response.model or self.model) if response else self.model
+        usage = response.usage if response else None
+        metrics.observe(model, kind, attempt + 1, latency, usage, outcome)
+        if self.events:
+            self.events.emit("llm_call", player=self.name, model=model, kind=kind, attempt=attempt + 1,
+                             latency=round(latency, 3), outcome=outcome, usage=usage)
+
+    def _observe_failure(self, kind: str, attempt: int, start: float, latency: float | None, response: LLMResponse | None):
+        """response 不为None说明已收到响应，失败发生在解析阶段"""
+        if response is not None:
+            self._observe(kind, attempt, latency, "parse_error", response)
+        else:
+            self._observe(kind, attempt, time.perf_counter() - start, "error")
+
+    def _decision_cache_key(self, is_first: bool, active_players: List["Player"], bid_history: List[tuple[str, int, int]] | None, extra_hint: str) -> str | None:
+        """生成规范化局面的缓存键，未启用缓存或缺少叫点记录时返回None"""
+        if self.decision_cache is None or bid_history is None:
+            return None
+        # 玩家名换成相对座位：自己为0，下家为1，依此类推
+        seat = active_players.index(self)
+        relative = {p.name: (i - seat) % len(active_players) for i, p in enumerate(active_players)}
+        return DecisionCache.make_key(
+            self.model, self.prompt_layout, is_first, self.dice,
+            [p.poison for p in active_players[seat:] + active_players[:seat]],
+            [(relative[name], number, value) for name, number, value in bid_history],
+            {relative[p.name]: self.opinions.get(p.name, "") for p in active_players if p is not self}, extra_hint
+        )
 
-                # 尝试从响应中提取JSON
-                _, result = try_parse_json_object(content)
+    def _bot_action(self, is_first: bool, active_players: List["Player"], bid_history: List[tuple[str, int, int]] | None) -> Dict[str, Any]:
+        """机器人玩家在本地决策"""
+        number, value = bid_history[-1][1:] if bid_history else (0, 0)
+        return self.bot.decide(self.dice, number, value, DICE_PER_PLAYER * (len(active_players) - 1), is_first, self.rng)
 
-                # 验证JSON格式是否符合要求
-                if all(key in result for key in ["challenge", "value", "number", "reason", "behaviour"]):
-                    return result, reasoning_content
-                else:
-                    raise Exception("json格式不符合要求")
+    def _before_action(self, is_first: bool, active_players: List["Player"], round_base_info: str, round_action_info: str, extra_hint: str,
+                       bid_history: List[tuple[str, int, int]] | None) -> tuple[tuple[Dict[str, Any], str] | None, str | None, List[Dict[str, str]] | None]:
+        """
+        决策前的本地处理：机器人决策、查询决策缓存并构造请求消息
+        Returns:
+            (本地给出的 (行动, 推理文本)，需要询问LLM时为None; 决策缓存键; 请求消息)
+        """
+        self._uncached = None
+        if self.bot:
+            return (self._bot_action(is_first, active_players, bid_history), ""), None, None
+
+        # 相同局面已有足够采样时直接复用
+        cache_key = self._decision_cache_key(is_first, active_players, bid_history, extra_hint)
+        if cache_key and (cached := self.decision_cache.lookup(cache_key)) is not None:
+            if self.logger:
+                self.logger.info(f"玩家 {self.name} 命中决策缓存")
+            self._record("action", None, json.dumps(cached, ensure_ascii=False), "", source="cache")
+            return (cached, ""), None, None
+
+        # 每次都发送相同的原始prompt
+        return None, cache_key, self._build_action_messages(is_first, active_players, round_base_info, round_action_info, extra_hint)
+
+    def _handle_action_response(self, response: LLMResponse, messages: List[Dict[str, str]], cache_key: str | None, attempt: int,
+                                latency: float) -> tuple[Dict[str, Any], str]:
+        """记录并解析一次决策响应，解析失败时抛出异常（由调用方重试）"""
+        self._log_timing(response)
+        self._record("action", messages, response.content, response.reasoning_content, model=response.model)
+        action = self._parse_action(response.content)
+        self._observe("action", attempt, latency, "ok", response)
+        if cache_key:
+            self._uncached = (cache_key, action)
+        return action, response.reasoning_content
+
+    def _handle_rate_limit(self, kind: str, attempt: int, start: float, e: LLMRateLimitError) -> float:
+        """
+        记录一次限流
+        Returns:
+            重试前需要等待的秒数（带抖动的指数退避，优先使用 Retry-After）
+        Raises:
+            LLMRateLimitError: 已用完重试次数
+        """
+        self._observe(kind, attempt, time.perf_counter() - start, "rate_limited")
+        if attempt + 1 >= MAX_RETRIES:
+            raise e
+        return backoff_delay(attempt, e.retry_after)
+
+    def _handle_error(self, kind: str, attempt: int, start: float, latency: float | None, response: LLMResponse | None, e: Exception):
+        """记录一次失败的调用（请求出错或响应无法解析）"""
+        self._observe_failure(kind, attempt, start, latency, response)
+        if kind == "action" and self.logger:
+            self.logger.error(f"玩家 {self.name} 第{attempt+1}次尝试解析json失败: {str(e)}")
+
+    def get_ai_action(self, is_first: bool, active_players: List["Player"], round_base_info: str, round_action_info: str, extra_hint: str = "",
+                      bid_history: List[tuple[str, int, int]] | None = None) -> tuple[Dict[str, Any], str]:
+        """
+        获取AI玩家的动作
+        Args:
+            is_first: bool, 是否为本轮的第一个玩家（第一个玩家不能质疑）。
+            round_base_info: 本轮的基本信息，包含玩家数量、玩家名称、玩家顺序和毒药数量等。
+            round_action_info: 本轮游戏中已经发生的动作记录。
+            extra_hint: 额外提示信息。
+            bid_history: 本轮已发生的叫点 (玩家名, 数量, 点数)，用于决策缓存的键。
 
-            except LLMRateLimitError:
-                if attempt + 1 < max_retries:
-                    time.sleep(2 ** (attempt + 1))  # 指数退避重试
-                else:
-                    raise
+        Returns:
+            返回一个二元组，包含以下两部分：
+            1. 一个字典，包含以下键值对：
+                - challenge: bool, 是否质疑上家
+                - value: int, 所叫的骰子点数(1~6，若选择质疑，填入0)
+                - number: int, 所叫的骰子数量(>=1，若选择质疑，填入0)
+                - reason: str, 选择这么决策(质疑/叫点)的理由
+                - behaviour: str, 一段没有主语的行为/表情/发言等描写，能被其他玩家观察。
+            2. 大模型推理文本
+        """
+        local, cache_key, messages = self._before_action(is_first, active_players, round_base_info, round_action_info, extra_hint, bid_history)
+        if local:
+            return local
 
+        # 尝试获取有效的JSON响应
+        for attempt in range(MAX_RETRIES):
+            start, latency, response = time.perf_counter(), None, None
+            try:
+                response = self.llm_client.chat(messages)
+                latency = time.perf_counter() - start
+                return self._handle_action_response(response, messages, cache_key, attempt, latency)
+            except LLMRateLimitError as e:
+                time.sleep(self._handle_rate_limit("action", attempt, start, e))
             except Exception as e:
-                if self.logger:
-                    self.logger.error(f"玩家 {self.name} 第{attempt+1}次尝试解析json失败: {str(e)}")
+                self._handle_error("action", attempt, start, latency, response, e)
         raise LLMError(f"玩家 {self.name} 的get_ai_action方法在多次尝试后失败")
 
+    async def get_ai_action_async(self, is_first: bool, active_players: List["Player"], round_base_info: str, round_action_info: str, extra_hint: str = "",
+                                  bid_history: List[tuple[str, int, int]] | None = None) -> tuple[Dict[str, Any], str]:
+        """get_ai_action 的协程版本，使用异步LLM客户端，不占用线程"""
+        local, cache_key, messages = self._before_action(is_first, active_players, round_base_info, round_action_info, extra_hint, bid_history)
+        if local:
+            return local
+
+        for attempt in range(MAX_RETRIES):
+            start, latency, response = time.perf_counter(), None, None
+            try:
+                response = await self.llm_client.achat(messages)
+                latency = time.perf_counter() - start
+                return self._handle_action_response(response, messages, cache_key, attempt, latency)
+            except LLMRateLimitError as e:
+                await asyncio.sleep(self._handle_rate_limit("action", attempt, start, e))
+            except Exception as e:
+                self._handle_error("action", attempt, start, latency, response, e)
+        raise LLMError(f"玩家 {self.name} 的get_ai_action_async方法在多次尝试后失败")
+
+    def confirm_action(self, legal: bool):
+        """引擎校验上一个LLM决策后调用：合法时才加入决策缓存，避免之后命中缓存时反复得到非法决策"""
+        if self._uncached and legal:
+            self.decision_cache.add(*self._uncached)
+        self._uncached = None
+
     def get_human_action(self):
         """获取人类玩家的操作"""
         if not hasattr(self, 'gui'):
@@ -183,10 +360,10 @@ class Player():
         """初始化对其他玩家的看法"""
         self.opinions = {player.name: "还不了解这个玩家" for player in players if player is not self}
 
-    def reflect(self, other_players: List["Player"], round_base_info: str, round_action_info: str) -> tuple[bool, str, str]:
-        """更新对其他玩家的看法"""
-        template = self._read_file(REFLECT_PROMPT_TEMPLATE_PATH)
-        rules = self._read_file(RULE_PATH)
+    def _build_reflect_messages(self, other_players: List["Player"], round_base_info: str, round_action_info: str) -> List[Dict[str, str]]:
+        """构造反思请求的消息列表"""
+        template = self._template(REFLECT_PROMPT_TEMPLATE_PATH, self_name=self.name)
+        rules = self._rules()
 
         # 填充模板
         previous_opinions = '\n'.join(
@@ -196,38 +373,68 @@ class Player():
             [f'"{p.name}": str' for p in other_players]
         )
 
-        prompt = template.format(
-            self_name=self.name,
+        prompt = template.render(
             round_base_info=round_base_info,
             round_action_info=round_action_info,
             previous_opinions=previous_opinions,
             output_format=output_format
         )
 
-        messages = [{"role": "system", "content": rules},
+        return [{"role": "system", "content": rules},
         {"role": "user", "content": prompt}]
 
+    def apply_opinions(self, opinions: Dict[str, str]):
+        """让反思得到的新看法生效；后台反思时由对局线程调用，避免与行动并发读写 opinions"""
+        self.opinions.update(opinions)
+
+    def _handle_reflect_response(self, response: LLMResponse, messages: List[Dict[str, str]], attempt: int, latency: float,
+                                 apply: bool) -> tuple[bool, str, str, Dict[str, str]]:
+        """记录并解析一次反思响应"""
+        self._record("reflect", messages, response.content, response.reasoning_content, model=response.model)
+        opinions = parse_reflection(response.content, self.opinions.keys())
+        if apply:
+            self.apply_opinions(opinions)
+        self._observe("reflect", attempt, latency, "ok", response)
+        return True, response.content, response.reasoning_content, opinions
+
+    def reflect(self, other_players: List["Player"], round_base_info: str, round_action_info: str,
+                apply: bool = True) -> tuple[bool, str, str, Dict[str, str]]:
+        """
+        更新对其他玩家的看法
+            apply: 为False时只返回新看法，不修改 opinions（由调用方用 apply_opinions 生效）
+        Returns:
+            (是否成功, 反思内容或错误信息, 推理文本, 新看法)
+        """
+        messages = self._build_reflect_messages(other_players, round_base_info, round_action_info)
+
         # 向LLM发送请求
-        max_retries = 4
-        for attempt in range(max_retries):
+        for attempt in range(MAX_RETRIES):
+            start, latency, response = time.perf_counter(), None, None
             try:
-                content, reasoning_content = self.llm_client.reflect(messages, other_players)
-                _, result = try_parse_json_object(content)
-
-                # 更新 opinions
-                for key, value in result.items():
-                    if key in self.opinions.keys():
-                        self.opinions[key] = value
-
-                return True, content, reasoning_content
+                response = self.llm_client.reflect(messages, other_players)
+                latency = time.perf_counter() - start
+                return self._handle_reflect_response(response, messages, attempt, latency, apply)
+            except LLMRateLimitError as e:
+                time.sleep(self._handle_rate_limit("reflect", attempt, start, e))
+            except Exception as e:
+                self._handle_error("reflect", attempt, start, latency, response, e)
+                return False, f"{self.name} 反思过程出错: {str(e)}", "", {}
+        raise LLMError(f"玩家 {self.name} 的reflect方法在多次尝试后失败")
 
-            except LLMRateLimitError:
-                if attempt + 1 < max_retries:
-                    time.sleep(2 ** (attempt + 1))  # 指数退避重试
-                else:
-                    raise
+    async def reflect_async(self, other_players: List["Player"], round_base_info: str, round_action_info: str,
+                            apply: bool = True) -> tuple[bool, str, str, Dict[str, str]]:
+        """reflect 的协程版本"""
+        messages = self._build_reflect_messages(other_players, round_base_info, round_action_info)
 
+        for attempt in range(MAX_RETRIES):
+            start, latency, response = time.perf_counter(), None, None
+            try:
+                response = await self.llm_client.areflect(messages, other_players)
+                latency = time.perf_counter() - start
+                return self._handle_reflect_response(response, messages, attempt, latency, apply)
+            except LLMRateLimitError as e:
+                await asyncio.sleep(self._handle_rate_limit("reflect", attempt, start, e))
             except Exception as e:
-                return False, f"{self.name} 反思过程出错: {str(e)}", ""
-
-        raise LLMError(f"玩家 {self.name} 的reflect方法在多次尝试后失败")
\ No newline at end of file
+                self._handle_error("reflect", attempt, start, latency, response, e)
+                return False, f"{self.name} 反思过程出错: {str(e)}", "", {}
+        raise LLMError(f"玩家 {self.name} 的reflect_async方法在多次尝试后失败")
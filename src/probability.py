@@ -0,0 +1,79 @@
+"""
+叫点成立概率的精确计算
+
+每个叫点/质疑决策都取决于：在已知自己骰子的情况下，场上至少有 n 个 v 点的概率。
+其余玩家的骰子各自独立、每个为 v 点的概率是 1/6，因此该概率就是二项分布的尾概率。
+本模块在游戏开始时为所有 (未知骰子数, 还需数量) 预先计算出精确的尾概率表，
+之后的查询只是两次列表下标访问，可供引擎生成 {extra_hint} 提示、机器人玩家决策和对局分析使用。
+
+微基准：
+    python -m src.probability
+"""
+
+import math
+import timeit
+from functools import lru_cache
+from typing import List, Sequence
+
+class BidProbability:
+    """tail[u][k] = P(X >= k)，X ~ Binomial(u, 1/6)；k 超过 u 时概率为0"""
+
+    def __init__(self, max_unknown: int):
+        self.max_unknown = max_unknown
+        self.tail: List[List[float]] = []
+        for u in range(max_unknown + 1):
+            pmf = [math.comb(u, k) * 5 ** (u - k) / 6 ** u for k in range(u + 1)]
+            tail = [0.0] * (max_unknown + 2)
+            acc = 0.0
+            for k in range(u, -1, -1):
+                acc += pmf[k]
+                tail[k] = min(acc, 1.0)
+            self.tail.append(tail)
+
+    def at_least(self, needed: int, unknown: int) -> float:
+        """unknown 个未知骰子中至少有 needed 个指定点数的概率"""
+        if needed <= 0:
+            return 1.0
+        if needed > unknown:
+            return 0.0
+        return self.tail[unknown][needed]
+
+    def bid_true(self, dice: Sequence[int], number: int, value: int, unknown: int) -> float:
+        """已知自己的骰子 dice 时，叫点“至少 number 个 value 点”成立的概率"""
+        return self.at_least(number - dice.count(value), unknown)
+
+    def min_raises(self, number: int, value: int) -> List[tuple[int, int]]:
+        """每个点数对应的最小合法加注 (数量, 点数)；number 为0表示本轮还没有人叫点"""
+        return [(number if v > value and number > 0 else number + 1, v) for v in range(1, 7)]
+
+    def hint(self, dice: Sequence[int], number: int, value: int, unknown: int) -> str:
+        """生成可注入 {extra_hint} 的概率参考文本"""
+        lines = ["概率参考（根据你的骰子精确计算）："]
+        if number > 0:
+            lines.append(f"上家叫点“{number}个{value}点”成立的概率为{self.bid_true(dice, number, value, unknown):.0%}。")
+        raises = "，".join(
+            f"{n}个{v}点{self.bid_true(dice, n, v, unknown):.0%}" for n, v in self.min_raises(number, value)
+        )
+        lines.append(f"各点数最小加注成立的概率：{raises}。")
+        return "\n".join(lines)
+
+@lru_cache(maxsize=None)
+def get_bid_probability(total_dice: int) -> BidProbability:
+    """按场上骰子总数获取共享的概率表（同一进程内每种规模只计算一次）"""
+    return BidProbability(total_dice)
+
+def main():
+    table = get_bid_probability(20)
+    dice = [1, 3, 3, 5, 6]
+    number = 200000
+    for name, stmt in [
+        ("at_least", lambda: table.at_least(4, 15)),
+        ("bid_true", lambda: table.bid_true(dice, 6, 3, 15)),
+        ("tail[u][k]", lambda: table.tail[15][4]),
+    ]:
+        seconds = min(timeit.repeat(stmt, number=number, repeat=5)) / number
+        print(f"{name:>12}: {seconds * 1e9:.0f} ns/次")
+    print(f"建表耗时：{timeit.timeit(lambda: BidProbability(20), number=100) / 100 * 1e6:.0f} us")
+
+if __name__ == "__main__":
+    main()
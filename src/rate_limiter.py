@@ -0,0 +1,124 @@
+"""
+进程级的供应商限流器
+
+同一个供应商/API密钥的所有对局共享一组令牌桶：每分钟请求数（RPM）和每分钟token数（TPM）。
+调用前先按估算的token数预留额度，额度不足时等待；响应返回后按实际用量修正TPM桶。
+收到429/503时按 Retry-After 暂停该供应商的所有请求，退避时间加入随机抖动，
+避免多个线程同时重试造成“惊群”。
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Dict, List
+
+from src.snippets import *
+
+# 没有为供应商单独配置时使用的默认限额，None 表示不限
+_default_limits: Dict[str, float | None] = {"rpm": None, "tpm": None}
+
+_lock = threading.Lock()
+_limiters: Dict[tuple, "ProviderLimiter"] = {}
+
+class TokenBucket:
+    """令牌桶，按每分钟 rate 个的速度补充，容量为 capacity；允许预留为负数，使等待者按到达顺序排队"""
+
+    def __init__(self, rate_per_minute: float, capacity: float | None = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """预留 amount 个令牌，返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= min(amount, self.capacity)     # 单次请求超过容量时按容量计，避免永远等待
+            return max(0.0, -self.tokens / self.rate)
+
+    def refund(self, amount: float):
+        """修正预留量：amount 为正时归还令牌，为负时补扣"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+class ProviderLimiter:
+    """一个供应商/API密钥的请求桶、token桶，以及 Retry-After 暂停"""
+
+    def __init__(self, rpm: float | None = None, tpm: float | None = None):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.blocked_until = 0.0
+        self.waited = 0.0           # 累计等待时间，用于统计
+        self._lock = threading.Lock()
+
+    def _reserve(self, estimated_tokens: int) -> float:
+        wait = max(0.0, self.blocked_until - time.monotonic())
+        if self.requests:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens:
+            wait = max(wait, self.tokens.reserve(estimated_tokens))
+        with self._lock:
+            self.waited += wait
+        return wait
+
+    def acquire(self, estimated_tokens: int = 0):
+        """发送请求前调用，额度不足或处于暂停期时阻塞等待"""
+        if wait := self._reserve(estimated_tokens):
+            time.sleep(wait)
+
+    async def aacquire(self, estimated_tokens: int = 0):
+        """acquire 的协程版本"""
+        if wait := self._reserve(estimated_tokens):
+            await asyncio.sleep(wait)
+
+    def settle(self, estimated_tokens: int, actual_tokens: int):
+        """响应返回后按实际token用量修正预留"""
+        if self.tokens and actual_tokens:
+            self.tokens.refund(estimated_tokens - actual_tokens)
+
+    def block(self, seconds: float):
+        """收到 Retry-After 后暂停该供应商的所有请求"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+def configure(rpm: float | None = None, tpm: float | None = None):
+    """设置未单独配置的供应商的默认限额（只影响之后创建的限流器）"""
+    with _lock:
+        _default_limits["rpm"] = rpm
+        _default_limits["tpm"] = tpm
+
+def get_limiter(model: str, api_key: str | None) -> ProviderLimiter:
+    """按 (API密钥名, 地址, 密钥) 获取共享的限流器，限额见 snippets.provider_rate_limits"""
+    key_name = model_to_key_name.get(model, model)
+    key = (key_name, model_to_url.get(model), api_key)
+    with _lock:
+        if key not in _limiters:
+            limits = {**_default_limits, **provider_rate_limits.get(key_name, {})}
+            _limiters[key] = ProviderLimiter(limits["rpm"], limits["tpm"])
+        return _limiters[key]
+
+def estimate_tokens(messages: List[Dict[str, str]], completion_tokens: int = 300) -> int:
+    """粗略估算一次请求的token数（中文约每字一个token），用于预留TPM额度"""
+    return sum(len(str(m.get("content", ""))) for m in messages) + completion_tokens
+
+def backoff_delay(attempt: int, retry_after: float | None = None, base: float = 1.0, cap: float = 30.0) -> float:
+    """
+    限流后的重试等待时间
+        有 Retry-After 时在其基础上加少量抖动；否则使用带完全抖动的指数退避 uniform(0, min(cap, base * 2^(attempt+1)))
+    """
+    if retry_after is not None:
+        return retry_after + random.uniform(0, min(1.0, retry_after * 0.1 + 0.1))
+    return random.uniform(0, min(cap, base * 2 ** (attempt + 1)))
+
+def total_waited() -> float:
+    """所有限流器的累计等待时间（秒）"""
+    with _lock:
+        return sum(limiter.waited for limiter in _limiters.values())
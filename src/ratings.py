@@ -0,0 +1,206 @@
+"""
+模型的多人评分（Weng-Lin 贝叶斯近似的 Plackett-Luce 模型，与 TrueSkill 同属 μ/σ 评分）
+
+胜场数受阵容和座位影响，不同批次之间无法比较。这里每个模型有一个评分 μ 和不确定度 σ，
+每局结束后按名次（第一名在前）增量更新参与的模型：名次高于预期的模型 μ 上升，所有参与者的 σ 缩小。
+排行榜按保守评分 μ - 3σ 排序。评分保存在本地 SQLite 文件中，新的批次在已有评分的基础上继续更新；
+已计入的对局按对局ID去重（没有ID的旧日志按随机种子与阵容），重复导入同一批日志不会重复计分，
+用相同的种子和阵容重新运行得到的新对局照常计分。
+同一个模型占多个座位时，各座位按赛前评分分别计算更新，再取平均作用到该模型上；
+所有座位都是同一个模型的对局（自我对弈）不含模型间的比较信息，不计分。
+
+用法：
+    python -m src.ratings leaderboard --db logs/ratings.sqlite
+    python -m src.ratings ingest logs/events logs/records --db logs/ratings.sqlite
+"""
+
+import argparse
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import List, Sequence
+
+from src.snippets import model_list
+
+MU = 25.0
+SIGMA = MU / 3
+BETA = SIGMA / 2            # 一局表现的随机波动
+TAU = SIGMA / 100           # 每局前加入的不确定度，使评分能跟踪模型的变化
+KAPPA = 1e-4                # σ 的最小缩放比例
+
+class Rating:
+    def __init__(self, mu: float = MU, sigma: float = SIGMA, games: int = 0, wins: int = 0):
+        self.mu = mu
+        self.sigma = sigma
+        self.games = games
+        self.wins = wins
+
+    @property
+    def conservative(self) -> float:
+        """保守评分，实际水平有约99%的概率高于该值"""
+        return self.mu - 3 * self.sigma
+
+def rate(ratings: Sequence[Rating], ranks: Sequence[int]) -> List[tuple[float, float]]:
+    """
+    按 Plackett-Luce 模型计算一局后的新评分
+        ranks: 各参与者的名次，1为第一名，并列时名次相同
+    Returns:
+        各参与者的新 (μ, σ)
+    """
+    sigmas = [math.sqrt(r.sigma ** 2 + TAU ** 2) for r in ratings]
+    c = math.sqrt(sum(s ** 2 + BETA ** 2 for s in sigmas))
+    strength = [math.exp(r.mu / c) for r in ratings]
+    # 名次不高于 q 的参与者的强度之和，以及与 q 并列的人数
+    tail = [sum(strength[i] for i in range(len(ratings)) if ranks[i] >= ranks[q]) for q in range(len(ratings))]
+    ties = [sum(1 for rank in ranks if rank == ranks[q]) for q in range(len(ratings))]
+
+    result = []
+    for i, rating in enumerate(ratings):
+        omega = delta = 0.0
+        for q in range(len(ratings)):
+            if ranks[q] > ranks[i]:
+                continue
+            p = strength[i] / tail[q]
+            omega += ((1 - p) if q == i else -p) / ties[q]
+            delta += p * (1 - p) / ties[q]
+        variance = sigmas[i] ** 2
+        mu = rating.mu + variance / c * omega
+        sigma = sigmas[i] * math.sqrt(max(1 - (sigmas[i] / c) * variance / c ** 2 * delta, KAPPA))
+        result.append((mu, sigma))
+    return result
+
+def game_key(seed: int, models: Sequence[str], game_id: str | None = None) -> str:
+    """
+    对局的去重键：每局唯一的对局ID；没有ID的旧日志用随机种子与阵容（不含座位顺序）
+    """
+    if game_id:
+        return game_id
+    return f"{seed}:{','.join(sorted(models))}"
+
+class RatingStore:
+    def __init__(self, path: str = "logs/ratings.sqlite"):
+        """
+            path: SQLite 文件路径，":memory:" 表示不保存
+        """
+        self.path = path
+        self.duplicates = 0     # 本进程中因已计入过而跳过的对局
+        self.self_play = 0      # 本进程中因所有座位是同一模型而跳过的对局
+        self._lock = threading.Lock()
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ratings (model TEXT PRIMARY KEY, mu REAL NOT NULL, sigma REAL NOT NULL, "
+            "games INTEGER NOT NULL, wins INTEGER NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS games (key TEXT PRIMARY KEY, recorded_at REAL NOT NULL)")
+        self._conn.commit()
+
+    def _get(self, model: str) -> Rating:
+        row = self._conn.execute("SELECT mu, sigma, games, wins FROM ratings WHERE model = ?", (model,)).fetchone()
+        return Rating(*row) if row else Rating()
+
+    def get(self, model: str) -> Rating:
+        with self._lock:
+            return self._get(model)
+
+    def update(self, order: Sequence[str], key: str | None = None) -> bool:
+        """
+        按一局的名次更新评分
+            order: 各座位的模型，按名次排列（第一名在前），同一模型可出现多次
+            key: 对局的唯一键，已计入过的对局会被忽略
+        Returns:
+            是否更新了评分；自我对弈与已计入过的对局分别计入 self_play 和 duplicates
+        """
+        if len(order) < 2:
+            return False
+        with self._lock:
+            if len(set(order)) < 2:
+                # 否则该模型每局必胜，σ 也会因为“赢了自己”而虚假地缩小
+                self.self_play += 1
+                return False
+            if key is not None:
+                cursor = self._conn.execute("INSERT INTO games (key, recorded_at) VALUES (?, ?) ON CONFLICT(key) DO NOTHING",
+                                            (key, time.time()))
+                if not cursor.rowcount:
+                    self.duplicates += 1
+                    return False
+            before = {model: self._get(model) for model in order}
+            updates = defaultdict(list)
+            for model, new in zip(order, rate([before[model] for model in order], range(1, len(order) + 1))):
+                updates[model].append(new)
+            now = time.time()
+            for model, news in updates.items():
+                old = before[model]
+                mu = sum(mu for mu, _ in news) / len(news)
+                sigma = sum(sigma for _, sigma in news) / len(news)
+                self._conn.execute(
+                    "INSERT INTO ratings (model, mu, sigma, games, wins, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(model) DO UPDATE SET mu = excluded.mu, sigma = excluded.sigma, games = excluded.games, "
+                    "wins = excluded.wins, updated_at = excluded.updated_at",
+                    (model, mu, sigma, old.games + 1, old.wins + (order[0] == model), now)
+                )
+            self._conn.commit()
+        return True
+
+    def leaderboard(self, models: Sequence[str] | None = None) -> List[tuple[str, Rating]]:
+        """
+        按保守评分排序的排行榜
+            models: 需要列出的模型，默认为 snippets.model_list 与所有已评分的模型；未参赛的模型显示初始评分
+        """
+        with self._lock:
+            rated = {row[0]: Rating(*row[1:]) for row in self._conn.execute("SELECT model, mu, sigma, games, wins FROM ratings")}
+        if models is None:
+            models = list(model_list) + [model for model in rated if model not in model_list]
+        board = [(model, rated.get(model, Rating())) for model in models]
+        return sorted(board, key=lambda item: item[1].conservative, reverse=True)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def print_leaderboard(board: List[tuple[str, Rating]]):
+    print(f"{'名次':>4}  {'模型':<40}{'保守评分':>8}{'μ':>9}{'σ':>8}{'局数':>7}{'胜率':>8}")
+    for i, (model, r) in enumerate(board):
+        win_rate = f"{r.wins / r.games:.1%}" if r.games else "-"
+        print(f"{i + 1:>4}  {model:<40}{r.conservative:>10.2f}{r.mu:>9.2f}{r.sigma:>8.2f}{r.games:>7}{win_rate:>9}")
+
+def main():
+    parser = argparse.ArgumentParser(description="模型多人评分")
+    parser.add_argument("--db", type=str, default="logs/ratings.sqlite", help="评分数据库")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("leaderboard", help="显示排行榜")
+    p.add_argument("--rated-only", action="store_true", help="只列出已有对局的模型")
+    p = sub.add_parser("ingest", help="从事件日志、对局记录或文本日志中按文件顺序计入对局")
+    p.add_argument("paths", nargs="+", help="文件或目录，格式同 src.analytics ingest")
+    args = parser.parse_args()
+
+    store = RatingStore(args.db)
+    if args.command == "ingest":
+        from src.analytics import ingest
+
+        results, stats = ingest(args.paths)
+        seats = results.seats
+        by_game = defaultdict(list)
+        for game, model, place in zip(seats["game"].tolist(), seats["model"].tolist(), seats["place"].tolist()):
+            by_game[game].append((place, results.models[model]))
+        keys = results.game_keys()     # 没有对局ID和随机种子的旧日志无法去重
+        updated = 0
+        for game, placed in sorted(by_game.items()):
+            order = [model for _, model in sorted(placed)]
+            updated += store.update(order, key=keys[game])
+        print(f"读取{stats['files']}个文件、{stats['games']}局，计入{updated}局"
+              f"（已计入过{store.duplicates}局，自我对弈{store.self_play}局）")
+    board = store.leaderboard()
+    if getattr(args, "rated_only", False):
+        board = [(model, r) for model, r in board if r.games]
+    print_leaderboard(board)
+    store.close()
+
+if __name__ == "__main__":
+    main()
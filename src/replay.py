@@ -0,0 +1,206 @@
+"""
+对局记录与确定性回放
+
+GameRecorder 记录一局游戏的随机种子、玩家配置以及每一次LLM原始请求/响应；
+replay_game 用记录重新运行 LiarsDiceGame：骰子由种子重现，LLM响应按玩家依次取自记录，
+全程不访问网络，可用于引擎改动的回归测试和无API成本的性能分析。
+
+用法：
+    python -m src.replay logs/records/game_0.json.gz
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Dict, List, TYPE_CHECKING
+
+from src.llm_client import LLMResponse, UsageTracker
+from src.events import EventLog
+
+if TYPE_CHECKING:
+    from src.game import LiarsDiceGame
+
+RECORD_VERSION = 1
+
+# 未传入 logger 时回放不输出文本日志；处理器只在模块加载时添加一次
+_null_logger = logging.getLogger("replay")
+_null_logger.addHandler(logging.NullHandler())
+_null_logger.propagate = False
+
+class ReplayMismatch(Exception):
+    """回放时引擎发出的请求与记录不一致，或记录已耗尽"""
+
+class GameRecorder:
+    """记录一局游戏，线程安全（反思阶段多个玩家会并发写入）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.record: Dict[str, Any] = {"version": RECORD_VERSION, "calls": []}
+
+    def start(self, game: "LiarsDiceGame"):
+        self.record.update({
+            "seed": game.seed,
+            "game_id": game.game_id,
+            "reflect_each_round": game.reflect_each_round,
+            "probability_hint": game.probability_hint,
+            "repair_policy": game.repair_policy,
+            "shortcut_policy": game.shortcut_policy,
+            # 回放总是按 sync 方式反思；staleness 为0时两者的请求完全相同，否则需用 --no-strict 回放
+            "reflection_mode": game.reflection_mode,
+            "reflection_staleness": game.reflection_staleness,
+            "players": [
+                {"name": p.name, "model": p.model, "prompt_layout": p.prompt_layout}
+                for p in game.players
+            ],
+            "started_at": time.time(),
+        })
+
+    def log_call(self, player_name: str, kind: str, messages: List[Dict[str, str]] | None, content: str, reasoning_content: str,
+                 source: str = "llm", model: str | None = None):
+        """
+            kind: "action" 或 "reflect"
+            source: "llm" 为真实调用，"cache" 为决策缓存提供的结果
+            model: 实际应答的模型（熔断切换到备用模型时与玩家配置的模型不同）
+        """
+        with self._lock:
+            self.record["calls"].append({
+                "player": player_name,
+                "kind": kind,
+                "source": source,
+                "model": model,
+                "messages": messages,
+                "content": content,
+                "reasoning_content": reasoning_content,
+            })
+
+    def finish(self, winner: str):
+        self.record["winner"] = winner
+        self.record["finished_at"] = time.time()
+
+    def save(self, path: str):
+        """保存记录，路径以 .gz 结尾时使用gzip压缩"""
+        save_record(self.record, path)
+
+def save_record(record: Dict[str, Any], path: str):
+    data = json.dumps(record, ensure_ascii=False).encode("utf-8")
+    if path.endswith(".gz"):
+        data = gzip.compress(data)
+    with open(path, "wb") as f:
+        f.write(data)
+
+def load_record(path: str) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(".gz"):
+        data = gzip.decompress(data)
+    return json.loads(data)
+
+class ReplayLLMClient(UsageTracker):
+    """按顺序返回某个玩家记录下来的响应，接口与 OpenAILLMClient/GoogleLLMClient 相同"""
+
+    def __init__(self, player_name: str, calls: List[Dict[str, Any]], strict: bool = True):
+        """
+            strict: 为True时校验引擎发出的消息与记录完全一致（缓存命中的记录不含消息，不校验）
+        """
+        self.player_name = player_name
+        self.strict = strict
+        self.mismatch: str | None = None    # 第一次不一致的描述（引擎会吞掉客户端异常并重试）
+        self._queues = defaultdict(deque)
+        for call in calls:
+            self._queues[call["kind"]].append(call)
+        self._init_usage()
+
+    def _next(self, kind: str, messages) -> LLMResponse:
+        queue = self._queues[kind]
+        if not queue:
+            self.mismatch = self.mismatch or f"玩家 {self.player_name} 的 {kind} 记录已耗尽"
+            raise ReplayMismatch(self.mismatch)
+        call = queue.popleft()
+        if self.strict and call["messages"] is not None and call["messages"] != messages:
+            self.mismatch = self.mismatch or f"玩家 {self.player_name} 的 {kind} 请求与记录不一致"
+            raise ReplayMismatch(self.mismatch)
+        self._record_usage({})
+        return LLMResponse(call["content"], call["reasoning_content"], call.get("model") or "")
+
+    def chat(self, messages):
+        return self._next("action", messages)
+
+    async def achat(self, messages):
+        return self._next("action", messages)
+
+    def reflect(self, messages, *args):
+        return self._next("reflect", messages)
+
+    async def areflect(self, messages, *args):
+        return self._next("reflect", messages)
+
+    def remaining(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+def replay_game(record: Dict[str, Any], logger: logging.Logger | None = None, strict: bool = True,
+                events: EventLog | None = None) -> tuple[str, "LiarsDiceGame"]:
+    """
+    根据记录重新运行一局游戏
+        events: 可选的事件流，用于从记录中重建对局事件（如 src.analytics 导入记录）
+    Returns:
+        (胜者名字, 回放的游戏对象)
+    """
+    from src.game import LiarsDiceGame
+    from src.players import Player
+
+    if record.get("version") != RECORD_VERSION:
+        raise ReplayMismatch(f"不支持的记录版本: {record.get('version')}")
+    logger = logger or _null_logger
+
+    calls_by_player = defaultdict(list)
+    for call in record["calls"]:
+        calls_by_player[call["player"]].append(call)
+    players = [
+        Player(
+            name=p["name"],
+            is_human=False,
+            model=p["model"],
+            logger=logger,
+            prompt_layout=p["prompt_layout"],
+            llm_client=ReplayLLMClient(p["name"], calls_by_player[p["name"]], strict)
+        )
+        for p in record["players"]
+    ]
+    game = LiarsDiceGame(players, reflect_each_round=record["reflect_each_round"], logger=logger, seed=record["seed"],
+                         probability_hint=record.get("probability_hint", False),
+                         repair_policy=record.get("repair_policy", "off"),
+                         shortcut_policy=record.get("shortcut_policy", "off"), events=events, game_id=record.get("game_id"))
+    try:
+        winner = game.start_game()
+    finally:
+        # 玩家会捕获客户端异常并重试，这里把第一次不一致作为回放失败的原因报告出来
+        mismatches = [p.llm_client.mismatch for p in players if p.llm_client and p.llm_client.mismatch]
+        if mismatches:
+            raise ReplayMismatch(mismatches[0])
+    if strict and "winner" in record and winner != record["winner"]:
+        raise ReplayMismatch(f"回放胜者 {winner} 与记录 {record['winner']} 不一致")
+    return winner, game
+
+def main():
+    parser = argparse.ArgumentParser(description="回放记录的对局")
+    parser.add_argument("records", nargs="+", help="对局记录文件（.json 或 .json.gz）")
+    parser.add_argument("--no-strict", action="store_true", help="不校验请求与记录是否一致")
+    args = parser.parse_args()
+
+    failed = 0
+    start_time = time.time()
+    for path in args.records:
+        try:
+            winner, game = replay_game(load_record(path), strict=not args.no_strict)
+            print(f"{path}: 胜者 {winner}，共{game.round}轮")
+        except ReplayMismatch as e:
+            failed += 1
+            print(f"{path}: 回放失败：{str(e)}")
+    print(f"回放{len(args.records)}局，失败{failed}局，耗时{time.time() - start_time:.3f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+谎言骰子规则的向量化蒙特卡洛模拟器
+
+用 NumPy 数组保存成千上万局游戏的骰子与状态，并在参数化策略下同步推进，
+用于在百万局规模上获得基线：各座位胜率、对局长度以及首家位置偏差。
+规则与 LiarsDiceGame.handle_bid/handle_challenge 一致：
+    - 每人5个骰子、2瓶毒药，1点不是万能骰子，首家不能质疑
+    - 加注须数量更大，或数量相同但点数更大
+    - 质疑后败者喝毒药；败者存活时由败者开始下一轮，死亡时由质疑者的下家开始
+
+用法：
+    python -m src.simulator --games 100000 --players 4
+"""
+
+import argparse
+import time
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from src.probability import get_bid_probability
+from src.snippets import DICE_PER_PLAYER
+
+POISON_PER_PLAYER = 2
+
+# 参数化策略的默认参数
+DEFAULT_POLICY = {
+    "challenge_threshold": 0.4,     # 上家叫点成立的概率低于该值时质疑
+    "bid_confidence": 0.5,          # 只在叫点成立概率不低于该值时加注（否则质疑）
+    "bluff_rate": 0.1,              # 随机选择点数加注（虚张声势）的概率
+}
+
+class Simulator:
+    def __init__(self, num_games: int, num_players: int = 4, policies: Sequence[Dict[str, float]] | None = None, seed: int | None = None):
+        """
+            policies: 每个座位的策略参数，缺省的键使用 DEFAULT_POLICY
+        """
+        self.G = num_games
+        self.N = num_players
+        self.rng = np.random.default_rng(seed)
+        policies = list(policies or [{}] * num_players)
+        if len(policies) != num_players:
+            raise ValueError("策略数量必须与玩家数量相同")
+        params = [{**DEFAULT_POLICY, **p} for p in policies]
+        self.challenge_threshold = np.array([p["challenge_threshold"] for p in params])
+        self.bid_confidence = np.array([p["bid_confidence"] for p in params])
+        self.bluff_rate = np.array([p["bluff_rate"] for p in params])
+
+        total_dice = DICE_PER_PLAYER * num_players
+        self.tail = np.array(get_bid_probability(total_dice).tail)
+        # quantile[s, u]：在 u 个未知骰子中，以座位 s 的 bid_confidence 能确信“至少有”的数量
+        self.quantile = np.array([
+            [int(np.nonzero(self.tail[u, :u + 1] >= conf)[0].max()) for u in range(total_dice + 1)]
+            for conf in self.bid_confidence
+        ])
+
+    def _roll(self, alive: np.ndarray) -> np.ndarray:
+        """为存活玩家摇骰，返回每个玩家各点数的数量 (G, N, 6)"""
+        dice = self.rng.integers(1, 7, size=alive.shape + (DICE_PER_PLAYER,))
+        counts = (dice[..., None] == np.arange(1, 7)).sum(axis=-2)
+        return counts * alive[..., None]
+
+    def _next_alive(self, alive: np.ndarray, idx: np.ndarray, include_self: bool = False) -> np.ndarray:
+        """idx 之后（include_self 时含自身）第一个存活玩家的座位"""
+        start = 0 if include_self else 1
+        order = (idx[:, None] + np.arange(start, start + self.N)) % self.N
+        mask = np.take_along_axis(alive, order, axis=1)
+        return order[np.arange(len(idx)), mask.argmax(axis=1)]
+
+    def run(self, max_turns: int = 10000) -> Dict[str, np.ndarray]:
+        G, N = self.G, self.N
+        games = np.arange(G)
+        poison = np.full((G, N), POISON_PER_PLAYER, dtype=np.int8)
+        alive = poison > 0
+        first = self.rng.integers(0, N, size=G)
+        initial_first = first.copy()
+        counts = self._roll(alive)
+        cur = first.copy()
+        prev = first.copy()
+        bid_n = np.zeros(G, dtype=np.int64)
+        bid_v = np.zeros(G, dtype=np.int64)
+        done = np.zeros(G, dtype=bool)
+        winner = np.full(G, -1)
+        rounds = np.ones(G, dtype=np.int64)
+        turns = np.zeros(G, dtype=np.int64)
+        death_round = np.zeros((G, N), dtype=np.int64)
+        values = np.arange(1, 7)
+
+        for _ in range(max_turns):
+            g = games[~done]
+            if len(g) == 0:
+                break
+            p = cur[g]
+            own = counts[g, p]                                          # (g, 6)
+            unknown = DICE_PER_PLAYER * alive[g].sum(axis=1) - DICE_PER_PLAYER
+            is_first = bid_n[g] == 0
+            turns[g] += 1
+
+            # 上家叫点成立的概率
+            need = np.clip(bid_n[g] - own[np.arange(len(g)), np.maximum(bid_v[g], 1) - 1], 0, None)
+            p_true = self.tail[unknown, np.minimum(need, unknown + 1)]
+
+            # 各点数的最小合法加注，以及在置信度下还能确信的余量
+            min_n = np.where(values[None, :] > bid_v[g][:, None], np.maximum(bid_n[g], 1)[:, None], bid_n[g][:, None] + 1)
+            slack = own + self.quantile[p, unknown][:, None] - min_n
+            best_v = np.argmax(slack * 16 + own * 2 + np.arange(6) / 8, axis=1)
+            bluff = self.rng.random(len(g)) < self.bluff_rate[p]
+            best_v = np.where(bluff, self.rng.integers(0, 6, size=len(g)), best_v)
+            best_slack = slack[np.arange(len(g)), best_v]
+
+            challenge = ~is_first & ((p_true < self.challenge_threshold[p]) | ((best_slack < 0) & ~bluff))
+
+            # 加注
+            b = ~challenge
+            gb = g[b]
+            prev[gb] = p[b]
+            bid_v[gb] = best_v[b] + 1
+            bid_n[gb] = min_n[np.arange(len(g))[b], best_v[b]]
+            cur[gb] = self._next_alive(alive[gb], p[b])
+
+            # 质疑结算
+            gc = g[challenge]
+            if len(gc) == 0:
+                continue
+            challenger = p[challenge]
+            bidder = prev[gc]
+            total = counts[gc, :, bid_v[gc] - 1].sum(axis=1)
+            loser = np.where(total < bid_n[gc], bidder, challenger)
+            poison[gc, loser] -= 1
+            next_of_challenger = self._next_alive(alive[gc], challenger)
+            loser_alive = poison[gc, loser] > 0
+            alive[gc, loser] = loser_alive
+            death_round[gc[~loser_alive], loser[~loser_alive]] = rounds[gc[~loser_alive]]
+            first[gc] = np.where(loser_alive, loser, next_of_challenger)
+
+            # 判断游戏结束
+            remaining = alive[gc].sum(axis=1)
+            finished = remaining <= 1
+            gf = gc[finished]
+            done[gf] = True
+            winner[gf] = alive[gf].argmax(axis=1)
+
+            # 新一轮
+            gn = gc[~finished]
+            rounds[gn] += 1
+            counts[gn] = self._roll(alive[gn])
+            cur[gn] = first[gn]
+            prev[gn] = first[gn]
+            bid_n[gn] = 0
+            bid_v[gn] = 0
+
+        return {
+            "winner": winner,
+            "rounds": rounds,
+            "turns": turns,
+            "initial_first": initial_first,
+            "death_round": death_round,
+            "finished": done,
+        }
+
+def summarize(result: Dict[str, np.ndarray], num_players: int) -> Dict[str, List[float] | float]:
+    """汇总座位胜率、对局长度和首家位置偏差（按与首家的相对位置统计胜率）"""
+    finished = result["finished"]
+    winner = result["winner"][finished]
+    offset = (winner - result["initial_first"][finished]) % num_players
+    n = max(len(winner), 1)
+    return {
+        "games": int(finished.sum()),
+        "seat_win_rate": (np.bincount(winner, minlength=num_players) / n).tolist(),
+        "first_offset_win_rate": (np.bincount(offset, minlength=num_players) / n).tolist(),
+        "mean_rounds": float(result["rounds"][finished].mean()) if len(winner) else 0.0,
+        "mean_turns": float(result["turns"][finished].mean()) if len(winner) else 0.0,
+    }
+
+def _parse_policy(spec: str) -> Dict[str, float]:
+    """"0.4,0.5,0.1" -> challenge_threshold, bid_confidence, bluff_rate"""
+    return dict(zip(DEFAULT_POLICY, (float(x) for x in spec.split(","))))
+
+def main():
+    parser = argparse.ArgumentParser(description="谎言骰子向量化蒙特卡洛模拟")
+    parser.add_argument("--games", type=int, default=100000, help="同时模拟的对局数")
+    parser.add_argument("--players", type=int, default=4, help="玩家数量")
+    parser.add_argument("--policy", type=str, action="append", default=None,
+                        help="按座位依次给出策略参数 challenge_threshold,bid_confidence,bluff_rate，可重复")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    args = parser.parse_args()
+
+    policies = [_parse_policy(p) for p in args.policy] if args.policy else None
+    if policies and len(policies) == 1:
+        policies = policies * args.players
+    simulator = Simulator(args.games, args.players, policies, seed=args.seed)
+    start_time = time.perf_counter()
+    result = simulator.run()
+    elapsed = time.perf_counter() - start_time
+    summary = summarize(result, args.players)
+
+    print(f"模拟{summary['games']}局，耗时{elapsed:.3f}s，{summary['games'] / elapsed:,.0f} 局/秒")
+    print(f"平均轮数：{summary['mean_rounds']:.2f}，平均回合数：{summary['mean_turns']:.2f}")
+    print("各座位胜率：" + "  ".join(f"{i + 1}号:{r:.3f}" for i, r in enumerate(summary["seat_win_rate"])))
+    print("按与首家的相对位置统计胜率：" + "  ".join(f"+{i}:{r:.3f}" for i, r in enumerate(summary["first_offset_win_rate"])))
+
+if __name__ == "__main__":
+    main()
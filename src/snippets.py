@@ -1,3 +1,8 @@
+import os
+
+# 本地桩服务器地址（见 src/stub_server.py），可通过环境变量覆盖
+STUB_BASE_URL = os.environ.get("STUB_LLM_BASE_URL", "http://127.0.0.1:8765/v1")
+
 model_list = [
     "deepseek-chat",
     "deepseek-reasoner",
@@ -8,7 +13,13 @@ model_list = [
     "glm-z1-air",
     "qwen-max-0125",
     "hunyuan-t1-latest",
-    "x1"
+    "x1",
+    "stub-honest",
+    "stub-bluffer",
+    "stub-random",
+    "bot-cautious",
+    "bot-balanced",
+    "bot-aggressive"
 ]
 
 model_to_key_name = {
@@ -21,7 +32,10 @@ model_to_key_name = {
     "glm-z1-air": "ZHIPU_API_KEY",
     "qwen-max-0125": "DASHSCOPE_API_KEY",
     "hunyuan-t1-latest": "HUNYUAN_API_KEY",
-    "x1": "SPARK_API_KEY"
+    "x1": "SPARK_API_KEY",
+    "stub-honest": "STUB_API_KEY",
+    "stub-bluffer": "STUB_API_KEY",
+    "stub-random": "STUB_API_KEY"
 }
 
 model_to_url = {
@@ -33,7 +47,10 @@ model_to_url = {
     "glm-z1-air": "https://open.bigmodel.cn/api/paas/v4/",
     "qwen-max-0125": "https://dashscope.aliyuncs.com/compatible-mode/v1",
     "hunyuan-t1-latest": "https://api.hunyuan.cloud.tencent.com/v1",
-    "x1": "https://spark-api-open.xf-yun.com/v2"
+    "x1": "https://spark-api-open.xf-yun.com/v2",
+    "stub-honest": STUB_BASE_URL,
+    "stub-bluffer": STUB_BASE_URL,
+    "stub-random": STUB_BASE_URL
 }
 
 model_to_API = {
@@ -46,9 +63,79 @@ model_to_API = {
     "glm-z1-air": "OpenAI",
     "qwen-max-0125": "OpenAI",
     "hunyuan-t1-latest": "OpenAI",
-    "x1": "OpenAI"
+    "x1": "OpenAI",
+    "stub-honest": "OpenAI",
+    "stub-bluffer": "OpenAI",
+    "stub-random": "OpenAI",
+    "bot-cautious": "Bot",
+    "bot-balanced": "Bot",
+    "bot-aggressive": "Bot"
+}
+
+# OpenAI 兼容供应商的结构化输出能力（未列出的模型使用 json_object）：
+#   json_schema: response_format 支持 {"type": "json_schema"}，按 pydantic 模型约束输出
+#   tools: 支持函数调用，通过强制调用一个参数为该模型的函数获得结构化输出
+#   json_object: 只保证输出是JSON对象
+model_output_modes = {
+    "deepseek-chat": "tools",
+    "deepseek-reasoner": "json_object",
+    "doubao-1-5-lite-32k-250115": "tools",
+    "doubao-1-5-thinking-pro-250415": "json_object",
+    "glm-z1-flash": "json_object",
+    "glm-z1-air": "json_object",
+    "qwen-max-0125": "tools",
+    "hunyuan-t1-latest": "json_object",
+    "x1": "json_object",
+    "stub-honest": "json_schema",
+    "stub-bluffer": "tools",
+    "stub-random": "json_object"
+}
+
+# 各供应商（按API密钥名）的限流配置：rpm 为每分钟请求数，tpm 为每分钟token数，缺省或为None表示不限；
+# 同一密钥的所有对局共享这些额度，未配置的供应商使用 multi_game_runner.py 的 --rpm/--tpm
+provider_rate_limits = {
+    "DEEPSEEK_API_KEY": {"rpm": None, "tpm": None},
+    "STUB_API_KEY": {"rpm": None, "tpm": None}
+}
+
+# 熔断器打开或调用失败时切换到的备用模型（需启用熔断器，见 src/circuit_breaker.py）
+model_fallbacks = {
+    "deepseek-reasoner": "deepseek-chat",
+    "glm-z1-air": "glm-z1-flash",
+    "doubao-1-5-thinking-pro-250415": "doubao-1-5-lite-32k-250115"
+}
+
+# 基于规则的机器人玩家（见 src/bots.py），不需要API密钥
+bot_models = {
+    "bot-cautious": {"challenge_threshold": 0.5, "bid_confidence": 0.6, "bluff_rate": 0.0},
+    "bot-balanced": {"challenge_threshold": 0.4, "bid_confidence": 0.5, "bluff_rate": 0.1},
+    "bot-aggressive": {"challenge_threshold": 0.25, "bid_confidence": 0.35, "bluff_rate": 0.25}
 }
 
+# 未在 config/keys.json 中配置时使用的默认密钥（桩服务器不校验密钥）
+default_api_keys = {
+    "STUB_API_KEY": "stub"
+}
+
+# 每名玩家的骰子数
+DICE_PER_PLAYER = 5
+
+# 提示词布局：default 为原始模板；prefix_cache 把规则、输出格式和玩家身份放入稳定的系统消息，
+# 动态信息放在用户消息末尾，以便命中供应商侧的提示词前缀缓存
+prompt_layouts = ["default", "prefix_cache"]
+
+# 非法叫点的本地修正策略：off 为原始行为（附上提示重新询问LLM）；
+# nearest 修正为点数最接近的最小合法叫点；challenge 改为质疑上家（首家无法质疑时按 nearest 修正）
+repair_policies = ["off", "nearest", "challenge"]
+
+# 无需LLM决策时的本地短路策略：off 为原始行为；forced 在上家叫点必然不成立（超过场上骰子数，
+# 或扣除自己的骰子后剩余骰子不够）时直接质疑；all 另外由规则机器人给出首家的开局叫点
+shortcut_policies = ["off", "forced", "all"]
+
+# 每轮结束后的反思方式：sync 等待所有玩家反思完毕再开始下一轮；
+# pipelined 在后台反思的同时开始下一轮，各玩家的看法在其反思完成后立即生效
+reflection_modes = ["sync", "pipelined"]
+
 class InvalidAction(Exception):
     def __init__(self, *args):
         super().__init__(args)
@@ -58,5 +145,6 @@ class LLMError(Exception):
         super().__init__(args)
 
 class LLMRateLimitError(LLMError):
-    def __init__(self, *args):
-        super().__init__(args)
\ No newline at end of file
+    def __init__(self, *args, retry_after: float | None = None):
+        super().__init__(args)
+        self.retry_after = retry_after      # 供应商在 Retry-After 中建议的等待秒数
\ No newline at end of file
@@ -0,0 +1,429 @@
+"""
+本地 OpenAI 兼容的桩（stub）LLM 服务器，用于离线压测
+
+用法：
+    python -m src.stub_server --port 8765 --latency lognormal:-0.5,0.6 --rate-limit-rate 0.05
+
+随后在 multi_game_runner.py 中使用 stub-* 模型即可，不消耗任何 API 配额。
+支持 stream=True 的 SSE 流式响应，可用 --reasoning-chars/--trailing-chars/--chunk-interval 模拟推理模型的长输出。
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+_DICE_PATTERN = re.compile(r"你的骰子点数是：([\d,\s]+)")
+_BID_PATTERN = re.compile(r"叫点：(\d+)个(\d)点")
+_PLAYER_COUNT_PATTERN = re.compile(r"(\d+)名存活玩家")
+_REFLECT_KEY_PATTERN = re.compile(r'^"(.+)": str\s*$', re.MULTILINE)
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    解析延迟分布描述，返回一个采样函数（单位：秒）
+        fixed:0.5            固定延迟
+        uniform:0.2,1.5      均匀分布
+        exp:0.8              指数分布（均值）
+        lognormal:-0.5,0.6   对数正态分布（mu, sigma），适合模拟长尾
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(x) for x in params.split(",") if x.strip()]
+    match kind:
+        case "fixed":
+            return lambda rng: values[0] if values else 0.0
+        case "uniform":
+            return lambda rng: rng.uniform(values[0], values[1])
+        case "exp":
+            return lambda rng: rng.expovariate(1 / values[0])
+        case "lognormal":
+            return lambda rng: rng.lognormvariate(values[0], values[1])
+        case _:
+            raise ValueError(f"不支持的延迟分布: {spec}")
+
+def _parse_state(text: str) -> Dict[str, Any]:
+    """从提示词中提取决策所需的局面信息"""
+    dice_match = _DICE_PATTERN.search(text)
+    dice = [int(d) for d in re.findall(r"\d", dice_match.group(1))] if dice_match else []
+    bids = _BID_PATTERN.findall(text)
+    count_match = _PLAYER_COUNT_PATTERN.search(text)
+    players = int(count_match.group(1)) if count_match else 4
+    return {
+        "dice": dice,
+        "is_first": "第一个决策的玩家" in text,
+        "bid": (int(bids[-1][0]), int(bids[-1][1])) if bids else (0, 0),
+        "total_dice": 5 * players,
+    }
+
+def _next_bids(number: int, value: int, total_dice: int) -> List[tuple[int, int]]:
+    """列出比当前叫点更大的所有合法叫点（数量不超过场上骰子总数）"""
+    bids = [(number, v) for v in range(value + 1, 7)] if number > 0 else []
+    bids += [(n, v) for n in range(max(number + 1, 1), total_dice + 1) for v in range(1, 7)]
+    return bids
+
+def _expected_count(dice: List[int], value: int, total_dice: int) -> float:
+    return dice.count(value) + (total_dice - len(dice)) / 6
+
+def honest_policy(state: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+    """按期望数量叫点，期望不足时质疑"""
+    return _margin_policy(state, rng, margin=0.5)
+
+def bluffer_policy(state: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+    """更激进：容忍更大的期望缺口，偶尔随机叫点"""
+    if rng.random() < 0.2:
+        return random_policy(state, rng)
+    return _margin_policy(state, rng, margin=1.5)
+
+def random_policy(state: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+    """在合法范围内随机决策"""
+    number, value = state["bid"]
+    candidates = _next_bids(number, value, state["total_dice"])[:12]
+    if not state["is_first"] and (rng.random() < 0.3 or not candidates):
+        return _action(True, 0, 0, "随机决定质疑。")
+    number, value = rng.choice(candidates) if candidates else (number + 1, value)
+    return _action(False, value, number, "随机叫点。")
+
+def _margin_policy(state: Dict[str, Any], rng: random.Random, margin: float) -> Dict[str, Any]:
+    dice, total = state["dice"], state["total_dice"]
+    number, value = state["bid"]
+    if not state["is_first"] and number > _expected_count(dice, value, total) + margin:
+        return _action(True, 0, 0, f"场上{value}点的期望数量不足{number}个。")
+    candidates = _next_bids(number, value, total)
+    if not candidates:
+        return _action(True, 0, 0, "已无法继续加注。")
+    # 选择期望余量最大的最小加注
+    number, value = max(candidates[:12], key=lambda b: (_expected_count(dice, b[1], total) - b[0], rng.random()))
+    return _action(False, value, number, f"手中有{dice.count(value)}个{value}点。")
+
+def _action(challenge: bool, value: int, number: int, reason: str) -> Dict[str, Any]:
+    return {
+        "challenge": challenge,
+        "value": value,
+        "number": number,
+        "reason": reason,
+        "behaviour": "面无表情地敲了敲桌子。",
+    }
+
+POLICIES: Dict[str, Callable[[Dict[str, Any], random.Random], Dict[str, Any]]] = {
+    "honest": honest_policy,
+    "bluffer": bluffer_policy,
+    "random": random_policy,
+}
+
+class StubLLMServer(ThreadingHTTPServer):
+    """桩服务器，保存策略与故障注入配置"""
+    daemon_threads = True
+
+    def __init__(self, address, policy: str = "honest", latency: str = "fixed:0", rate_limit_rate: float = 0.0,
+                 unavailable_rate: float = 0.0, malformed_rate: float = 0.0, retry_after: float | None = None,
+                 illegal_rate: float = 0.0, reject_structured: bool = False, reasoning_chars: int = 0,
+                 trailing_chars: int = 0, chunk_interval: float = 0.0, outage_models: List[str] | None = None,
+                 max_prompt_chars: int | None = None, seed: int | None = None):
+        super().__init__(address, StubRequestHandler)
+        self.policy = POLICIES[policy]
+        self.sample_latency = parse_latency(latency)
+        self.rate_limit_rate = rate_limit_rate
+        self.unavailable_rate = unavailable_rate
+        self.malformed_rate = malformed_rate
+        self.illegal_rate = illegal_rate
+        self.reject_structured = reject_structured
+        self.reasoning_chars = reasoning_chars
+        self.trailing_chars = trailing_chars
+        self.chunk_interval = chunk_interval
+        self.outage_models = set(outage_models or [])
+        self.max_prompt_chars = max_prompt_chars
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.stats = {"requests": 0, "429": 0, "503": 0, "malformed": 0, "illegal": 0, "streams": 0, "cancelled": 0}
+        self._seen_prefixes = OrderedDict()
+
+    def cached_prefix_tokens(self, messages: List[Dict[str, Any]]) -> int:
+        """模拟供应商的前缀缓存：系统消息此前出现过时，其长度计为缓存命中"""
+        if not messages or messages[0].get("role") != "system":
+            return 0
+        system = str(messages[0].get("content", ""))
+        key = hash(system)
+        with self.rng_lock:
+            if key in self._seen_prefixes:
+                self._seen_prefixes.move_to_end(key)
+                return len(system)
+            self._seen_prefixes[key] = None
+            if len(self._seen_prefixes) > 10000:
+                self._seen_prefixes.popitem(last=False)
+        return 0
+
+    def count(self, key: str):
+        with self.rng_lock:
+            self.stats[key] += 1
+
+    def draw(self, fn):
+        """线程安全地使用共享随机数生成器"""
+        with self.rng_lock:
+            return fn(self.rng)
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    server: StubLLMServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": f"stub-{name}", "object": "model"} for name in POLICIES]})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server
+        server.count("requests")
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in request.get("messages", []))
+        if server.max_prompt_chars is not None and prompt_chars > server.max_prompt_chars:
+            self._send_json(400, {"error": {
+                "message": f"This model's maximum context length is {server.max_prompt_chars} tokens. "
+                           f"However, your messages resulted in {prompt_chars} tokens.",
+                "type": "invalid_request_error", "param": "messages", "code": "context_length_exceeded",
+            }})
+            return
+        if server.reject_structured and (request.get("tools") or request.get("response_format", {}).get("type") == "json_schema"):
+            # 与 OpenAI 的错误格式相同：消息与 param 指出被拒绝的参数
+            param = "tools" if request.get("tools") else "response_format"
+            message = "'tools' is not supported with this model." if request.get("tools") else \
+                "Invalid parameter: 'response_format' of type 'json_schema' is not supported with this model."
+            self._send_json(400, {"error": {"message": message, "type": "invalid_request_error", "param": param}})
+            return
+
+        time.sleep(max(0.0, server.draw(server.sample_latency)))
+
+        fault = server.draw(lambda rng: rng.random())
+        if request.get("model") in server.outage_models:
+            server.count("503")
+            self._send_error(503, "service_unavailable", "The model is temporarily unavailable")
+            return
+        if fault < server.rate_limit_rate:
+            server.count("429")
+            self._send_error(429, "rate_limit_exceeded", "Rate limit reached for requests")
+            return
+        if fault < server.rate_limit_rate + server.unavailable_rate:
+            server.count("503")
+            self._send_error(503, "service_unavailable", "The server is overloaded")
+            return
+
+        messages = request.get("messages", [])
+        text = "\n".join(str(m.get("content", "")) for m in messages)
+        content = json.dumps(self._respond(str(messages[-1].get("content", "")) if messages else "", request.get("model", "")), ensure_ascii=False)
+        if server.draw(lambda rng: rng.random()) < server.malformed_rate:
+            server.count("malformed")
+            content = server.draw(lambda rng: _malform(content, rng))
+
+        # 模拟推理模型：先输出一段推理内容，JSON之后还有一段说明文字
+        reasoning = _filler("让我分析一下场上的局面。", server.reasoning_chars)
+        content += _filler("\n\n以上是我的决策，理由已经写在reason字段中。", server.trailing_chars)
+
+        prompt_tokens = len(text)
+        completion_tokens = len(reasoning) + len(content)
+        cached_tokens = server.cached_prefix_tokens(messages)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+            "completion_tokens_details": {"reasoning_tokens": len(reasoning)},
+        }
+        tools = request.get("tools")
+        if request.get("stream"):
+            self._send_stream(request, reasoning, content, usage)
+            return
+        # 非流式响应同样要等全部内容生成完毕
+        time.sleep(server.chunk_interval * (len(_chunks(reasoning)) + len(_chunks(content))))
+
+        message = {"role": "assistant", "content": content}
+        if reasoning:
+            message["reasoning_content"] = reasoning
+        if tools:
+            # 函数调用模式：结果放在被强制调用的函数参数中
+            message = {"role": "assistant", "content": None, "tool_calls": [{
+                "id": f"call_{uuid.uuid4().hex[:24]}",
+                "type": "function",
+                "function": {"name": tools[0]["function"]["name"], "arguments": content},
+            }]}
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if tools else "stop",
+            }],
+            "usage": usage,
+        })
+
+    def _send_stream(self, request: Dict[str, Any], reasoning: str, content: str, usage: Dict[str, Any]):
+        """以 SSE 分块返回，客户端提前断开时停止生成"""
+        server = self.server
+        server.count("streams")
+        tools = request.get("tools")
+        base = {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+        }
+        deltas = [{"role": "assistant", "content": ""}]
+        deltas += [{"reasoning_content": piece} for piece in _chunks(reasoning)]
+        if tools:
+            call_id = f"call_{uuid.uuid4().hex[:24]}"
+            deltas += [
+                {"tool_calls": [{"index": 0, "id": call_id, "type": "function",
+                                 "function": {"name": tools[0]["function"]["name"], "arguments": piece}}]}
+                for piece in _chunks(content)
+            ]
+        else:
+            deltas += [{"content": piece} for piece in _chunks(content)]
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            for i, delta in enumerate(deltas):
+                if i and server.chunk_interval:
+                    time.sleep(server.chunk_interval)
+                self._send_event({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+            self._send_event({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "tool_calls" if tools else "stop"}]})
+            if request.get("stream_options", {}).get("include_usage"):
+                self._send_event({**base, "choices": [], "usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            server.count("cancelled")
+
+    def _send_event(self, payload: Dict[str, Any]):
+        self.wfile.write(b"data: " + json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n\n")
+        self.wfile.flush()
+
+    def _respond(self, text: str, model: str) -> Dict[str, Any]:
+        """根据提示词类型生成决策或反思结果，模型名为 stub-<策略> 时使用对应策略"""
+        if names := _REFLECT_KEY_PATTERN.findall(text):
+            return {name: "出价偏保守，较少虚张声势。" for name in names}
+        state = _parse_state(text)
+        policy = POLICIES.get(model.removeprefix("stub-"), self.server.policy)
+        if self.server.draw(lambda rng: rng.random()) < self.server.illegal_rate:
+            self.server.count("illegal")
+            return self.server.draw(lambda rng: _illegal_action(state, rng))
+        return self.server.draw(lambda rng: policy(state, rng))
+
+    def _send_error(self, status: int, code: str, message: str):
+        headers = {"Retry-After": f"{self.server.retry_after:g}"} if self.server.retry_after is not None else {}
+        self._send_json(status, {"error": {"message": message, "type": code, "code": code}}, headers)
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Dict[str, str] | None = None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+def _filler(sentence: str, length: int) -> str:
+    """重复句子直到指定长度"""
+    if length <= 0:
+        return ""
+    return (sentence * (length // len(sentence) + 1))[:length]
+
+def _chunks(text: str, size: int = 8) -> List[str]:
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+def _illegal_action(state: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+    """生成格式正确但违反规则的决策：不大于上家的叫点、越界的点数，或首家质疑"""
+    number, value = state["bid"]
+    match rng.randrange(3):
+        case 0 if number > 0:
+            return _action(False, value, number, "重复上家的叫点。")
+        case 1:
+            return _action(False, 7, number + 1, "叫一个不存在的点数。")
+        case _:
+            if state["is_first"]:
+                return _action(True, 0, 0, "首家质疑。")
+            return _action(False, max(value - 1, 0), max(number - 1, 0), "叫点比上家小。")
+
+def _malform(content: str, rng: random.Random) -> str:
+    """生成几种常见的不合规输出"""
+    match rng.randrange(4):
+        case 0:
+            return f"```json\n{content}\n```"
+        case 1:
+            return f"好的，我的决策如下：{content} 以上。"
+        case 2:
+            return content[: math.ceil(len(content) * 0.6)]
+        case _:
+            return content.replace('"challenge"', "'challenge'").rstrip("}") + ",}"
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI 兼容的本地桩 LLM 服务器")
+    parser.add_argument("--host", type=str, default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--policy", choices=list(POLICIES), default="honest", help="模型名不是 stub-<策略> 时使用的默认策略")
+    parser.add_argument("--latency", type=str, default="fixed:0", help="延迟分布，如 uniform:0.2,1.5、lognormal:-0.5,0.6")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="返回429的概率")
+    parser.add_argument("--unavailable-rate", type=float, default=0.0, help="返回503的概率")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="返回不合规JSON的概率")
+    parser.add_argument("--illegal-rate", type=float, default=0.0, help="返回违反规则的决策的概率")
+    parser.add_argument("--reject-structured", action="store_true", help="以400拒绝 json_schema/函数调用请求，模拟不支持结构化输出的供应商")
+    parser.add_argument("--reasoning-chars", type=int, default=0, help="每个响应附带的推理内容长度，模拟推理模型")
+    parser.add_argument("--trailing-chars", type=int, default=0, help="JSON之后附带的说明文字长度")
+    parser.add_argument("--chunk-interval", type=float, default=0.0, help="生成每个8字符分块的耗时（秒），流式与非流式响应都会计入")
+    parser.add_argument("--max-prompt-chars", type=int, default=None, help="提示词超过该长度时以400拒绝，模拟超出上下文长度")
+    parser.add_argument("--outage", type=str, action="append", default=[], metavar="MODEL", help="该模型的请求全部返回503，模拟部分故障，可重复")
+    parser.add_argument("--retry-after", type=float, default=None, help="429/503响应中携带的Retry-After秒数")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    args = parser.parse_args()
+
+    server = StubLLMServer(
+        (args.host, args.port),
+        policy=args.policy,
+        latency=args.latency,
+        rate_limit_rate=args.rate_limit_rate,
+        unavailable_rate=args.unavailable_rate,
+        malformed_rate=args.malformed_rate,
+        retry_after=args.retry_after,
+        illegal_rate=args.illegal_rate,
+        reject_structured=args.reject_structured,
+        reasoning_chars=args.reasoning_chars,
+        trailing_chars=args.trailing_chars,
+        chunk_interval=args.chunk_interval,
+        outage_models=args.outage,
+        max_prompt_chars=args.max_prompt_chars,
+        seed=args.seed,
+    )
+    print(f"桩服务器已启动：http://{args.host}:{args.port}/v1 （策略：{args.policy}）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"请求统计：{server.stats}")
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
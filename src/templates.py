@@ -0,0 +1,114 @@
+"""
+提示词模板缓存
+
+模板文件在进程内只读取并预编译一次，之后按修改时间失效（检查间隔可调，便于在运行中
+直接编辑 template/ 下的文件）。编译后的模板可以预先填入每局不变的字段（如玩家名字），
+每回合只需拼接动态字段，不再产生任何磁盘IO。
+"""
+
+import os
+import string
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+_formatter = string.Formatter()
+
+class CompiledTemplate:
+    """预先解析好的 str.format 模板"""
+
+    def __init__(self, text: str, version: int = 0):
+        self.text = text
+        self.version = version      # 所属模板文件的版本号，文件变化后递增
+        # 每段为 (字面量, 字段名, 格式说明, 转换符)，字段名为 None 表示末尾的纯文本
+        self.segments: List[Tuple[str, str | None, str, str | None]] = [
+            (literal, field, spec or "", conversion)
+            for literal, field, spec, conversion in _formatter.parse(text)
+        ]
+        self.fields = {field for _, field, _, _ in self.segments if field}
+
+    def render(self, **kwargs: Any) -> str:
+        """填充所有字段，结果与 str.format 相同"""
+        parts = []
+        for literal, field, spec, conversion in self.segments:
+            parts.append(literal)
+            if field is not None:
+                parts.append(self._format_field(kwargs[field], spec, conversion))
+        return "".join(parts)
+
+    def partial(self, **kwargs: Any) -> "CompiledTemplate":
+        """预先填入部分字段，返回只含剩余字段的新模板"""
+        compiled = CompiledTemplate.__new__(CompiledTemplate)
+        compiled.version = self.version
+        compiled.segments = []
+        pending = ""
+        for literal, field, spec, conversion in self.segments:
+            pending += literal
+            if field is None:
+                continue
+            if field in kwargs:
+                pending += self._format_field(kwargs[field], spec, conversion)
+            else:
+                compiled.segments.append((pending, field, spec, conversion))
+                pending = ""
+        compiled.segments.append((pending, None, "", None))
+        compiled.fields = {field for _, field, _, _ in compiled.segments if field}
+        compiled.text = "".join(
+            literal.replace("{", "{{").replace("}", "}}") + (f"{{{field}}}" if field else "")
+            for literal, field, _, _ in compiled.segments
+        )
+        return compiled
+
+    @staticmethod
+    def _format_field(value: Any, spec: str, conversion: str | None) -> str:
+        if conversion:
+            value = _formatter.convert_field(value, conversion)
+        return format(value, spec) if spec else str(value)
+
+class TemplateStore:
+    """按路径缓存模板文件，修改时间变化时自动重新编译"""
+
+    def __init__(self, check_interval: float = 1.0):
+        """
+            check_interval: 两次检查文件修改时间的最小间隔（秒），为0时每次都检查
+        """
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        # path -> [mtime, 上次检查时间, 原始文本, 版本号, 编译结果（首次 get 时才编译）]
+        self._entries: Dict[str, list] = {}
+
+    def _entry(self, path: str) -> list:
+        now = time.monotonic()
+        entry = self._entries.get(path)
+        if entry is not None and now - entry[1] < self.check_interval:
+            return entry
+        with self._lock:
+            entry = self._entries.get(path)
+            mtime = os.path.getmtime(path)
+            if entry is None or entry[0] != mtime:
+                with open(path, 'r', encoding='utf-8') as f:
+                    text = f.read().strip()
+                version = entry[3] + 1 if entry else 0
+                entry = [mtime, now, text, version, None]
+                self._entries[path] = entry
+            else:
+                entry[1] = now
+            return entry
+
+    def text(self, path: str) -> str:
+        """获取文件原始文本（如规则文本，不作为模板解析）"""
+        return self._entry(path)[2]
+
+    def get(self, path: str) -> CompiledTemplate:
+        """获取编译后的模板"""
+        entry = self._entry(path)
+        if (compiled := entry[4]) is None:
+            compiled = entry[4] = CompiledTemplate(entry[2], entry[3])
+        return compiled
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# 进程内共享的模板缓存
+template_store = TemplateStore()
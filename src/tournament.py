@@ -0,0 +1,298 @@
+"""
+序贯检验的锦标赛调度
+
+固定局数、固定阵容和座位的批量对战会把大量预算花在不再改变结论的对局上。
+这里对每一对需要比较的模型做序贯概率比检验（SPRT）：
+    一局中两个模型都在场时，名次更高（同一模型占多个座位时取其最好名次）的一方记为胜；
+    H0：A 的胜率为 0.5 - delta（B 更强），H1：A 的胜率为 0.5 + delta（A 更强），
+    对数似然比越过 log((1-β)/α) 或 log(β/(1-α)) 时判定并停止该比较，达到每对的局数上限仍未判定则记为无显著差异。
+调度器每次优先为已安排局数最少、尚未判定的比较组建阵容（座位不足时重复已选的模型），
+一局同时为阵容中的所有模型对提供结果；已判定的比较不再计入新的结果。
+座位按对局编号轮转，可选每局随机分配玩家名字，避免座位与名字带来的偏差。
+
+用法：
+    python -m src.tournament --models stub-honest stub-bluffer stub-random bot-balanced -t 8 --seed 1
+    python -m src.tournament --spec config/tournament.json
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Sequence
+
+from src import client_pool, log_backend
+from src.events import EventLog, JsonlSink, TextLogSink
+from src.game import LiarsDiceGame, derive_seed
+from src.players import Player
+from src.ratings import RatingStore, game_key, print_leaderboard
+from src.snippets import *
+
+PLAYER_NAMES = ["Alice", "Bob", "Charlie", "David", "Eve", "Frank", "Grace", "Heidi"]
+RUNNING, A_BETTER, B_BETTER, NO_DIFFERENCE = "running", "a_better", "b_better", "no_difference"
+
+class SPRT:
+    """胜率的序贯概率比检验：H0 p = 0.5 - delta，H1 p = 0.5 + delta"""
+
+    def __init__(self, delta: float = 0.1, alpha: float = 0.05, beta: float = 0.05):
+        self.p0, self.p1 = 0.5 - delta, 0.5 + delta
+        self.upper = math.log((1 - beta) / alpha)
+        self.lower = math.log(beta / (1 - alpha))
+        self.llr = 0.0
+        self.games = 0
+        self.wins = 0
+
+    def update(self, win: bool) -> str:
+        """计入一局，返回当前结论"""
+        self.games += 1
+        self.wins += win
+        self.llr += math.log(self.p1 / self.p0) if win else math.log((1 - self.p1) / (1 - self.p0))
+        return self.state
+
+    @property
+    def state(self) -> str:
+        if self.llr >= self.upper:
+            return A_BETTER
+        if self.llr <= self.lower:
+            return B_BETTER
+        return RUNNING
+
+class Comparison:
+    """一对模型的比较"""
+
+    def __init__(self, a: str, b: str, max_games: int, **sprt_kwargs):
+        self.a = a
+        self.b = b
+        self.max_games = max_games
+        self.test = SPRT(**sprt_kwargs)
+        self.scheduled = 0      # 已安排（含进行中）的对局数
+        self.state = RUNNING
+
+    def record(self, order: Sequence[str]):
+        """按一局的名次（模型，第一名在前）计入结果"""
+        if self.state != RUNNING:
+            return
+        self.state = self.test.update(order.index(self.a) < order.index(self.b))
+        if self.state == RUNNING and self.test.games >= self.max_games:
+            self.state = NO_DIFFERENCE
+
+    def describe(self) -> str:
+        t = self.test
+        result = {
+            RUNNING: "未完成",
+            A_BETTER: f"{self.a} 更强",
+            B_BETTER: f"{self.b} 更强",
+            NO_DIFFERENCE: "达到局数上限，无显著差异",
+        }[self.state]
+        rate = f"{t.wins / t.games:.1%}" if t.games else "-"
+        return f"{self.a} vs {self.b}: {t.wins}/{t.games}（{rate}），LLR {t.llr:+.2f} [{t.lower:.2f}, {t.upper:.2f}] → {result}"
+
+class Tournament:
+    def __init__(self, models: Sequence[str], pairs: Sequence[tuple[str, str]] | None = None, seats: int = 4,
+                 rotate_seats: bool = True, shuffle_names: bool = False, max_games: int = 200, budget: int | None = None,
+                 seed: int | None = None, delta: float = 0.1, alpha: float = 0.05, beta: float = 0.05,
+                 game_options: Dict[str, Any] | None = None, player_options: Dict[str, Any] | None = None,
+                 events_dir: str | None = None, ratings: RatingStore | None = None):
+        """
+            models: 参赛模型
+            pairs: 需要比较的模型对，默认为 models 中的所有两两组合
+            seats: 每局的座位数
+            rotate_seats: 是否按对局编号轮转座位
+            shuffle_names: 是否每局随机分配玩家名字
+            max_games: 每对比较最多进行的局数
+            budget: 整个锦标赛最多进行的局数
+            game_options / player_options: 传给 LiarsDiceGame / Player 的其他参数
+        """
+        if seats < 2 or seats > len(PLAYER_NAMES):
+            raise ValueError(f"座位数需在2到{len(PLAYER_NAMES)}之间")
+        for model in models:
+            if model not in model_list:
+                raise ValueError(f"不支持的模型：{model}")
+        pairs = pairs or list(itertools.combinations(models, 2))
+        if not pairs:
+            raise ValueError("至少需要两个模型")
+        self.comparisons = [Comparison(a, b, max_games, delta=delta, alpha=alpha, beta=beta) for a, b in pairs]
+        self.seats = seats
+        self.rotate_seats = rotate_seats
+        self.shuffle_names = shuffle_names
+        self.budget = budget
+        self.seed = seed if seed is not None else random.SystemRandom().randrange(2 ** 32)
+        self.game_options = game_options or {}
+        self.player_options = player_options or {}
+        self.events_dir = events_dir
+        self.ratings = ratings
+        self.games_played = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def _pending(self) -> List[Comparison]:
+        return [c for c in self.comparisons if c.state == RUNNING and c.scheduled < c.max_games]
+
+    def next_lineup(self, index: int) -> List[tuple[str, str]] | None:
+        """
+        为第 index 局组建阵容
+        Returns:
+            按座位排列的 (玩家名, 模型)；所有比较都已判定或安排满时返回None
+        """
+        with self._lock:
+            pending = sorted(self._pending(), key=lambda c: c.scheduled)
+            if not pending:
+                return None
+            models: List[str] = []
+            for c in pending:
+                if len(models) + (c.a not in models) + (c.b not in models) > self.seats:
+                    continue
+                models += [m for m in (c.a, c.b) if m not in models]
+                if len(models) == self.seats:
+                    break
+            distinct = list(models)
+            while len(models) < self.seats:
+                models.append(distinct[len(models) % len(distinct)])
+            for c in self.comparisons:
+                if c.state == RUNNING and c.a in models and c.b in models:
+                    c.scheduled += 1
+        if self.rotate_seats:
+            shift = index % self.seats
+            models = models[shift:] + models[:shift]
+        names = PLAYER_NAMES[:self.seats]
+        if self.shuffle_names:
+            names = random.Random(derive_seed(self.seed, index) ^ 1).sample(names, self.seats)
+        return list(zip(names, models))
+
+    def play(self, index: int, lineup: List[tuple[str, str]], game_id: str | None = None) -> List[str]:
+        """进行一局，返回各座位模型的名次（第一名在前）"""
+        os.makedirs("logs", exist_ok=True)
+        logger = log_backend.open_game_log(f"logs/tournament_{self.seed}_{index}.log")
+        sinks = [TextLogSink(logger)]
+        if self.events_dir:
+            sinks.append(JsonlSink(os.path.join(self.events_dir, f"game_{index}.jsonl.gz")))
+        events = EventLog(sinks, game=index)
+        try:
+            players = [Player(name=name, is_human=False, model=model, logger=logger, **self.player_options) for name, model in lineup]
+            game = LiarsDiceGame(players, logger=logger, seed=derive_seed(self.seed, index), events=events, game_id=game_id,
+                                 **self.game_options)
+            game.start_game()
+        finally:
+            events.close()
+            log_backend.close_game_log(logger)
+        model_of = dict(lineup)
+        return [model_of[name] for name in game.finish_order()]
+
+    def _finish(self, lineup: List[tuple[str, str]], order: List[str] | None, index: int, game_id: str | None = None):
+        models = [model for _, model in lineup]
+        with self._lock:
+            for c in self.comparisons:
+                if c.a in models and c.b in models and c.state == RUNNING:
+                    if order is None:
+                        c.scheduled -= 1    # 失败的对局不计入，之后重新安排
+                    else:
+                        c.record(order)
+            if order is None:
+                self.failures += 1
+                return
+            self.games_played += 1
+        if self.ratings:
+            self.ratings.update(order, key=game_key(derive_seed(self.seed, index), order, game_id))
+
+    def run(self, threads: int = 1, max_failures: int = 10, verbose: bool = True):
+        """调度对局直到所有比较都已判定、达到上限或用完预算"""
+        index = 0
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            running = {}
+
+            def fill():
+                nonlocal index
+                while len(running) < threads and (self.budget is None or index < self.budget) and self.failures < max_failures:
+                    lineup = self.next_lineup(index)
+                    if lineup is None:
+                        return
+                    game_id = uuid.uuid4().hex     # 评分按对局ID去重，相同种子重新运行的锦标赛照常计分
+                    running[executor.submit(self.play, index, lineup, game_id)] = (index, lineup, game_id)
+                    index += 1
+
+            fill()
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    game_index, lineup, game_id = running.pop(future)
+                    try:
+                        order = future.result()
+                    except Exception as e:
+                        order = None
+                        print(f"第{game_index}局游戏中检测到异常：{str(e)}")
+                    self._finish(lineup, order, game_index, game_id)
+                    if verbose and order is not None:
+                        print(f"({game_index}) " + " > ".join(order), flush=True)
+                fill()
+
+def _parse_pair(spec: str) -> tuple[str, str]:
+    a, b = spec.split(":", 1)
+    return a, b
+
+def main():
+    parser = argparse.ArgumentParser(description="序贯检验的锦标赛调度")
+    parser.add_argument("--spec", type=str, default=None, help="JSON格式的锦标赛配置，键与命令行参数同名（如 models、pairs、seats），命令行参数优先")
+    parser.add_argument("--models", nargs="+", default=None, help="参赛模型")
+    parser.add_argument("--pair", dest="pairs", action="append", type=_parse_pair, default=None, metavar="A:B", help="需要比较的模型对，可重复；默认比较所有两两组合")
+    parser.add_argument("--seats", type=int, default=4, help="每局的座位数")
+    parser.add_argument("--no-rotate", dest="rotate_seats", action="store_false", help="不轮转座位")
+    parser.add_argument("--shuffle-names", action="store_true", help="每局随机分配玩家名字")
+    parser.add_argument("--max-games", type=int, default=200, help="每对比较最多进行的局数")
+    parser.add_argument("--budget", type=int, default=None, help="整个锦标赛最多进行的局数")
+    parser.add_argument("--delta", type=float, default=0.1, help="SPRT 的胜率差异：H0 p=0.5-delta，H1 p=0.5+delta")
+    parser.add_argument("--alpha", type=float, default=0.05, help="第一类错误率")
+    parser.add_argument("--beta", type=float, default=0.05, help="第二类错误率")
+    parser.add_argument("--seed", type=int, default=None, help="运行种子")
+    parser.add_argument("-t", "--threads", type=int, default=1, help="同时进行的对局数")
+    parser.add_argument("--max-failures", type=int, default=10, help="失败的对局数达到该值时停止安排新对局")
+    parser.add_argument("--prompt-layout", choices=prompt_layouts, default="default", help="提示词布局")
+    parser.add_argument("--stream", action="store_true", help="决策请求使用流式响应")
+    parser.add_argument("--repair", choices=repair_policies, default="off", help="AI玩家非法叫点的本地修正策略")
+    parser.add_argument("--shortcut", choices=shortcut_policies, default="off", help="只有一个合理行动时在本地决策")
+    parser.add_argument("--reflection", choices=reflection_modes, default="sync", help="每轮结束后的反思方式")
+    parser.add_argument("--events", type=str, default=None, metavar="DIR", help="把每局的结构化事件写成JSONL")
+    parser.add_argument("--ratings", type=str, default=None, metavar="PATH", help="同时更新模型评分（SQLite文件）")
+    args = parser.parse_args()
+    if args.spec:
+        with open(args.spec, encoding="utf-8") as f:
+            spec = json.load(f)
+        if "pairs" in spec:
+            spec["pairs"] = [tuple(pair) for pair in spec["pairs"]]
+        parser.set_defaults(**spec)
+        args = parser.parse_args()
+    models = args.models or sorted({m for pair in args.pairs or [] for m in pair})
+    if args.events:
+        os.makedirs(args.events, exist_ok=True)
+
+    client_pool.configure(max_connections=max(100, args.threads * 4), max_keepalive_connections=max(20, args.threads * 4))
+    ratings = RatingStore(args.ratings) if args.ratings else None
+    tournament = Tournament(
+        models, args.pairs, seats=args.seats, rotate_seats=args.rotate_seats, shuffle_names=args.shuffle_names,
+        max_games=args.max_games, budget=args.budget, seed=args.seed, delta=args.delta, alpha=args.alpha, beta=args.beta,
+        game_options={"repair_policy": args.repair, "shortcut_policy": args.shortcut, "reflection_mode": args.reflection},
+        player_options={"prompt_layout": args.prompt_layout, "stream": args.stream},
+        events_dir=args.events, ratings=ratings,
+    )
+    print(f"运行种子：{tournament.seed}，比较{len(tournament.comparisons)}对模型")
+    start_time = time.time()
+    try:
+        tournament.run(threads=args.threads, max_failures=args.max_failures)
+    finally:
+        log_backend.shutdown()
+        print(f"共进行{tournament.games_played}局（失败{tournament.failures}局），耗时{time.time() - start_time:.1f}s")
+        for c in tournament.comparisons:
+            print(c.describe())
+        if ratings:
+            print_leaderboard(ratings.leaderboard(models))
+            if ratings.duplicates or ratings.self_play:
+                print(f"评分跳过{ratings.duplicates}局已计入过的对局、{ratings.self_play}局自我对弈")
+            ratings.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import numpy as np
+
+from src.analytics import ResultStore, StoreBuilder, summarize
+
+def game_events(seed, models, bids=((3, 5),)):
+    """两人对局：Alice 叫点，Bob 质疑，Alice 死亡"""
+    players = [{"name": name, "model": model} for name, model in zip(("Alice", "Bob"), models)]
+    events = [
+        {"type": "game_start", "seed": seed, "players": players},
+        {"type": "roll", "round": 1, "dice": {"Alice": [1, 5, 5], "Bob": [2, 5, 6]}},
+    ]
+    events += [{"type": "bid", "player": "Alice", "number": number, "value": value} for number, value in bids]
+    events += [
+        {"type": "challenge", "player": "Bob"},
+        {"type": "death", "player": "Alice", "place": 2},
+        {"type": "game_end", "winner": "Bob", "rounds": 1},
+    ]
+    return events
+
+def test_dedupe_by_seed_and_lineup():
+    builder = StoreBuilder()
+    assert builder.add_game(game_events(7, ["model-a", "model-b"]))
+    # 同一种子换了参赛模型是另一局；同种子同阵容（座位不同）是重复导入
+    assert builder.add_game(game_events(7, ["model-a", "model-c"]))
+    assert not builder.add_game(game_events(7, ["model-b", "model-a"]))
+    assert builder.skipped == 1
+
+    store = builder.build()
+    again = StoreBuilder(store.game_keys())
+    assert not again.add_game(game_events(7, ["model-c", "model-a"]))
+    assert again.add_game(game_events(8, ["model-a", "model-c"]))
+
+def test_out_of_range_bid_is_clamped_and_counted(tmp_path):
+    builder = StoreBuilder()
+    builder.add_game(game_events(1, ["model-a", "model-b"], bids=((3, 5), (40000, 300))))
+    store = builder.build()
+    assert builder.clamped == 1
+    assert store.turns["number"].tolist()[:2] == [3, 32767]
+    assert store.turns["value"].tolist()[:2] == [5, 300]
+    assert summarize(store)["games"] == 1
+
+    # 旧版本的 int8 列读入后按当前类型合并，不会被截断
+    path = tmp_path / "old.npz"
+    np.savez_compressed(path, models=np.array(store.models), **{"turns.value": store.turns["value"][:1].astype(np.int8)},
+                        **{f"turns.{k}": v[:1] for k, v in store.turns.items() if k != "value"},
+                        **{f"games.{k}": v for k, v in store.games.items()}, **{f"seats.{k}": v for k, v in store.seats.items()})
+    merged = ResultStore.load(str(path)).concat(store)
+    assert merged.turns["value"].dtype == np.int16
+    assert 300 in merged.turns["value"].tolist()
+
+def test_dedupe_prefers_game_id(tmp_path):
+    first, rerun = game_events(7, ["model-a", "model-b"]), game_events(7, ["model-a", "model-b"])
+    first[0]["game_id"], rerun[0]["game_id"] = "a" * 32, "b" * 32
+    builder = StoreBuilder()
+    assert builder.add_game(first) and builder.add_game(rerun)
+    store = builder.build()
+    path = str(tmp_path / "store.npz")
+    store.save(path)
+    loaded = ResultStore.load(path)
+    assert loaded.games["id"].tolist() == ["a" * 32, "b" * 32]
+    assert not StoreBuilder(loaded.game_keys()).add_game(rerun)
@@ -0,0 +1,119 @@
+import time
+
+import httpx
+import pytest
+from openai import BadRequestError, InternalServerError
+
+from src import circuit_breaker
+from src.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from src.llm_client import LLMResponse, OpenAILLMClient
+from src.snippets import LLMRateLimitError
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    return now
+
+def test_opens_on_error_rate(clock):
+    breaker = CircuitBreaker("m", window=10, min_calls=4, error_rate=0.5)
+    for success in (True, False, True):
+        breaker.record(success, 0.1)
+    assert breaker.state == CLOSED         # 调用数不足 min_calls
+    breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.retry_after() == pytest.approx(30)
+
+def test_half_open_probes_then_close(clock):
+    breaker = CircuitBreaker("m", min_calls=1, open_seconds=10, half_open_probes=2)
+    breaker.record(False, 0.1)
+    clock[0] += 10
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()              # 同时只放行 half_open_probes 个探测
+    breaker.record(True, 0.1)
+    assert breaker.state == HALF_OPEN
+    breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+    assert dict(breaker.transitions) == {OPEN: 1, HALF_OPEN: 1, CLOSED: 1}
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker("m", min_calls=1, open_seconds=10)
+    breaker.record(False, 0.1)
+    clock[0] += 10
+    assert breaker.allow()
+    breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+    assert breaker.retry_after() == pytest.approx(10)
+
+def test_opens_on_slow_calls(clock):
+    breaker = CircuitBreaker("m", min_calls=2, slow_call_seconds=5, slow_rate=0.5)
+    breaker.record(True, 6)
+    breaker.record(True, 6)
+    assert breaker.state == OPEN
+
+class Client:
+    def __init__(self, model, fail=False):
+        self.model = model
+        self.fail = fail
+
+    def chat(self, messages):
+        if self.fail:
+            raise LLMRateLimitError("503")
+        return self.model
+
+def test_failover_switches_to_fallback(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "_breakers", {})
+    circuit_breaker.configure(min_calls=1)
+    try:
+        client = circuit_breaker.FailoverLLMClient(Client("primary", fail=True), Client("backup"))
+        assert client.chat([]) == "backup"
+        assert client.chat([]) == "backup"          # 主模型已熔断，不再尝试
+        assert dict(client.answered) == {"backup": 2}
+        with pytest.raises(circuit_breaker.CircuitOpenError):
+            circuit_breaker.FailoverLLMClient(Client("primary")).chat([])
+    finally:
+        circuit_breaker.configure(min_calls=5)
+
+def api_error(cls, status):
+    response = httpx.Response(status, request=httpx.Request("POST", "http://stub/v1/chat/completions"))
+    return cls(f"HTTP {status}", response=response, body=None)
+
+class RaisingClient:
+    def __init__(self, model, error):
+        self.model = model
+        self.error = error
+
+    def chat(self, messages):
+        raise self.error
+
+@pytest.fixture
+def breakers(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, "_breakers", {})
+    circuit_breaker.configure(min_calls=1)
+    yield
+    circuit_breaker.configure(min_calls=5, slow_call_seconds=None)
+
+def test_caller_errors_do_not_open(breakers):
+    client = circuit_breaker.FailoverLLMClient(RaisingClient("rejecting", api_error(BadRequestError, 400)))
+    for _ in range(3):
+        with pytest.raises(BadRequestError):
+            client.chat([])
+    assert circuit_breaker.get_breaker("rejecting").state == CLOSED
+
+    client = circuit_breaker.FailoverLLMClient(RaisingClient("failing", api_error(InternalServerError, 500)))
+    with pytest.raises(InternalServerError):
+        client.chat([])
+    assert circuit_breaker.get_breaker("failing").state == OPEN
+
+def test_limiter_wait_is_not_a_slow_call(breakers, monkeypatch):
+    monkeypatch.setenv("STUB_API_KEY", "x")
+    circuit_breaker.configure(slow_call_seconds=0.05)
+    llm = OpenAILLMClient("stub-honest")
+    monkeypatch.setattr(llm.limiter, "acquire", lambda tokens: time.sleep(0.1))    # 本地令牌桶排队
+    monkeypatch.setattr(llm, "_create", lambda messages, schema: LLMResponse("{}", "", llm.model))
+    client = circuit_breaker.FailoverLLMClient(llm)
+    for _ in range(3):
+        assert client.chat([{"role": "user", "content": "hi"}]).latency < 0.05
+    assert circuit_breaker.get_breaker("stub-honest").state == CLOSED
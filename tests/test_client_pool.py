@@ -0,0 +1,13 @@
+from src import client_pool
+from src.players import Player
+
+def test_missing_keys_file_uses_defaults(tmp_path, monkeypatch):
+    monkeypatch.setattr(client_pool, "KEYS_PATH", str(tmp_path / "keys.json"))
+    monkeypatch.setattr(client_pool, "_keys_cache", None)
+    assert client_pool.load_keys() == {}
+    assert client_pool.get_api_key("stub-honest") == "stub"
+    assert Player(name="a", model="stub-honest").llm_client is not None
+
+    # 之后创建的密钥文件会被读入
+    (tmp_path / "keys.json").write_text('{"STUB_API_KEY": "local"}', encoding="utf-8")
+    assert client_pool.get_api_key("stub-honest") == "local"
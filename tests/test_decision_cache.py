@@ -0,0 +1,96 @@
+import json
+import random
+
+from src.decision_cache import DecisionCache
+from src.game import LiarsDiceGame
+from src.llm_client import LLMResponse, UsageTracker
+from src.players import Player
+from tests.test_replay import quiet_logger
+
+def make_players(names, cache):
+    return [Player(name=name, model="deepseek-chat", llm_client=object(), decision_cache=cache) for name in names]
+
+def test_key_is_seat_relative():
+    cache = DecisionCache(":memory:")
+    a = make_players(["Alice", "Bob", "Charlie", "David"], cache)
+    b = make_players(["Eve", "Frank", "Grace", "Heidi"], cache)
+    for players in (a, b):
+        for p in players:
+            p.dice = [3, 1, 5, 5, 2]
+    # Bob（第2个座位）与 Heidi（第4个座位）面对的局面相同：上家叫了3个5点
+    key_bob = a[1]._decision_cache_key(False, a, [("Alice", 3, 5)], "")
+    key_heidi = b[3]._decision_cache_key(False, b, [("Grace", 3, 5)], "")
+    assert key_bob == key_heidi
+    a[0].poison = 1
+    assert a[1]._decision_cache_key(False, a, [("Alice", 3, 5)], "") != key_bob
+
+def test_key_depends_on_opinions_and_sorted_dice():
+    cache = DecisionCache(":memory:")
+    players = make_players(["Alice", "Bob"], cache)
+    players[0].dice = [6, 1, 2]
+    key = players[0]._decision_cache_key(True, players, [], "")
+    players[0].dice = [1, 2, 6]
+    assert players[0]._decision_cache_key(True, players, [], "") == key
+    players[0].opinions["Bob"] = "喜欢虚张声势"
+    assert players[0]._decision_cache_key(True, players, [], "") != key
+
+def test_lookup_needs_full_samples_and_is_deterministic():
+    actions = [{"challenge": False, "number": n, "value": 4, "reason": "", "behaviour": ""} for n in (2, 3, 4)]
+    draws = []
+    for _ in range(2):
+        cache = DecisionCache(":memory:", samples_per_key=3)
+        for action in actions[:2]:
+            cache.add("k", action)
+        assert cache.lookup("k") is None
+        cache.add("k", actions[2])
+        draws.append([cache.lookup("k")["number"] for _ in range(20)])
+    assert draws[0] == draws[1]
+    assert set(draws[0]) == {2, 3, 4}
+
+def test_lookup_does_not_touch_global_rng():
+    cache = DecisionCache(":memory:", samples_per_key=1)
+    cache.add("k", {"challenge": True, "number": 0, "value": 0, "reason": "", "behaviour": ""})
+    random.seed(7)
+    expected = random.random()
+    random.seed(7)
+    cache.lookup("k")
+    assert random.random() == expected
+
+def test_lru_eviction():
+    cache = DecisionCache(":memory:", max_entries=10, samples_per_key=1)
+    for i in range(11):
+        cache.add(f"k{i}", {"challenge": True})
+    assert len(cache) < 11
+    assert cache.lookup("k10") is not None
+
+class OneIllegalClient(UsageTracker):
+    """第一次给出越界的叫点，之后给出合法的叫点"""
+
+    def __init__(self):
+        self._init_usage()
+        self.values = [9]
+
+    def chat(self, messages):
+        self._record_usage({})
+        value = self.values.pop() if self.values else 4
+        action = {"challenge": False, "value": value, "number": 2, "reason": "", "behaviour": ""}
+        return LLMResponse(json.dumps(action), "", "deepseek-chat")
+
+def test_only_legal_actions_are_cached():
+    cache = DecisionCache(":memory:", samples_per_key=1)
+    players = [Player(name=name, model="deepseek-chat", llm_client=OneIllegalClient(), decision_cache=cache)
+               for name in ("Alice", "Bob")]
+    game = LiarsDiceGame(players, logger=quiet_logger(), seed=1)
+    game._begin_game()
+    game._begin_round()
+    player = game.active_players[game.current_player_index]
+
+    kwargs = game._action_kwargs(True, player)
+    action, _ = player.get_ai_action(**kwargs)
+    assert game._process_action(player, action, "") == "invalid"
+    assert len(cache) == 0
+    assert player.get_ai_action(**kwargs)[0]["value"] == 4    # 相同局面重新询问LLM，而不是命中非法决策
+
+    action, _ = player.get_ai_action(**game._action_kwargs(True, player))
+    assert game._process_action(player, action, "") == "bid"
+    assert len(cache) == 1
@@ -0,0 +1,78 @@
+import pytest
+
+from src.fast_parser import STREAM_LOOKAHEAD, ActionStreamParser, parse_action, parse_reflection
+
+ACTION = '{"challenge": false, "value": 3, "number": 5, "reason": "手里有两个3", "behaviour": "点了点头"}'
+
+def test_plain_and_wrapped_json():
+    expected = {"challenge": False, "value": 3, "number": 5, "reason": "手里有两个3", "behaviour": "点了点头"}
+    assert parse_action(ACTION) == expected
+    assert parse_action(f"```json\n{ACTION}\n```") == expected
+    assert parse_action(f"<think>上家叫了{{4个2点}}……</think>\n{ACTION}\n以上是我的决策。") == expected
+
+def test_example_object_before_decision_is_ignored():
+    content = '按规则，例如 {"value":6,"number":7} 表示7个6点。我的决策：' + ACTION
+    action = parse_action(content)
+    assert (action["value"], action["number"]) == (3, 5)
+
+def test_last_complete_action_wins():
+    earlier = ACTION.replace('"number": 5', '"number": 4')
+    assert parse_action(f"草稿：{earlier}\n最终：{ACTION}")["number"] == 5
+
+def test_unescaped_inner_quotes_are_kept():
+    content = '{"challenge": false, "value": 3, "number": 5, "reason": "他说"好"，我不信", "behaviour": "笑了"}'
+    action = parse_action(content)
+    assert action["reason"] == '他说"好"，我不信'
+    assert action["behaviour"] == "笑了"
+
+def test_inner_quotes_followed_by_ascii_comma():
+    content = '{"challenge": true, "value": 0, "number": 0, "reason": "他说"好", 但是在虚张声势", "behaviour": "摇头"}'
+    assert parse_action(content)["challenge"] is True
+
+def test_scan_stays_inside_one_object():
+    # 第二个对象不合规（尾随逗号），例子里的值不能混进来
+    content = '例子：{"value": 6, "number": 7}\n决策：{"challenge": false, "value": 2, "number": 3, "reason": "x", "behaviour": "y",}'
+    action = parse_action(content)
+    assert (action["value"], action["number"]) == (2, 3)
+
+def test_lenient_fields():
+    content = "{'challenge': 'false', 'value': '4', 'number': 6.0, 'reason': 'it\\'s fine', 'behaviour': '看着天花板'}"
+    assert parse_action(content) == {"challenge": False, "value": 4, "number": 6, "reason": "it's fine", "behaviour": "看着天花板"}
+
+def test_truncated_response():
+    content = '{"challenge": false, "value": 5, "number": 4, "reason": "保守", "behaviour": "沉默"'
+    assert parse_action(content)["value"] == 5
+
+def test_missing_keys_raise():
+    with pytest.raises(ValueError):
+        parse_action('{"value": 6, "number": 7}')
+
+def test_reflection_takes_object_with_names():
+    content = '格式如 {"玩家名": "看法"}。\n{"Bob": "喜欢虚张声势", "Charlie": "很谨慎", "Eve": "无关"}'
+    assert parse_reflection(content, ["Bob", "Charlie"]) == {"Bob": "喜欢虚张声势", "Charlie": "很谨慎"}
+    assert parse_reflection("没有看法", ["Bob"]) == {}
+
+def feed_all(parser, text, size=7):
+    """按固定长度切块喂入，返回第一次给出最终决策时的结果"""
+    for i in range(0, len(text), size):
+        if (action := parser.feed(text[i:i + size])) is not None:
+            return action
+    return None
+
+def test_stream_parser_stops_after_lookahead():
+    parser = ActionStreamParser()
+    pieces = ['例如 {"value": 6}，', ACTION[:20], ACTION[20:], "\n之后的说明", "文字" * STREAM_LOOKAHEAD]
+    results = [parser.feed(piece) for piece in pieces]
+    assert results[:4] == [None] * 4
+    assert results[4]["number"] == 5
+    assert parser.text[:parser.end].endswith(ACTION)
+
+def test_stream_parser_matches_parse_action_on_example_object():
+    example = ACTION.replace('"number": 5', '"number": 4')
+    decision = '{"challenge": true, "value": 0, "number": 0, "reason": "不信", "behaviour": "摇头"}'
+    content = f"例如 {example} 我的决定：{decision}"
+    parser = ActionStreamParser()
+    assert feed_all(parser, content) is None
+    assert parser.action == parse_action(content)
+    assert parser.action["challenge"] is True
+    assert parse_action(parser.text[:parser.end]) == parse_action(content)
@@ -0,0 +1,37 @@
+import threading
+
+import pytest
+from openai import BadRequestError
+
+from src import llm_client
+from src.llm_client import OpenAILLMClient
+from src.stub_server import StubLLMServer
+
+MESSAGES = [{"role": "system", "content": "规则"}, {"role": "user", "content": "你的骰子是1, 2, 3, 4, 5\n你是第一个"}]
+
+@pytest.fixture
+def stub(monkeypatch):
+    """在后台线程中启动拒绝结构化输出、提示词限长100字符的桩服务器"""
+    server = StubLLMServer(("127.0.0.1", 0), reject_structured=True, max_prompt_chars=100)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("STUB_API_KEY", "x")
+    for model in ("stub-honest", "stub-bluffer"):
+        monkeypatch.setitem(llm_client.model_to_url, model, f"http://127.0.0.1:{server.server_address[1]}/v1")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.mark.parametrize("model, mode", [("stub-honest", "json_schema"), ("stub-bluffer", "tools")])
+def test_rejected_structured_output_downgrades(stub, model, mode):
+    client = OpenAILLMClient(model)
+    assert client.output_mode == mode
+    response = client.chat(MESSAGES)
+    assert client.output_mode == "json_object"
+    assert '"challenge"' in response.content
+
+def test_unrelated_bad_request_keeps_structured_output(stub):
+    client = OpenAILLMClient("stub-honest")
+    with pytest.raises(BadRequestError, match="maximum context length"):
+        client.chat(MESSAGES + [{"role": "user", "content": "很长的对局记录" * 20}])
+    assert client.output_mode == "json_schema"
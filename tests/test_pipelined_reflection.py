@@ -0,0 +1,104 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from src.events import EventLog, MemorySink
+from src.game import LiarsDiceGame
+from src.llm_client import LLMResponse, UsageTracker
+from src.players import Player
+from src.snippets import LLMError
+from tests.test_replay import quiet_logger
+
+class SlowReflectionClient(UsageTracker):
+    """反思很慢且用量与决策不同，用来检查并发时用量是否记到了正确的调用上"""
+
+    def __init__(self):
+        self._init_usage()
+        self.reflecting = threading.Event()
+
+    def chat(self, messages):
+        usage = {"prompt_tokens": 10, "completion_tokens": 1}
+        self._record_usage(usage)
+        action = {"challenge": True, "value": 0, "number": 0, "reason": "不信", "behaviour": "摇头"}
+        return LLMResponse(json.dumps(action, ensure_ascii=False), "", "deepseek-chat", usage)
+
+    def reflect(self, messages, other_players):
+        self.reflecting.set()
+        time.sleep(0.02)
+        usage = {"prompt_tokens": 1000, "completion_tokens": 100}
+        self._record_usage(usage)
+        self.reflecting.clear()
+        return LLMResponse(json.dumps({p.name: "第二轮起的新看法" for p in other_players}, ensure_ascii=False), "", "deepseek-chat", usage)
+
+def test_overlapping_reflection_keeps_per_call_usage():
+    sink = MemorySink()
+    players = [Player(name=name, model="deepseek-chat", llm_client=SlowReflectionClient()) for name in ("Alice", "Bob", "Charlie")]
+    game = LiarsDiceGame(players, logger=quiet_logger(), seed=3, repair_policy="nearest", reflection_mode="pipelined",
+                         reflection_staleness=3, events=EventLog([sink]))
+    game.start_game()
+    calls = [e for e in sink.events if e["type"] == "llm_call"]
+    assert any(e["kind"] == "reflect" for e in calls)
+    for e in calls:
+        assert e["usage"]["prompt_tokens"] == (1000 if e["kind"] == "reflect" else 10)
+    totals = sum(p.llm_client.usage_totals["prompt_tokens"] for p in players)
+    assert totals == sum(e["usage"]["prompt_tokens"] for e in calls)
+
+def test_background_reflection_does_not_touch_opinions():
+    player, other = (Player(name=name, model="deepseek-chat", llm_client=SlowReflectionClient()) for name in ("Alice", "Bob"))
+    player.init_opinions([player, other])
+    success, _, _, opinions = player.reflect([other], "", "", apply=False)
+    assert success and opinions == {"Bob": "第二轮起的新看法"}
+    assert player.opinions == {"Bob": "还不了解这个玩家"}
+    player.apply_opinions(opinions)
+    assert player.opinions == {"Bob": "第二轮起的新看法"}
+
+class FailingClient(SlowReflectionClient):
+    """所有玩家共用计数，第5次决策调用起一直失败"""
+    calls = 0
+
+    def chat(self, messages):
+        FailingClient.calls += 1
+        if FailingClient.calls >= 5:
+            raise ConnectionError("供应商不可用")
+        return super().chat(messages)
+
+    def reflect(self, messages, other_players):
+        time.sleep(0.2)
+        return super().reflect(messages, other_players)
+
+    async def achat(self, messages):
+        return self.chat(messages)
+
+    async def areflect(self, messages, other_players):
+        await asyncio.sleep(0.2)
+        return SlowReflectionClient.reflect(self, messages, other_players)
+
+def failing_game(reflection_mode="pipelined"):
+    FailingClient.calls = 0
+    players = [Player(name=name, model="deepseek-chat", llm_client=FailingClient()) for name in ("Alice", "Bob", "Charlie")]
+    return LiarsDiceGame(players, logger=quiet_logger(), seed=3, repair_policy="nearest", reflection_mode=reflection_mode,
+                         reflection_staleness=3)
+
+def test_failed_game_shuts_down_reflections():
+    game = failing_game()
+    with pytest.raises(LLMError):
+        game.start_game()
+    assert game.pending_reflections == {} and game._reflection_executor is None
+    for thread in threading.enumerate():
+        if thread.name.startswith("reflect"):
+            thread.join(timeout=2)
+    assert not [t for t in threading.enumerate() if t.name.startswith("reflect")]
+
+def test_failed_async_game_cancels_reflection_tasks():
+    game = failing_game()
+
+    async def run():
+        with pytest.raises(LLMError):
+            await game.start_game_async()
+        return [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+
+    assert asyncio.run(run()) == []
+    assert game.pending_reflections == {}
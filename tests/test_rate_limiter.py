@@ -0,0 +1,63 @@
+import types
+
+import pytest
+
+from src import rate_limiter
+from src.llm_client import OpenAILLMClient
+from src.rate_limiter import ProviderLimiter, TokenBucket, backoff_delay
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock)
+    return clock
+
+def test_bucket_refills_at_rate(clock):
+    bucket = TokenBucket(60)            # 每秒1个，容量60
+    assert bucket.reserve(60) == 0
+    assert bucket.reserve(3) == pytest.approx(3)
+    clock.now += 2
+    assert bucket.reserve(0) == pytest.approx(1)
+    clock.now += 1000
+    assert bucket.reserve(0) == 0
+    assert bucket.tokens == pytest.approx(60)     # 不超过容量
+
+def test_oversized_request_is_capped(clock):
+    bucket = TokenBucket(60)
+    assert bucket.reserve(1000) == 0
+    assert bucket.reserve(1) == pytest.approx(1)
+
+def test_settle_refunds_overestimate(clock):
+    limiter = ProviderLimiter(tpm=600)  # 每秒10个
+    assert limiter._reserve(600) == 0
+    assert limiter._reserve(100) == pytest.approx(10)
+    limiter.settle(600, 200)            # 实际只用了200，归还400
+    assert limiter._reserve(0) == 0
+
+def test_block_pauses_until_retry_after(clock):
+    limiter = ProviderLimiter()
+    limiter.block(5)
+    limiter.block(2)                    # 更短的暂停不会缩短已有的暂停
+    assert limiter._reserve(0) == pytest.approx(5)
+    clock.now += 5
+    assert limiter._reserve(0) == 0
+
+def test_backoff_delay():
+    assert 7 <= backoff_delay(0, retry_after=7) <= 8
+    for attempt in range(8):
+        assert 0 <= backoff_delay(attempt) <= min(30, 2 ** (attempt + 1))
+
+def test_retry_after_headers():
+    def error(headers):
+        return types.SimpleNamespace(response=types.SimpleNamespace(headers=headers))
+    assert OpenAILLMClient._retry_after(error({"retry-after-ms": "1500"})) == 1.5
+    assert OpenAILLMClient._retry_after(error({"retry-after": "3"})) == 3
+    assert OpenAILLMClient._retry_after(error({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) is None
+    assert OpenAILLMClient._retry_after(Exception()) is None
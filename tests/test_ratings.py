@@ -0,0 +1,43 @@
+import pytest
+
+from src.ratings import Rating, RatingStore, game_key, rate
+
+def test_rate_matches_openskill_plackett_luce():
+    # openskill.py PlackettLuce 默认参数下四名新玩家按 1-4 名的结果
+    result = rate([Rating() for _ in range(4)], [1, 2, 3, 4])
+    expected = [(27.795, 8.264), (26.553, 8.180), (24.689, 8.084), (20.962, 8.084)]
+    for (mu, sigma), (want_mu, want_sigma) in zip(result, expected):
+        assert mu == pytest.approx(want_mu, abs=1e-3)
+        assert sigma == pytest.approx(want_sigma, abs=1e-3)
+
+def test_rate_tie_is_symmetric():
+    (mu_a, sigma_a), (mu_b, sigma_b) = rate([Rating(), Rating()], [1, 1])
+    assert mu_a == pytest.approx(mu_b)
+    assert sigma_a == pytest.approx(sigma_b)
+    assert mu_a == pytest.approx(25.0)
+
+def test_duplicate_games_are_counted_once():
+    store = RatingStore(":memory:")
+    order = ["model-a", "model-b", "model-b", "model-c"]
+    assert store.update(order, key=game_key(1, order))
+    assert not store.update(order[::-1], key=game_key(1, order[::-1]))
+    assert store.duplicates == 1
+    assert store.get("model-b").games == 1
+    assert store.get("model-a").wins == 1
+
+def test_self_play_is_not_rated():
+    store = RatingStore(":memory:")
+    assert not store.update(["model-a"] * 4, key=game_key(1, ["model-a"] * 4))
+    assert store.self_play == 1
+    rating = store.get("model-a")
+    assert (rating.games, rating.wins, rating.sigma) == (0, 0, Rating().sigma)
+
+def test_reruns_with_same_seed_are_rated():
+    store = RatingStore(":memory:")
+    order = ["model-a", "model-b"]
+    # 相同种子与阵容重新运行的对局ID不同，照常计分；没有ID的旧日志仍按种子与阵容去重
+    assert store.update(order, key=game_key(1, order, "run-1"))
+    assert store.update(order[::-1], key=game_key(1, order, "run-2"))
+    assert store.update(order, key=game_key(1, order))
+    assert not store.update(order, key=game_key(1, order))
+    assert store.get("model-a").games == 3
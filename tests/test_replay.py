@@ -0,0 +1,66 @@
+import json
+import logging
+
+import pytest
+
+from src.events import EventLog, MemorySink
+from src.game import LiarsDiceGame
+from src.llm_client import LLMResponse, UsageTracker
+from src.players import Player
+from src.replay import GameRecorder, ReplayMismatch, replay_game
+
+class ChallengeClient(UsageTracker):
+    """总是质疑的确定性客户端；首家无法质疑，由 nearest 修正为最小叫点"""
+
+    def __init__(self):
+        self._init_usage()
+
+    def chat(self, messages):
+        self._record_usage({})
+        action = {"challenge": True, "value": 0, "number": 0, "reason": "不信", "behaviour": "摇头"}
+        return LLMResponse(json.dumps(action, ensure_ascii=False), "", "deepseek-chat")
+
+    def reflect(self, messages, other_players):
+        self._record_usage({})
+        return LLMResponse(json.dumps({p.name: "还不了解这个玩家" for p in other_players}, ensure_ascii=False), "", "deepseek-chat")
+
+def quiet_logger():
+    logger = logging.getLogger("tests.replay")
+    if not logger.handlers:
+        logger.addHandler(logging.NullHandler())
+        logger.propagate = False
+    return logger
+
+def record_game(seed):
+    sink = MemorySink()
+    players = [Player(name=name, model="deepseek-chat", llm_client=ChallengeClient()) for name in ("Alice", "Bob", "Charlie")]
+    recorder = GameRecorder()
+    game = LiarsDiceGame(players, logger=quiet_logger(), seed=seed, recorder=recorder, repair_policy="nearest",
+                         events=EventLog([sink]))
+    winner = game.start_game()
+    return winner, recorder.record, sink.events
+
+def strip(events):
+    return [{k: v for k, v in e.items() if k not in ("ts", "usage", "latency", "timing")} for e in events if e["type"] != "llm_call"]
+
+def test_replay_reproduces_recorded_game():
+    winner, record, events = record_game(seed=42)
+    assert record["winner"] == winner and record["calls"]
+    sink = MemorySink()
+    replayed, game = replay_game(record, events=EventLog([sink]))
+    assert replayed == winner
+    assert strip(sink.events) == strip(events)
+
+def test_replay_detects_changed_requests():
+    _, record, _ = record_game(seed=42)
+    record["calls"][0]["messages"][-1]["content"] += "（改动）"
+    with pytest.raises(ReplayMismatch):
+        replay_game(record)
+
+def test_replay_does_not_accumulate_handlers():
+    _, record, _ = record_game(seed=7)
+    replay_game(record)
+    handlers = len(logging.getLogger("replay").handlers)
+    for _ in range(3):
+        replay_game(record)
+    assert len(logging.getLogger("replay").handlers) == handlers
@@ -0,0 +1,45 @@
+import math
+
+import pytest
+
+from src.tournament import A_BETTER, B_BETTER, NO_DIFFERENCE, RUNNING, SPRT, Comparison, Tournament
+
+def test_sprt_bounds():
+    test = SPRT(delta=0.1, alpha=0.05, beta=0.1)
+    assert test.upper == pytest.approx(math.log(0.9 / 0.05))
+    assert test.lower == pytest.approx(math.log(0.1 / 0.95))
+
+@pytest.mark.parametrize("win, state", [(True, A_BETTER), (False, B_BETTER)])
+def test_sprt_stops_at_bound(win, state):
+    # 每局的对数似然比为 ±log(0.6/0.4)，第8局越过 ±log(19)
+    test = SPRT(delta=0.1, alpha=0.05, beta=0.05)
+    for _ in range(7):
+        assert test.update(win) == RUNNING
+    assert test.update(win) == state
+    assert test.games == 8 and test.wins == (8 if win else 0)
+
+def test_comparison_reaches_max_games():
+    c = Comparison("model-a", "model-b", max_games=10)
+    for i in range(10):
+        c.record(["model-a", "model-b"] if i % 2 else ["model-b", "model-a"])
+    assert c.state == NO_DIFFERENCE
+    c.record(["model-a", "model-b"])
+    assert c.test.games == 10
+
+def test_next_lineup_schedules_least_played_pairs():
+    t = Tournament(["bot-cautious", "bot-balanced", "bot-aggressive"], seats=4, rotate_seats=False, max_games=2, seed=1)
+    lineup = t.next_lineup(0)
+    models = [model for _, model in lineup]
+    assert [name for name, _ in lineup] == ["Alice", "Bob", "Charlie", "David"]
+    # 三个模型凑不满四个座位，重复已选的模型；一局同时为三对比较提供结果
+    assert sorted(set(models)) == ["bot-aggressive", "bot-balanced", "bot-cautious"]
+    assert [c.scheduled for c in t.comparisons] == [1, 1, 1]
+
+    assert t.next_lineup(1) is not None
+    assert t.next_lineup(2) is None         # 每对都已安排满 max_games 局
+
+def test_next_lineup_rotates_seats():
+    t = Tournament(["bot-cautious", "bot-balanced"], seats=2, seed=1)
+    first = [model for _, model in t.next_lineup(0)]
+    second = [model for _, model in t.next_lineup(1)]
+    assert second == first[::-1]